@@ -0,0 +1,109 @@
+"""
+Throughput benchmark of keccak256 hashing
+
+Measures hashes/s and MB/s over 32B, 64B, 1KB and 64KB inputs for:
+
+    web3            Web3.keccak(), the path SHA3 used to take
+    pycryptodome    Crypto.Hash.keccak called directly
+    pycryptodome_int
+                    the same, with the digest converted to an int as
+                    keccak256_int() returns it, the baseline of its misses
+    keccak256_int   src/utils/hashing.py, on distinct preimages
+    memoized        keccak256_int() over a small pool of repeating preimages
+                    shaped like Solidity mapping slots, a random word then a
+                    slot number (only 64-byte inputs are memoized, so other
+                    sizes measure the plain path)
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_keccak [--json] [--output PATH]
+
+--json prints one JSON object per result instead of a table, and --output
+also writes the results as a JSON array to PATH so runs can be compared
+"""
+import argparse
+import json
+import random
+import timeit
+
+from Crypto.Hash import keccak
+from web3 import Web3
+
+from src.utils.hashing import keccak256_int, _memo
+
+SIZES = (32, 64, 1024, 65536)
+
+# Distinct preimages hashed per timing run, and in the memoized pool
+POOL_SIZE = 16
+
+def count_for(size: int) -> int:
+    """
+    Number of hashes per timing run, about 4MB of input but at least 64
+    """
+    return max(64, min(4096, (4 << 20) // size))
+
+def main(json_output: bool = False, output: str = None, repeat: int = 5) -> list:
+
+    rng = random.Random(0)
+    results = []
+
+    for size in SIZES:
+
+        count = count_for(size)
+        inputs = [rng.randbytes(size) for _ in range(count)]
+        # A random word followed by a small slot number, padded or cut to size
+        pool = [(rng.randbytes(32) + (i + 1).to_bytes(32, "big")).ljust(size, b"\x00")[:size] for i in range(POOL_SIZE)]
+        repeated = [pool[i % POOL_SIZE] for i in range(count)]
+
+        # The memo is emptied before timing distinct preimages, so earlier
+        # runs can't turn them into hits
+        cases = [
+            ("web3", lambda: [Web3.keccak(data) for data in inputs], "pass"),
+            ("pycryptodome", lambda: [keccak.new(data=data, digest_bits=256).digest() for data in inputs], "pass"),
+            ("pycryptodome_int", lambda: [int.from_bytes(keccak.new(data=data, digest_bits=256).digest(), "big") for data in inputs], "pass"),
+            ("keccak256_int", lambda: [keccak256_int(data) for data in inputs], _memo.clear),
+            ("memoized", lambda: [keccak256_int(data) for data in repeated], "pass"),
+        ]
+
+        for name, case, setup in cases:
+
+            seconds = min(timeit.repeat(case, setup = setup, number = 1, repeat = repeat)) / count
+
+            results.append({
+                "path": name,
+                "size": size,
+                "hashes_per_sec": 1 / seconds,
+                "mb_per_sec": size / seconds / 1e6
+            })
+
+    if json_output:
+
+        for result in results:
+
+            print(json.dumps(result))
+
+    else:
+
+        print(f"{'path':<18}{'size (B)':>10}{'hashes/s':>14}{'MB/s':>10}")
+
+        for result in results:
+
+            print(f"{result['path']:<18}{result['size']:>10}{result['hashes_per_sec']:>14.0f}{result['mb_per_sec']:>10.1f}")
+
+    if output is not None:
+
+        with open(output, "w") as file:
+
+            json.dump(results, file, indent = 2)
+
+    return results
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = "keccak256 throughput benchmark")
+    parser.add_argument("--json", action = "store_true", help = "print JSON lines instead of a table")
+    parser.add_argument("--output", help = "also write the results as a JSON array to this path")
+    parser.add_argument("--repeat", type = int, default = 5, help = "timing runs per case, the fastest is kept")
+    args = parser.parse_args()
+
+    main(args.json, args.output, args.repeat)
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark of the U256 signed operations
+
+Compares the integer bit-operation implementations in src/utils/u256.py with
+the previous string-based ones, reproduced below. Run from the repository
+root with:
+
+    python -m benchmarks.bench_signed
+"""
+import random
+import timeit
+
+from src.utils.u256 import U256
+
+def legacy_to_signed_int(value: int) -> int:
+    """
+    Previous U256.to_signed_int(): sums powers of two over a binary string
+    """
+    binary = bin(value)[2:].zfill(256)
+
+    if binary[0] == '0':
+        return value
+
+    result = 0
+    msb_exp = 255
+    for bit in binary:
+        if msb_exp == 255 and bit == '1':
+            result -= 2 ** msb_exp
+        elif bit == '1':
+            result += 2 ** msb_exp
+        msb_exp -= 1
+    return result
+
+def legacy_from_signed_integer(value: int) -> int:
+    """
+    Previous U256.from_signed_integer(): flips bits in a list of characters
+    and ripples the carry by hand
+    """
+    if value >= 0:
+        return value
+
+    bits = list(bin(abs(value))[2:].zfill(256))
+    for i in range(len(bits)):
+        bits[i] = '1' if bits[i] == '0' else '0'
+    carry = 1
+    for i in range(len(bits) - 1, -1, -1):
+        if int(bits[i]) + carry == 2:
+            bits[i] = '0'
+        elif int(bits[i]) + carry == 1:
+            carry = 0
+            bits[i] = '1'
+    return int("".join(bits), 2)
+
+def legacy_sdiv(a: int, b: int) -> int:
+
+    signed_a = legacy_to_signed_int(a)
+    signed_b = legacy_to_signed_int(b)
+
+    if signed_b == 0:
+        return 0
+
+    sign = (-1 if signed_a < 0 else 1) * (-1 if signed_b < 0 else 1)
+
+    return legacy_from_signed_integer(sign * (abs(signed_a) // abs(signed_b)))
+
+def legacy_slt(a: int, b: int) -> int:
+
+    return 1 if legacy_to_signed_int(a) < legacy_to_signed_int(b) else 0
+
+def main(count: int = 2000, repeat: int = 5):
+
+    rng = random.Random(0)
+    # Half of the operands negative, as in int-heavy Solidity code
+    operands = [
+        (rng.getrandbits(256), rng.getrandbits(128) + 1)
+        for _ in range(count)
+    ]
+    wrapped = [(U256(a), U256(b)) for a, b in operands]
+
+    cases = [
+        ("sdiv", lambda: [legacy_sdiv(a, b) for a, b in operands],
+            lambda: [U256.sdiv(a, b) for a, b in wrapped]),
+        ("slt", lambda: [legacy_slt(a, b) for a, b in operands],
+            lambda: [U256.slt(a, b) for a, b in wrapped]),
+        ("to_signed_int", lambda: [legacy_to_signed_int(a) for a, _ in operands],
+            lambda: [a.to_signed_int() for a, _ in wrapped]),
+    ]
+
+    print(f"{'operation':<16}{'legacy (us/op)':>16}{'current (us/op)':>17}{'speedup':>10}")
+
+    for name, legacy, current in cases:
+
+        legacy_time = min(timeit.repeat(legacy, number = 1, repeat = repeat)) / count
+        current_time = min(timeit.repeat(current, number = 1, repeat = repeat)) / count
+
+        print(f"{name:<16}{legacy_time * 1e6:>16.2f}{current_time * 1e6:>17.2f}{legacy_time / current_time:>9.1f}x")
+
+if __name__ == "__main__":
+
+    main()
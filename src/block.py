@@ -8,24 +8,26 @@ class EVMBlock():
 
     def __init__(self, base_fee: int, number: int, gas_limit: int, coinbase: EVMAddress, timestamp: int, difficulty: int):
 
-        self._base_fee = base_fee
-        self._number = number
-        self._gas_limit = gas_limit
+        # Block values are constant for the whole execution, so their U256
+        # objects are built once here rather than on every getter call
+        self._base_fee = U256.of(base_fee)
+        self._number = U256.of(number)
+        self._gas_limit = U256.of(gas_limit)
         self._coinbase = coinbase
-        self._timestamp = timestamp
-        self._difficulty = difficulty
+        self._timestamp = U256.of(timestamp)
+        self._difficulty = U256.of(difficulty)
 
     def get_base_fee(self) -> U256:
 
-        return U256(self._base_fee)
+        return self._base_fee
 
     def get_number(self) -> U256:
 
-        return U256(self._number)
+        return self._number
 
     def get_gas_limit(self) -> U256:
 
-        return U256(self._gas_limit)
+        return self._gas_limit
 
     def get_coinbase(self) -> EVMAddress:
 
@@ -33,9 +35,9 @@ class EVMBlock():
 
     def get_timestamp(self) -> U256:
 
-        return U256(self._timestamp)
+        return self._timestamp
 
     def get_difficulty(self) -> U256:
 
-        return U256(self._difficulty)
+        return self._difficulty
 
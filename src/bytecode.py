@@ -2,20 +2,39 @@
 Module containing the ROM and Instruction classes
 """
 
+from functools import lru_cache
 from .utils.exceptions import *
 from .utils.u256 import U256
-from .utils.opcodes import get_readable_opcode, push_opcodes, dup_opcodes, swap_opcodes
+from .utils.opcodes import get_readable_opcode, opcodes_str, opcodes_stack, block_ending_opcodes
+from .utils.gas import static_gas
+
+# Integer-indexed views of the opcode tables used to compile basic blocks
+_stack_inputs = [0] * 256
+_stack_outputs = [0] * 256
+
+for _hex_op, (_inputs, _outputs) in opcodes_stack.items():
+
+    _stack_inputs[int(_hex_op, 16)] = _inputs
+    _stack_outputs[int(_hex_op, 16)] = _outputs
+
+# Undefined opcodes halt execution, so they also end a basic block
+_block_ending = bytearray(256)
+
+for _op in range(256):
+
+    if f"{_op:02X}" in block_ending_opcodes or f"{_op:02X}" not in opcodes_str:
+
+        _block_ending[_op] = 1
 
 class EVMInstruction():
 
     def __init__(self, hex: str, readable: str, metadata: str = None):
         self._hex_op = hex
+        self._opcode = int(hex, 16)
         self._readable_op = readable
         # If PUSH operation, then metadata represents the data to push onto
-        # stack
-        # If DUP operation, then metadata represents the stack index to copy
-        # If SWAP operation, then metadata represents the stack index to swap
-        # with top element
+        # stack. DUP and SWAP indices are bound to their handlers in the
+        # dispatch table, so they carry no metadata
         self._metadata = metadata
 
     def get_len(self):
@@ -28,6 +47,9 @@ class EVMInstruction():
     def get_hex_code(self):
         return self._hex_op
 
+    def get_opcode(self) -> int:
+        return self._opcode
+
     def get_readable_op(self):
         return self._readable_op
 
@@ -41,44 +63,147 @@ class EVMInstruction():
             return self._readable_op + " " + self._metadata
 
 class EVMRom():
+    """
+    Class holding the decoded bytecode of the executing contract
 
-    def __init__(self, bytecode: str):
+    Bytecode is decoded in a single linear pass into parallel arrays indexed
+    by program counter: _code holds the integer opcode at every byte offset,
+    _immediates holds the pre-parsed integer pushed by a PUSH instruction
+    (None everywhere else) and _next_pc holds the offset of the following
+    instruction (0 for bytes that are PUSH data rather than instructions)
 
-        self._rom = {}
-        self._size = 0
-        self._farthest_address = 0
+    _jumpdests is a bitmap with a nonzero entry at every offset holding a
+    JUMPDEST instruction. Bytes inside PUSH data are never valid destinations
 
-        while len(bytecode) != 0:
+    The code is also split into basic blocks, straight-line runs of
+    instructions that start at offset 0, at a JUMPDEST or right after a block
+    ending opcode (see block_ending_opcodes). _blocks holds, at the offset of
+    the first instruction of every block, a tuple of (static gas of the whole
+    block, stack items required on entry, maximum stack growth within the
+    block, number of instructions in the block). Every other entry is None
+    """
+
+    def __init__(self, bytecode):
+        """
+        bytecode can either be a hexadecimal string (with or without prefix)
+        or a bytes-like object
+        """
+        if isinstance(bytecode, str):
+
+            if bytecode[:2].lower() == "0x":
 
-            op = bytecode[:2].upper()
-            readable_op = get_readable_opcode(op)
-            if op in push_opcodes:
-                chars_selected = int(readable_op[4:]) * 2
-                metadata = bytecode[2:2 + chars_selected]
-                insn = EVMInstruction(op, readable_op, metadata) 
-                bytecode = bytecode[2 + chars_selected:]   
-            elif op in dup_opcodes:
-                metadata = int(readable_op[3:])
-                insn = EVMInstruction(op, readable_op, metadata)
-                bytecode = bytecode[2:]
-            elif op in swap_opcodes:
-                metadata = int(readable_op[4:])
-                insn = EVMInstruction(op, readable_op, metadata)
                 bytecode = bytecode[2:]
+
+            bytecode = bytes.fromhex(bytecode)
+
+        code = bytes(bytecode)
+        size = len(code)
+
+        immediates = [None] * size
+        next_pcs = [0] * size
+        jumpdests = bytearray(size)
+        blocks = [None] * size
+
+        stack_inputs = _stack_inputs
+        stack_outputs = _stack_outputs
+        block_ending = _block_ending
+
+        from_bytes = int.from_bytes
+        farthest_address = 0
+
+        # State of the basic block currently being compiled
+        block_start = 0
+        block_gas = 0
+        block_insns = 0
+        height = 0
+        lowest = 0
+        highest = 0
+
+        pc = 0
+        while pc < size:
+
+            op = code[pc]
+            farthest_address = pc
+
+            if op == 0x5B and block_insns != 0: # JUMPDEST begins a new block
+                blocks[block_start] = (block_gas, -lowest, highest, block_insns)
+                block_start = pc
+                block_gas = block_insns = height = lowest = highest = 0
+
+            if 0x60 <= op <= 0x7F: # PUSH1 - PUSH32
+                width = op - 0x5F
+                next_pc = pc + 1 + width
+                # Data running past the end of the code is padded with zeros
+                immediates[pc] = from_bytes(code[pc + 1:next_pc], "big") << (8 * max(0, next_pc - size))
             else:
-                insn = EVMInstruction(op, readable_op)
-                bytecode = bytecode[2:]
+                next_pc = pc + 1
+
+                if op == 0x5B: # JUMPDEST
+                    jumpdests[pc] = 1
+
+            next_pcs[pc] = next_pc
+
+            block_gas += static_gas[op]
+            block_insns += 1
+            height -= stack_inputs[op]
+            if height < lowest:
+                lowest = height
+            height += stack_outputs[op]
+            if height > highest:
+                highest = height
 
-            self._rom[self._size] = insn
-            self._farthest_address = self._size
-            self._size += insn.get_len()
+            if block_ending[op]:
+                blocks[block_start] = (block_gas, -lowest, highest, block_insns)
+                block_start = next_pc
+                block_gas = block_insns = height = lowest = highest = 0
+
+            pc = next_pc
+
+        if block_insns != 0:
+            blocks[block_start] = (block_gas, -lowest, highest, block_insns)
+
+        self._code: bytes = code
+        self._immediates: list = immediates
+        self._next_pc: list = next_pcs
+        self._jumpdests: bytearray = jumpdests
+        self._blocks: list = blocks
+        self._size = size
+        self._farthest_address = farthest_address
 
     def get_insn(self, line: int) -> EVMInstruction:
 
-        try:
-            return self._rom[line]
-        except:
-            raise EVMInstructionNotFound()
+        if line < 0 or line >= self._size or self._next_pc[line] == 0:
+
+            raise EVMInstructionNotFound(line)
+
+        op = self._code[line]
+        hex_op = f"{op:02X}"
+        readable_op = get_readable_opcode(hex_op)
+
+        if self._immediates[line] is None:
+
+            return EVMInstruction(hex_op, readable_op)
+
+        width = op - 0x5F
+        metadata = f"{self._immediates[line]:0{width * 2}x}"
+
+        return EVMInstruction(hex_op, readable_op, metadata)
+
+    def get_opcode(self, line: int) -> int:
+
+        return self._code[line]
+
+    def get_immediate(self, line: int) -> int:
+
+        return self._immediates[line]
+
+    def is_valid_jump_destination(self, destination: int) -> bool:
+
+        return destination < self._size and self._jumpdests[destination] == 1
+
+    def get_block(self, line: int) -> tuple:
+
+        return self._blocks[line]
 
     def get_size(self) -> int:
 
@@ -86,9 +211,49 @@ class EVMRom():
 
     def is_end_of_program(self, pc : int) -> bool:
 
-        print(f"size is :{self._size} while pc is {pc}")
-        return self._farthest_address < pc
+        return self._size <= pc
 
     def get_code(self, offset: U256, length: U256) -> str:
+        """
+        Returns code[offset:offset + length] as a hexadecimal string, right
+        padded with zeros if the range runs past the end of the code
+        """
+        return self.get_code_bytes(offset.to_int(), length.to_int()).hex()
+
+    def get_push20_values(self) -> list:
+        """
+        Returns the distinct values pushed by PUSH20 instructions, in order of
+        appearance. Solidity pushes the addresses of known contracts this way
+        """
+        values = []
+        seen = set()
+        code = self._code
+        immediates = self._immediates
+
+        for pc in range(self._size):
+
+            if code[pc] == 0x73 and immediates[pc] is not None and immediates[pc] not in seen:
+
+                seen.add(immediates[pc])
+                values.append(immediates[pc])
+
+        return values
+
+    def get_code_bytes(self, offset: int, length: int) -> bytes:
+        """
+        Returns code[offset:offset + length] as bytes, right padded with zeros
+        if the range runs past the end of the code
+        """
+        return self._code[offset:offset + length].ljust(length, b"\x00")
+
+# Number of distinct bytecodes whose decoded EVMRom is kept by load_rom()
+ROM_CACHE_SIZE = 256
 
-        pass
+@lru_cache(maxsize=ROM_CACHE_SIZE)
+def load_rom(bytecode: bytes) -> EVMRom:
+    """
+    Returns the EVMRom of bytecode, decoding each distinct bytecode only once.
+    An EVMRom is never modified once decoded, so it is shared by every call
+    frame and transaction executing the same code
+    """
+    return EVMRom(bytecode)
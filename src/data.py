@@ -2,7 +2,6 @@
 Module containg the stack and memory data structures for the EVM
 """
 from .utils.u256 import *
-from math import floor
 from copy import deepcopy
 from .utils.exceptions import *
 import copy
@@ -36,39 +35,139 @@ class EVMMemory():
     """
     Class that serves to maintain the memory component of the EVM
 
-    EVMMemory contains the _memory attribute which maps byte addresses (ints) to
-    the values stored in those addresses (lowercase hex strings)
+    EVMMemory contains the _memory attribute, a bytearray holding the contents
+    of memory. _memory always holds a whole number of 32-byte words and grows a
+    word at a time whenever an access reaches past its current end, new bytes
+    being zero
 
-    Because of the complex nature of memory expansion and its associated gas
-    costs, any read/write/other complex usage of memory returns an
-    EVMMemoryReturnValue object
+    The number of active words and the gas already paid for them are tracked
+    incrementally, so expand_to() only computes a cost when an access actually
+    grows memory. The interpreter calls expand_to() and then the int-based
+    read_*/write_* methods. The U256-based methods below wrap the same logic
+    and return an EVMMemoryReturnValue carrying the expansion cost
     """
     # Each cell is 8 bits
     # Memory is byte-based
 
     def __init__(self):
 
-        # Keys are addressed PER BYTE
-        # Values are HEX STRINGS
-        self._memory = {}
+        # Addressed PER BYTE, length is always a multiple of 32
+        self._memory = bytearray()
 
         # Highest referenced memory address in bytes (int)
         self._size: int = 0
 
-        # Number of 32-byte words required for memory 
-        # (self._size + 31) // 32
-        self._size_words: int = 0
+        # Number of active 32-byte words, len(self._memory) // 32
+        self._words: int = 0
+
+        # Gas already paid for self._words words of memory
+        self._cost: int = 0
+
+        # Return data (see EVMReturnData) holding a view over this memory
+        self._exported = None
+
+    def reset(self):
+        """
+        Empties memory so it can be reused by another call frame. Return data
+        still viewing it gets its own copy first
+        """
+        if self._exported is not None:
+
+            self._exported.detach()
+
+        self._memory.clear()
+        self._size = 0
+        self._words = 0
+        self._cost = 0
 
     def get_size(self) -> U256:
 
-        return U256(self._size)
+        return U256.of(self._size)
+
+    def get_msize(self) -> int:
+        """
+        Returns the size of active memory in bytes, the value of MSIZE
+        """
+        return self._words * 32
 
     def get_mem_cost(self) -> int:
         """
         Memory Expansion Function from the Ethereum Yellowpaper
-        get_mem_cost() returns the required amount of gas for memory expansion
+        get_mem_cost() returns the amount of gas paid so far for memory
+        expansion
+        """
+        return self._cost
+
+    @staticmethod
+    def mem_cost(words: int) -> int:
+        """
+        Returns the total gas cost of words words of memory
+        """
+        return (3 * words) + (words * words) // 512
+
+    def expand_to(self, offset: int, length: int, available_gas: int = None) -> int:
+        """
+        Expands memory so that bytes [offset, offset + length) are active and
+        returns the gas owed for the expansion (0 if memory doesn't grow)
+
+        Accesses of length 0 never expand memory. If available_gas is given and
+        the expansion costs more than that, EVMInsufficientGas is raised
+        before any memory is allocated
+        """
+        if length == 0:
+
+            return 0
+
+        words = (offset + length + 31) // 32
+
+        if words <= self._words:
+
+            return 0
+
+        cost = EVMMemory.mem_cost(words)
+        delta = cost - self._cost
+
+        if available_gas is not None and delta > available_gas:
+
+            raise EVMInsufficientGas()
+
+        self._memory.extend(bytes((words - self._words) * 32))
+        self._words = words
+        self._cost = cost
+
+        return delta
+
+    def read_word(self, offset: int) -> int:
+
+        return int.from_bytes(self._memory[offset:offset + 32], "big")
+
+    def write_word(self, offset: int, value: int):
+
+        self._memory[offset:offset + 32] = value.to_bytes(32, "big")
+
+    def write_byte(self, offset: int, value: int):
+
+        self._memory[offset] = value
+
+    def read_view(self, offset: int, length: int) -> memoryview:
+        """
+        Returns a memoryview over bytes [offset, offset + length) without
+        copying. It must be released (or copied with bytes()) before memory is
+        expanded again
         """
-        return (3 * self._size_words) + floor((self._size_words ** 2) / 512)
+        return memoryview(self._memory)[offset:offset + length]
+
+    def write_bytes(self, offset: int, data):
+
+        self._memory[offset:offset + len(data)] = data
+
+    def _reference(self, offset: int, length: int):
+        """
+        Keeps track of the highest referenced address
+        """
+        if length != 0 and offset + length - 1 > self._size:
+
+            self._size = offset + length - 1
 
     def load(self, offset: U256) -> EVMMemoryReturnValue:
         """
@@ -79,71 +178,57 @@ class EVMMemory():
 
             raise EVMInvalidMemoryInput(offset)
 
-        prior_mem_cost = self.get_mem_cost()
-
         offset_val = offset.to_int()
-        loaded_value_str = ""
-        for i in range(32):
-            try:
-                loaded_value_str = loaded_value_str + self._memory[offset_val + i] 
-            except:
-                loaded_value_str = loaded_value_str + "00"
 
-        farthest_address = offset_val + 31
+        mem_exp_cost = self.expand_to(offset_val, 32)
+        self._reference(offset_val, 32)
 
-        if farthest_address > self._size:
-            # Need to update farthest referenced address
-            self._size = farthest_address
-            self._size_words = (farthest_address + 31) // 32
+        return EVMMemoryReturnValue(U256.of(self.read_word(offset_val)), mem_exp_cost)
 
-        curr_mem_cost = self.get_mem_cost()
-
-        mem_exp_cost = curr_mem_cost - prior_mem_cost
-
-        loaded_value_int = int(loaded_value_str, 16)
-
-        # return U256(loaded_value_int)
-        return EVMMemoryReturnValue(U256(loaded_value_int), mem_exp_cost)
-
-    def load_custom(self, offset: U256, length: U256) -> EVMMemoryReturnValue:
+    def load_bytes(self, offset: U256, length: U256) -> EVMMemoryReturnValue:
         """
         Functions that allows for values of arbitrary length to be loaded from
-        memory 
-        
-        Since value is not guaranteed to be within the bounds of the U256 type,
-        a hexadecimal string is returned
+        memory without copying
+
+        The returned value is a memoryview over memory itself, so it reflects
+        later writes and must be released (or copied with bytes()) before
+        memory is expanded again
         """
 
         if not isinstance(offset, U256) or not isinstance(length, U256):
 
             raise EVMInvalidMemoryInput()
 
-        elif offset.to_int() + length.to_int() - 1 > 2** 253 - 1:
+        offset_val = offset.to_int()
+        length_val = length.to_int()
 
-            raise EVMMemoryOffsetTooLarge()
+        # Empty reads touch no memory, whatever their offset
+        if length_val == 0:
 
-        prior_mem_cost = self.get_mem_cost()
+            return EVMMemoryReturnValue(memoryview(b""), 0)
 
-        offset_val = offset.to_int()
-        loaded_value_str = ""
-        for i in range(length.to_int()):
-            try:
-                loaded_value_str = loaded_value_str + self._memory[offset_val + i] 
-            except:
-                loaded_value_str = loaded_value_str + "00"
+        if offset_val + length_val - 1 > 2** 253 - 1:
 
-        farthest_address = offset_val + length.to_int() - 1
+            raise EVMMemoryOffsetTooLarge()
+
+        mem_exp_cost = self.expand_to(offset_val, length_val)
+        self._reference(offset_val, length_val)
 
-        if farthest_address > self._size:
-            
-            self._size = farthest_address
-            self._size_words = (farthest_address + 31) // 32
+        return EVMMemoryReturnValue(self.read_view(offset_val, length_val), mem_exp_cost)
 
-        curr_mem_cost = self.get_mem_cost()
+    def load_custom(self, offset: U256, length: U256) -> EVMMemoryReturnValue:
+        """
+        Functions that allows for values of arbitrary length to be loaded from
+        memory 
+        
+        Since value is not guaranteed to be within the bounds of the U256 type,
+        a hexadecimal string is returned
+        """
+        return_val = self.load_bytes(offset, length)
 
-        mem_exp_cost = curr_mem_cost - prior_mem_cost
+        with return_val.get_value() as value:
 
-        return EVMMemoryReturnValue(loaded_value_str, mem_exp_cost)
+            return EVMMemoryReturnValue(value.hex(), return_val.get_mem_expansion_cost())
 
     def store(self, offset: U256, value: U256) -> EVMMemoryReturnValue:
         """
@@ -161,69 +246,49 @@ class EVMMemory():
 
             raise EVMMemoryOffsetTooLarge(offset)
 
-        prior_mem_cost = self.get_mem_cost()
-
-        value_hex_str = value.to_hex_string()
-        chopped_value_list = []
         offset_val = offset.to_int()
-        for i in range(32):
-            # Slice up 32-char hex string
-            chopped_value_list.append(value_hex_str[i*2:(i*2)+2])
-
-        for i in range(32):
-
-            self._memory[offset_val + i] = chopped_value_list[i]
-
-        farthest_address = offset_val + 31
 
-        if farthest_address > self._size:
-            self._size = farthest_address
-            self._size_words = (farthest_address + 31) // 32
+        mem_exp_cost = self.expand_to(offset_val, 32)
+        self._reference(offset_val, 32)
 
-        curr_mem_cost = self.get_mem_cost()
-
-        mem_exp_cost = curr_mem_cost - prior_mem_cost
+        self.write_word(offset_val, value.to_int())
 
         return EVMMemoryReturnValue(mem_expansion_cost= mem_exp_cost)
 
-    def store_custom(self, offset: U256, length: U256, data: str) -> EVMMemoryReturnValue:
+    def store_custom(self, offset: U256, length: U256, data) -> EVMMemoryReturnValue:
         """
         Stores data of arbitrary length into memory
+
+        data is either a hexadecimal string or a bytes-like object
         """
 
-        if not isinstance(offset, U256) or not isinstance(length, U256) or not isinstance(data, str):
+        if not isinstance(offset, U256) or not isinstance(length, U256) or not isinstance(data, (str, bytes, bytearray, memoryview)):
             raise EVMInvalidMemoryInput()
-        elif length.to_int() != len(data) // 2 or len(data) % 2 != 0:
-            raise EVMMemoryInputLengthInconsistency()
-        elif (offset.to_int() + length.to_int() - 1) > (2**253 - 1):
-            raise EVMMemoryOffsetTooLarge()
-
-        data = data.lower()
-        
-        prior_mem_cost = self.get_mem_cost()
-
-        offset_val = offset.to_int()
-        length_val = length.to_int()
 
-        chopped_data_list = []
+        if isinstance(data, str):
 
-        for i in range(length_val):
+            if len(data) % 2 != 0 or length.to_int() != len(data) // 2:
+                raise EVMMemoryInputLengthInconsistency()
 
-            chopped_data_list.append(data[i*2:(i * 2) + 2])
+            data = bytes.fromhex(data)
 
-        for i in range(length_val):
+        elif length.to_int() != len(data):
+            raise EVMMemoryInputLengthInconsistency()
 
-            self._memory[offset_val + i] = chopped_data_list[i]
+        # As with load_bytes(), empty writes touch no memory
+        if length.to_int() == 0:
+            return EVMMemoryReturnValue(mem_expansion_cost= 0)
 
-        farthest_address = self._size + length.to_int() - 1
+        if (offset.to_int() + length.to_int() - 1) > (2**253 - 1):
+            raise EVMMemoryOffsetTooLarge()
 
-        if farthest_address > self._size:
-            self._size = farthest_address
-            self._size_words = (farthest_address + 31) // 32
+        offset_val = offset.to_int()
+        length_val = length.to_int()
 
-        curr_mem_cost = self.get_mem_cost()
+        mem_exp_cost = self.expand_to(offset_val, length_val)
+        self._reference(offset_val, length_val)
 
-        mem_exp_cost = curr_mem_cost - prior_mem_cost
+        self.write_bytes(offset_val, data)
 
         return EVMMemoryReturnValue(mem_expansion_cost= mem_exp_cost)
 
@@ -231,19 +296,13 @@ class EVMMemory():
 
         print("CURRENT EVM MEMORY:")
 
-        farthest_multiple = self._size % 32
-
-        for nth_word in range(farthest_multiple + 1):
+        words = max(1, self._words)
 
-            word = ""
+        for nth_word in range(words):
 
-            for jth_bit in range(32):
-                try:
-                    # Value exists
-                    word += self._memory[jth_bit + (nth_word * 32)]
-                except KeyError: 
-                    # Default to '00'
-                    word += "00"
+            word = self._memory[nth_word * 32:(nth_word + 1) * 32].hex()
+            # Memory that has never been expanded prints as a zero word
+            word = word + "0" * (64 - len(word))
 
             word_address = f"[{hex(32 * nth_word)}]"
             print(f"{word_address} {word}")
@@ -254,9 +313,50 @@ class EVMMemory():
         """
         Returns the highest address that stores a nonzero value in memory
         """
-        return U256(self._size)
+        return U256.of(self._size)
 
 
+class EVMIntStack(list):
+    """
+    Stack used by the interpreter, holding plain ints in the range
+    [0, 2**256 - 1] with the top of the stack at the end of the list
+
+    Unlike EVMStack, no U256 object is allocated per stack item and push/pop
+    are the O(1) list methods. Stack bounds are validated once per basic block
+    by the interpreter, so push() and pop() do no checking of their own. Use
+    push_u256() and pop_u256() when exchanging values with U256-based code
+    """
+
+    push = list.append
+
+    def push_u256(self, item: U256):
+
+        if not isinstance(item, U256):
+
+            raise EVMStackInvalidInputType(item)
+
+        if len(self) + 1 > 1024:
+
+            raise EVMStackOverFlow()
+
+        self.append(item.to_int())
+
+    def pop_u256(self) -> U256:
+
+        if len(self) == 0:
+
+            raise EVMEmptyStack()
+
+        return U256.of(self.pop())
+
+    def print(self):
+
+        print("CURRENT EVM STACK:")
+        counter = 0
+        for i in range(len(self) - 1, -1, -1):
+            print(f"[{hex(counter)}] {self[i]:064x}")
+            counter += 32
+
 class EVMStack():
 
     def __init__(self):
@@ -283,6 +383,10 @@ class EVMStack():
 
         return self._stack.pop(0)
 
+    def __len__(self) -> int:
+
+        return len(self._stack)
+
     def print(self):
 
         print("CURRENT EVM STACK:")
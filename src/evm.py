@@ -2,49 +2,150 @@
 Module containining all EVM functionality
 """
 from .utils.u256 import *
-from .data import EVMMemory, EVMStack
+from .data import EVMMemory, EVMIntStack
 from .transaction import EVMMessage, EVMTransaction
 from .block import EVMBlock
 from .state import EVMGlobalState, EVMStorage
-from .bytecode import EVMRom
+from .bytecode import EVMRom, load_rom
 from .input import EVMInput
 from .utils.address import EVMAddress
+from .utils.exceptions import EVMReturnDataOutOfBounds
 
 
-class EVMReturnFrame():
+# Calls made with this many frames already executing fail right away
+CALL_DEPTH_LIMIT = 1024
 
-    def __init__(self):
+# Addresses up to this one are precompiles
+LAST_PRECOMPILE = 0x0a
 
-        self._return_data = ""
+class EVMFrame():
+    """
+    Execution context of a caller, saved while one of its calls executes,
+    along with what is needed to hand the result of that call back to it
+    """
+    __slots__ = (
+        "_stack", "_memory", "_pc", "_gas", "_rom", "_msg", "_static",
+        "_gas_refund", "_log_count", "_snapshot",
+        "_call_type", "_code_address", "_call_gas", "_ret_offset", "_ret_size"
+    )
+
+    def __init__(self, evm: "EVM", call_type: str, code_address: EVMAddress, call_gas: int, ret_offset: int, ret_size: int):
+
+        self._stack = evm._stack
+        self._memory = evm._memory
+        self._pc = evm._pc
+        self._gas = evm._gas
+        self._rom = evm._rom
+        self._msg = evm._msg
+        self._static = evm._static
+        self._gas_refund = evm._gas_refund
+        self._log_count = len(evm._log_storage.get_logs())
+        self._snapshot = evm._storage.snapshot()
+
+        self._call_type = call_type
+        # Address whose code the call executes, which differs from the
+        # recipient of the message for DELEGATECALL and CALLCODE
+        self._code_address = code_address
+        # Gas the call was given
+        self._call_gas = call_gas
+        # Memory area the output of the call is copied to
+        self._ret_offset = ret_offset
+        self._ret_size = ret_size
+
+    def get_call_type(self) -> str:
+
+        return self._call_type
+
+    def get_code_address(self) -> EVMAddress:
+
+        return self._code_address
+
+    def get_call_gas(self) -> int:
+
+        return self._call_gas
 
 class EVMReturnData():
+    """
+    Data returned by the last call of the executing frame
+
+    data is a bytes-like object. When a call ends with RETURN or REVERT, it is
+    a memoryview over the memory of the callee, given as memory, rather than a
+    copy. That memory goes back to the pool of its EVM untouched, and data is
+    only copied (see detach()) if a later call reuses the memory while data is
+    still needed
+    """
 
-    def __init__(self, data: str):
+    def __init__(self, data = b"", memory: EVMMemory = None):
 
         self._data = data
+        self._memory = memory
+
+        if memory is not None:
+
+            memory._exported = self
 
     def get_data(self) -> str:
+        """
+        Returns the data in its entirety as a hexadecimal string
+        """
+        return self._data.hex()
+
+    def get_data_bytes(self):
 
         return self._data
 
+    def get_size(self) -> int:
+
+        return len(self._data)
+
+    def load_bytes(self, offset: int, length: int):
+        """
+        Returns data[offset:offset + length] without copying, raising
+        EVMReturnDataOutOfBounds if the range runs past the end of data
+        """
+        if offset + length > len(self._data):
+
+            raise EVMReturnDataOutOfBounds(offset + length)
+
+        return self._data[offset:offset + length]
+
     def get_data_custom(self, offset: U256, length: U256) -> str:
 
-        offset_val = offset.to_int()
-        length_val = length.to_int()
+        return bytes(self.load_bytes(offset.to_int(), length.to_int())).hex()
+
+    def detach(self):
+        """
+        Replaces the view over the memory of the callee with a copy, so the
+        memory can be reused
+        """
+        if self._memory is not None:
 
-        result = ""
+            view = self._data
+            self._data = bytes(view)
+            view.release()
 
-        for i in range(length_val):
-            result = result + self._data[offset_val + (i * 2): offset_val + (i * 2) + 2]
+            self._memory._exported = None
+            self._memory = None
 
-        return result
+    def release(self):
+        """
+        Drops the data once it can no longer be read, without copying it
+        """
+        if self._memory is not None:
+
+            self._data.release()
+
+            self._memory._exported = None
+            self._memory = None
+
+        self._data = b""
 
 class EVM():
 
     def __init__(self, input: EVMInput):
 
         # Stack empty at initialization
-        self._stack = EVMStack()
+        self._stack = EVMIntStack()
         # Memory empty at initialization
         self._memory = EVMMemory()
         # Program Counter
@@ -58,7 +159,7 @@ class EVM():
         # Log Storage
         self._log_storage = input.get_log_storage()
         # Bytecode derived from input
-        self._rom = EVMRom(
+        self._rom = load_rom(
             self._storage.get_contract_bytecode(input.get_to())
             )
 
@@ -92,7 +193,7 @@ class EVM():
             input.get_chain_id()
         )
 
-        self._return_data = EVMReturnData("")
+        self._return_data = EVMReturnData()
 
         self._frame_number = input.get_frame_number()
 
@@ -104,9 +205,148 @@ class EVM():
             self._msg.get_recipient()
         )
 
-        self._gas -= 21000
+        self._gas -= 21000 + input.get_access_list_gas()
+
+        self._verbosity = input.get_verbosity()
+
+        # Whether state changes are forbidden (inside a STATICCALL)
+        self._static = False
+        # Data returned by the executing frame, a view over its memory if it
+        # ended with RETURN or REVERT
+        self._output = b""
+        # Whether the executing frame ended with REVERT
+        self._reverted = False
+        # Saved contexts of the callers of the executing frame, innermost last
+        self._frames: list[EVMFrame] = []
+        # Stacks and memories of finished frames, reused by later calls
+        self._stack_pool: list[EVMIntStack] = []
+        self._memory_pool: list[EVMMemory] = []
+
+    def enter_frame(self, call_type: str, code_address: EVMAddress, msg: EVMMessage, rom: EVMRom, gas: int, static: bool, ret_offset: int, ret_size: int):
+        """
+        Saves the executing context and starts executing rom on behalf of msg
+        with gas. State changes made from here on can be undone by
+        exit_frame()
 
-        print(self._gas)
+        Frames are switched in place rather than by calling back into the
+        interpreter, so nested calls don't consume Python stack
+        """
+        self._frames.append(EVMFrame(self, call_type, code_address, gas, ret_offset, ret_size))
+
+        # Whatever the call returns replaces the current return data
+        self._return_data.release()
+
+        self._stack = self._stack_pool.pop() if self._stack_pool else EVMIntStack()
+
+        if self._memory_pool:
+
+            self._memory = self._memory_pool.pop()
+            self._memory.reset()
+
+        else:
+
+            self._memory = EVMMemory()
+        self._pc = 0
+        self._gas = gas
+        self._rom = rom
+        self._msg = msg
+        self._static = static
+        self._return_data = EVMReturnData()
+        self._output = b""
+        self._reverted = False
+        self._stop = False
+        self._frame_number += 1
+
+    def exit_frame(self, error: Exception = None):
+        """
+        Ends the executing frame and resumes its caller, handing it the result
+        of the call. If error is given, the frame halted exceptionally: its
+        state changes and logs are undone and all of its gas is consumed. A
+        frame ended by REVERT has its state changes and logs undone too, but
+        keeps its gas and output
+        """
+        frame = self._frames.pop()
+        success = error is None and not self._reverted
+
+        gas_left = self._gas if error is None else 0
+        output = self._output if error is None else b""
+        memory = self._memory
+
+        if success:
+
+            self._storage.commit(frame._snapshot)
+
+        else:
+
+            self._storage.revert(frame._snapshot)
+            self._log_storage.truncate(frame._log_count)
+            self._gas_refund = frame._gas_refund
+
+        self._stack.clear()
+        self._stack_pool.append(self._stack)
+        # Not reset until reused, as output may be a view over it
+        self._memory_pool.append(memory)
+
+        self._stack = frame._stack
+        self._memory = frame._memory
+        self._pc = frame._pc
+        self._gas = frame._gas + gas_left
+        self._rom = frame._rom
+        self._msg = frame._msg
+        self._static = frame._static
+        self._output = b""
+        self._reverted = False
+        self._stop = False
+        self._frame_number -= 1
+
+        # The return data of the callee's own calls dies with it
+        self._return_data.release()
+        self._return_data = EVMReturnData(output, memory if isinstance(output, memoryview) else None)
+
+        # The output area was already paid for and expanded by the call
+        self._memory.write_bytes(frame._ret_offset, output[:frame._ret_size])
+
+        self._stack.push(1 if success else 0)
+
+    def clear_return_data(self):
+
+        self._return_data.release()
+        self._return_data = EVMReturnData()
+
+    def get_gas_used(self) -> int:
+
+        return self._tx.get_gas_limit() - self._gas
+
+    def get_gas_refund(self) -> int:
+
+        return self._gas_refund
+
+    def get_receipt_gas_used(self) -> int:
+        """
+        Returns the gas used once refunds are deducted, as in the receipt of
+        the transaction. At most a fifth of the gas used is refunded (EIP-3529)
+        """
+        gas_used = self.get_gas_used()
+
+        return gas_used - min(self._gas_refund, gas_used // 5)
+
+    def get_output(self) -> bytes:
+        """
+        Returns the data returned by the executing frame, the result of the
+        transaction once execution finishes
+        """
+        return bytes(self._output)
+
+    def is_reverted(self) -> bool:
+
+        return self._reverted
+
+    def get_frame(self) -> EVMFrame:
+        """
+        Returns the saved context of the caller of the executing frame, None
+        for the outermost frame
+        """
+        return self._frames[-1] if self._frames else None
 
     def print_rom(self):
 
@@ -125,6 +365,18 @@ class EVM():
 
         self._memory.print()
 
+    def print_summary(self):
+
+        print("EXECUTION SUMMARY:")
+        print(f"Gas used: {self.get_gas_used()}")
+        print(f"Gas remaining: {self._gas}")
+        print(f"Gas refund: {self._gas_refund}")
+        print(f"Logs emitted: {len(self._log_storage.get_logs())}")
+        print(f"Reverted: {self._reverted}")
+        print(f"Output: 0x{self.get_output().hex()}")
+        self.print_stack()
+        print("--------")
+
     def grab_insn(self):
 
         return self._rom.get_insn(self._pc)
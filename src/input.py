@@ -3,17 +3,43 @@ Module containing the EVM Input class
 """
 
 from .state import EVMStorage, EVMContractStorage
+from .provider import EVMStateProvider, EVMJSONRPCProvider, EVMWeb3Provider, EVMCachedProvider
 from .utils.address import EVMAddress
 from .utils.u256 import U256
 from .logs import EVMLogStorage
+from .utils.exceptions import EVMInvalidVerbosity, EVMInvalidRPCProvider
+from .utils.gas import ACCESS_LIST_ADDRESS_COST, ACCESS_LIST_STORAGE_KEY_COST
+
+# How much the EVM prints while executing
+# silent - nothing at all
+# summary - a short report once execution finishes
+# trace - the stack and memory after every instruction, then the summary
+VERBOSITY_LEVELS = ("silent", "summary", "trace")
+
+# State providers selectable with rpc_provider, all pointed at API_URL
+# jsonrpc - batched JSON-RPC requests over a keep-alive session
+# web3 - one web3.py request per query
+RPC_PROVIDERS = {
+    "jsonrpc": EVMJSONRPCProvider,
+    "web3": EVMWeb3Provider
+}
 
 class EVMInput():
 
     def __init__(self):
 
         self._storage = None
-
-    def from_toml(self, toml_dict: dict):
+        self._verbosity = "silent"
+        self._speculative_prefetch = False
+        self._rpc_concurrency = 16
+        self._access_list = []
+
+    def from_toml(self, toml_dict: dict, provider: EVMStateProvider = None):
+        """
+        Loads the execution described by toml_dict. Contracts that aren't
+        listed in it are pulled from provider, or by default from the node at
+        API_URL through the provider picked by rpc_provider
+        """
 
         # Chain properties
         self._chain_id = toml_dict["chain"]["chain_id"]
@@ -23,19 +49,34 @@ class EVMInput():
         self._block_gas_limit = toml_dict["block"]["gas_limit"]
         self._base_fee = toml_dict["block"]["base_fee"]
         self._block_number = toml_dict["block"]["number"]
-        self._coinbase = toml_dict["block"]["coinbase"]
-
-        # Transaction properties
-        self._from: EVMAddress = EVMAddress(hex = toml_dict["transaction"]["from"])
-        self._to: EVMAddress = EVMAddress(hex = toml_dict["transaction"]["to"])
-        self._calldata = toml_dict["transaction"]["calldata"]
-        self._value = toml_dict["transaction"]["value"]
-        self._tx_gas_limit = toml_dict["transaction"]["gas_limit"]
-        self._gas_price = toml_dict["transaction"]["gas_price"]
-        self._type = toml_dict["transaction"]["type"]
-        self._signature = toml_dict["transaction"]["sig"]
-
-        self._storage = EVMStorage(self._block_number)
+        self._coinbase = EVMAddress(hex = toml_dict["block"]["coinbase"])
+
+        self.load_transaction(toml_dict["transaction"])
+
+        execution = toml_dict.get("execution", {})
+
+        self._speculative_prefetch = execution.get("speculative_prefetch", False)
+        self._rpc_concurrency = execution.get("rpc_concurrency", 16)
+
+        if provider is None:
+
+            rpc_provider = execution.get("rpc_provider", "jsonrpc")
+
+            if rpc_provider not in RPC_PROVIDERS:
+
+                raise EVMInvalidRPCProvider(rpc_provider)
+
+            provider = RPC_PROVIDERS[rpc_provider]()
+
+        if "rpc_cache" in execution:
+
+            provider = EVMCachedProvider(
+                provider,
+                execution["rpc_cache"],
+                self._chain_id
+            )
+
+        self._storage = EVMStorage(self._block_number, provider)
         self._log_storage = EVMLogStorage()
 
         if "contracts" in toml_dict:
@@ -46,13 +87,111 @@ class EVMInput():
 
                 for slot_key in contract["slots"]:
 
-                    formatted_slots[int(slot_key)] = contract["slots"][slot_key]
+                    formatted_slots[int(slot_key)] = U256.of(contract["slots"][slot_key])
 
                 contract_storage = EVMContractStorage(contract["bytecode"], formatted_slots)
                 self._storage.add_contract(EVMAddress(hex=contract["address"]), contract_storage, U256(contract["balance"]))
 
+        self.warm_access_list()
+
         self._frame_number = 0
 
+        # Execution properties
+        if "execution" in toml_dict:
+
+            self.set_verbosity(toml_dict["execution"].get("verbosity", "summary"))
+
+        else:
+
+            self.set_verbosity("summary")
+
+    def load_transaction(self, transaction: dict):
+        """
+        Loads the transaction properties from transaction, a dict shaped like
+        the [transaction] section of execution.toml
+        """
+        self._from: EVMAddress = EVMAddress(hex = transaction["from"])
+        self._to: EVMAddress = EVMAddress(hex = transaction["to"])
+        self._calldata = transaction["calldata"]
+        self._value = transaction["value"]
+        self._tx_gas_limit = transaction["gas_limit"]
+        self._gas_price = transaction["gas_price"]
+        self._type = transaction["type"]
+        self._signature = transaction["sig"]
+        self._access_list = [
+            (
+                EVMAddress(hex = entry["address"]),
+                [int(key, 16) if isinstance(key, str) else key for key in entry.get("storage_keys", [])]
+            )
+            for entry in transaction.get("access_list", [])
+        ]
+
+    def warm_access_list(self):
+        """
+        Marks every address and storage key in the access list as touched and
+        fetches the ones not listed under contracts in a single batch, along
+        with the recipient
+        """
+        pairs = [(self._to, None)]
+
+        for address, keys in self._access_list:
+
+            self._storage.add_touched_address(address)
+            pairs.append((address, None))
+
+            for key in keys:
+
+                self._storage.add_touched_storage_slot(address, U256.of(key))
+                pairs.append((address, key))
+
+        if len(self._access_list) != 0:
+
+            self._storage.prefetch(pairs)
+
+    def get_access_list(self) -> list:
+        """
+        Returns the EIP-2930 access list as (EVMAddress, list of int storage
+        keys) tuples
+        """
+        return self._access_list
+
+    def get_access_list_gas(self) -> int:
+        """
+        Returns the intrinsic gas the access list adds to the transaction
+        """
+        return sum(
+            ACCESS_LIST_ADDRESS_COST + ACCESS_LIST_STORAGE_KEY_COST * len(keys)
+            for _, keys in self._access_list
+        )
+
+    def get_verbosity(self) -> str:
+
+        return self._verbosity
+
+    def set_verbosity(self, verbosity: str):
+
+        if verbosity not in VERBOSITY_LEVELS:
+
+            raise EVMInvalidVerbosity(verbosity)
+
+        self._verbosity = verbosity
+
+    def get_speculative_prefetch(self) -> bool:
+
+        return self._speculative_prefetch
+
+    def set_speculative_prefetch(self, speculative_prefetch: bool):
+
+        self._speculative_prefetch = speculative_prefetch
+
+    def get_rpc_concurrency(self) -> int:
+
+        return self._rpc_concurrency
+
+    def set_rpc_concurrency(self, rpc_concurrency: int):
+
+        self._rpc_concurrency = rpc_concurrency
+
     def get_log_storage(self) -> EVMLogStorage:
 
         return self._log_storage
@@ -2,30 +2,362 @@
 Top level file that controls the VM environment and process
 """
 
-from .evm import EVM
+from .evm import EVM, LAST_PRECOMPILE
 from .input import EVMInput
-from .bytecode import EVMInstruction
-from .utils.operations import match_insn
+from .bytecode import _stack_inputs, _stack_outputs
+from .tracer import EVMTracer, EVMPrintTracer, EVMStepView
+from .prefetch import EVMSpeculativePrefetcher
+from .provider import EVMAsyncJSONRPCProvider
+from .utils.address import EVMAddress
+from .utils.u256 import U256
+from .utils.gas import static_gas
+from .utils.operations import jump_table
+from .utils.exceptions import EVMInsufficientGas, EVMEmptyStack, EVMStackOverFlow, EVMInvalidJumpDesination, EVMInstructionNotFound, EVMStaticStateChange, EVMMemoryOffsetTooLarge, EVMReturnDataOutOfBounds, EVMExecutionReverted
+
+# Errors that end the executing frame the way the EVM specifies (consuming all
+# of its gas and undoing its state changes) rather than aborting execution
+EXCEPTIONAL_HALTS = (
+    EVMInsufficientGas,
+    EVMEmptyStack,
+    EVMStackOverFlow,
+    EVMInvalidJumpDesination,
+    EVMInstructionNotFound,
+    EVMStaticStateChange,
+    EVMMemoryOffsetTooLarge,
+    EVMReturnDataOutOfBounds
+)
 
 class EVMInterpreter():
 
-    def __init__(self, input: EVMInput):
+    def __init__(self, input: EVMInput, tracer: EVMTracer = None, prefetcher: EVMSpeculativePrefetcher = None):
 
         self._evm = EVM(input)
 
+        if tracer is None and self._evm._verbosity == "trace":
+
+            tracer = EVMPrintTracer()
+
+        self._tracer = tracer
+
+        # A prefetcher created here (rather than handed in) is closed once
+        # execution finishes
+        self._owns_prefetcher = False
+
+        if prefetcher is None and input.get_speculative_prefetch():
+
+            prefetcher = EVMSpeculativePrefetcher(
+                EVMAsyncJSONRPCProvider(concurrency = input.get_rpc_concurrency())
+            )
+            self._owns_prefetcher = True
+
+        self._prefetcher = prefetcher
+
+    def get_evm(self) -> EVM:
+
+        return self._evm
+
+    def set_tracer(self, tracer: EVMTracer):
+
+        self._tracer = tracer
+
+    def get_tracer(self) -> EVMTracer:
+
+        return self._tracer
+
     def run_evm(self):
 
-        while not self._evm._stop:
+        evm = self._evm
+
+        if self._prefetcher is not None:
+
+            self._speculate()
+
+        # The outermost frame is undone like any call when it fails
+        snapshot = evm._storage.snapshot()
+        log_count = len(evm._log_storage.get_logs())
+
+        if self._tracer is not None:
+
+            self._tracer.on_tx_start(evm._tx.get_gas_limit())
+
+        try:
+
+            if self._tracer is None:
+
+                self._run()
+
+            else:
+
+                self._run_traced(self._tracer)
+
+        except Exception:
+
+            evm._storage.revert(snapshot)
+            evm._log_storage.truncate(log_count)
+
+            if self._tracer is not None:
+                # A transaction halting exceptionally consumes all of its gas
+                self._tracer.on_tx_end(evm._tx.get_gas_limit())
+
+            raise
+
+        finally:
+
+            if self._owns_prefetcher:
+
+                self._prefetcher.close()
+                # The storage may outlive this run (see simulate_batch())
+                evm._storage.drop_speculation()
+
+        if evm._reverted:
+
+            evm._storage.revert(snapshot)
+            evm._log_storage.truncate(log_count)
+            evm._gas_refund = 0
+
+        else:
+
+            evm._storage.commit(snapshot)
+
+        if self._tracer is not None:
+
+            self._tracer.on_tx_end(evm.get_receipt_gas_used())
+
+        if evm._verbosity != "silent":
+
+            evm.print_summary()
+
+    def _speculate(self):
+        """
+        Starts fetching every address pushed by a PUSH20 in the program in the
+        background, as those are likely to be called
+        """
+        addresses = [
+            EVMAddress(uint = U256.of(value))
+            for value in self._evm._rom.get_push20_values()
+            if value > LAST_PRECOMPILE
+        ]
+
+        self._evm._storage.speculate(addresses, self._prefetcher)
+
+    def _run(self):
+        """
+        Executes the loaded program until it stops. No output of any kind is
+        produced while executing
+
+        A call that halts exceptionally ends its frame and execution resumes
+        in the caller. Only an exceptional halt of the outermost frame is
+        raised
+        """
+        evm = self._evm
+
+        while True:
+
+            try:
+
+                self._run_frames()
+                return
+
+            except EXCEPTIONAL_HALTS as error:
+
+                if len(evm._frames) == 0:
+
+                    raise
+
+                evm.exit_frame(error)
+
+    def _run_frames(self):
+        """
+        Executes blocks of the executing frame, switching frames as calls
+        start and stop, until the outermost frame stops
+        """
+        evm = self._evm
+        # Decoded program arrays are consumed directly, and reloaded whenever
+        # a call switches the executing frame
+        rom = evm._rom
+        code = rom._code
+        blocks = rom._blocks
+        size = rom._size
+
+        while True:
+
+            if evm._rom is not rom:
+
+                rom = evm._rom
+                code = rom._code
+                blocks = rom._blocks
+                size = rom._size
+
+            if evm._stop or evm._pc >= size:
+                # Running off the end of the code is an implicit STOP
+                if len(evm._frames) == 0:
+
+                    evm._stop = True
+                    return
+
+                evm.exit_frame()
+                continue
+
+            # Execution only ever enters code at the start of a basic block, so
+            # static gas and stack bounds are checked once for the whole block
+            block_gas, stack_required, stack_growth, insn_count = blocks[evm._pc]
+
+            if evm._gas < block_gas:
+
+                raise EVMInsufficientGas()
+
+            evm._gas -= block_gas
+
+            stack_height = len(evm._stack)
+
+            if stack_height < stack_required:
+
+                raise EVMEmptyStack()
+
+            if stack_height + stack_growth > 1024:
+
+                raise EVMStackOverFlow()
+
+            for _ in range(insn_count):
+
+                jump_table[code[evm._pc]](evm)
+
+    def _run_traced(self, tracer: EVMTracer):
+        """
+        Executes the loaded program until it stops, notifying tracer of every
+        step. Static gas and stack bounds are checked per instruction rather
+        than per block so the gas reported at each step is exact
+        """
+        evm = self._evm
+        msg = evm._msg
+
+        step = EVMStepView(evm)
+        step._depth = evm._frame_number + 1
+
+        # Gas each executing frame started with, innermost last
+        frame_gas = [evm._gas]
+
+        tracer.on_enter(
+            "CALL",
+            msg.get_sender().get_hex(),
+            msg.get_recipient().get_hex(),
+            msg.get_data(),
+            evm._gas,
+            msg.get_value(),
+            step._depth
+        )
+
+        while True:
+
+            try:
+
+                self._run_frames_traced(tracer, step, frame_gas)
+                break
+
+            except Exception as error:
+
+                if len(evm._frames) == 0 or not isinstance(error, EXCEPTIONAL_HALTS):
+                    # Frames still executing are reported as failed
+                    tracer.on_exit("", frame_gas.pop() - evm._gas, error)
+
+                    while len(frame_gas) != 0:
+
+                        tracer.on_exit("", frame_gas.pop(), error)
+
+                    raise
+
+                tracer.on_exit("", frame_gas.pop(), error)
+                evm.exit_frame(error)
+                step._depth = evm._frame_number + 1
+
+        tracer.on_exit(evm._output.hex(), frame_gas.pop() - evm._gas, self._revert_error())
+
+    def _revert_error(self) -> Exception:
+        """
+        Returns the error reported to tracers for the frame that just stopped,
+        None unless it ended with REVERT
+        """
+        return EVMExecutionReverted() if self._evm._reverted else None
+
+    def _run_frames_traced(self, tracer: EVMTracer, step: EVMStepView, frame_gas: list):
+        """
+        Traced counterpart of _run_frames(), executing one instruction at a
+        time
+        """
+        evm = self._evm
+        rom = evm._rom
+        code = rom._code
+        size = rom._size
+
+        while True:
+
+            if evm._rom is not rom:
+
+                rom = evm._rom
+                code = rom._code
+                size = rom._size
+
+            pc = evm._pc
+
+            if evm._stop or pc >= size:
+
+                if len(evm._frames) == 0:
+
+                    evm._stop = True
+                    return
+
+                tracer.on_exit(evm._output.hex(), frame_gas.pop() - evm._gas, self._revert_error())
+                evm.exit_frame()
+                step._depth = evm._frame_number + 1
+                continue
+
+            opcode = code[pc]
+
+            step._pc = pc
+            step._opcode = opcode
+            step._gas = evm._gas
+
+            tracer.on_step(step)
+
+            try:
+
+                if evm._gas < static_gas[opcode]:
+
+                    raise EVMInsufficientGas()
+
+                stack_height = len(evm._stack)
+
+                if stack_height < _stack_inputs[opcode]:
+
+                    raise EVMEmptyStack()
+
+                if stack_height - _stack_inputs[opcode] + _stack_outputs[opcode] > 1024:
+
+                    raise EVMStackOverFlow()
 
-            insn_to_execute = self._evm.grab_insn()
+                evm._gas -= static_gas[opcode]
 
-            match_insn(self._evm, insn_to_execute)
+                jump_table[opcode](evm)
 
-            self._evm.print_stack()
-            self._evm.print_memory()
+            except Exception as error:
 
-            if self._evm._rom.is_end_of_program(self._evm._pc):
+                tracer.on_fault(step, error)
+                raise
 
-                self._evm._stop = True
+            if evm._frame_number + 1 != step._depth:
+                # A call started a new frame
+                frame = evm.get_frame()
+                msg = evm._msg
 
+                step._depth = evm._frame_number + 1
+                frame_gas.append(evm._gas)
 
+                tracer.on_enter(
+                    frame.get_call_type(),
+                    msg.get_sender().get_hex(),
+                    frame.get_code_address().get_hex(),
+                    msg.get_data(),
+                    evm._gas,
+                    msg.get_value(),
+                    step._depth
+                )
@@ -6,9 +6,11 @@ from .utils.address import EVMAddress
 class EVMLog:
     """
     Class representing Ethereum Logs
+
+    Data and topics are stored as bytes, topics being 32 bytes long
     """
     
-    def __init__(self, address: EVMAddress, data: str, topic0: str = None, topic1: str = None, topic2: str = None, topic3: str = None):
+    def __init__(self, address: EVMAddress, data: bytes, topic0: bytes = None, topic1: bytes = None, topic2: bytes = None, topic3: bytes = None):
 
         self._address = address
         self._data = data
@@ -17,6 +19,20 @@ class EVMLog:
         self._topic2 = topic2
         self._topic3 = topic3
 
+    def get_address(self) -> EVMAddress:
+
+        return self._address
+
+    def get_data(self) -> bytes:
+
+        return self._data
+
+    def get_topics(self) -> list:
+
+        topics = [self._topic0, self._topic1, self._topic2, self._topic3]
+
+        return [topic for topic in topics if topic is not None]
+
 class EVMLogStorage:
     """
     Class responsible for storing EVMLog objects across multiple execution contexts
@@ -27,4 +43,15 @@ class EVMLogStorage:
 
     def add_log(self, log: EVMLog):
 
-        self._logs.append(log)
\ No newline at end of file
+        self._logs.append(log)
+
+    def get_logs(self) -> list:
+
+        return self._logs
+
+    def truncate(self, count: int):
+        """
+        Drops every log emitted after the first count, used when the call
+        frame that emitted them reverts
+        """
+        del self._logs[count:]
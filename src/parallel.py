@@ -0,0 +1,77 @@
+"""
+Module containing the parallel simulation of independent transactions over
+a process pool
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .input import EVMInput
+from .simulation import simulate_transaction
+
+# State every transaction of the worker process starts from, set once by
+# _init_worker()
+_base_state: EVMInput = None
+
+def _init_worker(base_state: EVMInput):
+
+    global _base_state
+    _base_state = base_state
+
+def _simulate_chunk(start: int, transactions: list) -> list:
+    """
+    Simulates transactions one after the other from the same pre-state and
+    returns (index, EVMSimulationResult) tuples, start being the index of the
+    first one
+
+    Every transaction is undone once simulated, but state pulled from the
+    node stays stored locally for the ones that follow
+    """
+    storage = _base_state.get_storage()
+    results = []
+
+    for offset, transaction in enumerate(transactions):
+
+        id = storage.snapshot()
+
+        try:
+
+            results.append((start + offset, simulate_transaction(transaction, _base_state)))
+
+        finally:
+
+            storage.revert(id)
+
+    return results
+
+def simulate_parallel(transactions: list, base_state: EVMInput, max_workers: int = None, chunk_size: int = 1):
+    """
+    Simulates every transaction in transactions from the state of base_state
+    across a pool of max_workers processes (one per CPU by default), yielding
+    (index, EVMSimulationResult) tuples as they complete, index being the
+    position of the transaction in transactions
+
+    Transactions are independent: each one starts from the state of
+    base_state, never from the effects of another. base_state is pickled once
+    per worker rather than once per transaction, and is left untouched apart
+    from its access map being emptied (see EVMStorage.finalize()).
+    Transactions are sent to the workers chunk_size at a time, so larger
+    chunks trade how soon results stream back for less overhead per
+    transaction
+    """
+    base_state.get_storage().finalize()
+
+    executor = ProcessPoolExecutor(max_workers, initializer = _init_worker, initargs = (base_state,))
+
+    try:
+
+        futures = [
+            executor.submit(_simulate_chunk, start, transactions[start:start + chunk_size])
+            for start in range(0, len(transactions), chunk_size)
+        ]
+
+        for future in as_completed(futures):
+
+            yield from future.result()
+
+    finally:
+        # Transactions not yet started are dropped if iteration stops early
+        executor.shutdown(cancel_futures = True)
@@ -0,0 +1,56 @@
+"""
+Module containing the speculative prefetcher, which pulls contracts the
+program is likely to touch on a background event loop while it executes
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from .provider import EVMAsyncStateProvider
+from .utils.address import EVMAddress
+
+class EVMSpeculativePrefetcher():
+    """
+    Runs an asyncio event loop on a daemon thread, fetching the accounts it
+    is handed through an EVMAsyncStateProvider. Fetches run concurrently, up
+    to the provider's concurrency limit, while the interpreter keeps going
+    """
+
+    def __init__(self, provider: EVMAsyncStateProvider):
+
+        self._provider = provider
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target = self._loop.run_forever, daemon = True)
+        self._thread.start()
+
+    def submit(self, address: EVMAddress, block_number: int) -> Future:
+        """
+        Starts fetching address, returning a Future of its (code, balance)
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._provider.get_account(address, block_number),
+            self._loop
+        )
+
+    def close(self):
+        """
+        Cancels outstanding fetches, closes the provider and stops the loop.
+        Every Future handed out by submit() is done once close() returns
+        """
+        async def shutdown():
+
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+            for task in tasks:
+
+                task.cancel()
+
+            # Fetches may still await while cancelling, and their Futures are
+            # only settled once they finish
+            await asyncio.gather(*tasks, return_exceptions = True)
+            await self._provider.close()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
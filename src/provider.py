@@ -0,0 +1,587 @@
+"""
+Module containing the state providers used by EVMStorageMap to pull contract
+data that is not stored locally
+"""
+import asyncio
+import os
+import sqlite3
+from .utils.address import EVMAddress
+from .utils.exceptions import EVMMissingAPIURL, EVMRPCError
+
+class EVMStateProvider():
+    """
+    Interface of all state providers. Every query is made against the state
+    of the chain at the end of block_number
+
+    Queries passed to get_batch() are tuples of one of the following forms,
+    answered with the same value as the matching single query:
+
+    ("code", address)
+    ("balance", address)
+    ("nonce", address)
+    ("slot", address, slot)
+    """
+
+    def get_code(self, address: EVMAddress, block_number: int) -> bytes:
+
+        raise NotImplementedError()
+
+    def get_balance(self, address: EVMAddress, block_number: int) -> int:
+
+        raise NotImplementedError()
+
+    def get_nonce(self, address: EVMAddress, block_number: int) -> int:
+
+        raise NotImplementedError()
+
+    def get_storage_at(self, address: EVMAddress, slot: int, block_number: int) -> int:
+
+        raise NotImplementedError()
+
+    def has_account(self, address: EVMAddress, block_number: int) -> bool:
+        """
+        Returns whether the code and balance of address can be answered
+        without a request. Only caching providers hold accounts locally
+        """
+        return False
+
+    def add_account(self, address: EVMAddress, block_number: int, code: bytes, balance: int):
+        """
+        Hands the code and balance of address, fetched elsewhere (see
+        EVMSpeculativePrefetcher), to the provider. Only caching providers keep
+        them
+        """
+        pass
+
+    def get_batch(self, queries: list, block_number: int) -> list:
+        """
+        Answers every query in queries, returning the results in order.
+        Providers that can do better than one request per query override this
+        """
+        results = []
+
+        for query in queries:
+
+            if query[0] == "code":
+
+                results.append(self.get_code(query[1], block_number))
+
+            elif query[0] == "balance":
+
+                results.append(self.get_balance(query[1], block_number))
+
+            elif query[0] == "nonce":
+
+                results.append(self.get_nonce(query[1], block_number))
+
+            else:
+
+                results.append(self.get_storage_at(query[1], query[2], block_number))
+
+        return results
+
+def _rpc_request(id: int, query: tuple, block_number: int) -> dict:
+    """
+    Returns the JSON-RPC request answering a get_batch() query
+    """
+    address = query[1].get_hex_with_prefix()
+    block = hex(block_number)
+
+    if query[0] == "code":
+
+        method, params = "eth_getCode", [address, block]
+
+    elif query[0] == "balance":
+
+        method, params = "eth_getBalance", [address, block]
+
+    elif query[0] == "nonce":
+
+        method, params = "eth_getTransactionCount", [address, block]
+
+    else:
+
+        method, params = "eth_getStorageAt", [address, hex(query[2]), block]
+
+    return {"jsonrpc": "2.0", "id": id, "method": method, "params": params}
+
+def _rpc_decode(query: tuple, response: dict):
+    """
+    Returns the result of a JSON-RPC response to a get_batch() query
+    """
+    if "error" in response:
+
+        raise EVMRPCError(response["error"])
+
+    result = response["result"]
+
+    if query[0] == "code":
+
+        return bytes.fromhex(result[2:])
+
+    return int(result, 16)
+
+class EVMJSONRPCProvider(EVMStateProvider):
+    """
+    State provider speaking JSON-RPC to the node at url, API_URL by default
+
+    Requests go through a single requests.Session, so the connection is kept
+    alive between them. get_batch() sends JSON-RPC batch requests of up to
+    batch_size queries each
+    """
+
+    def __init__(self, url: str = None, batch_size: int = 100):
+
+        self._url = url
+        self._batch_size = batch_size
+        self._session = None
+        self._next_id = 0
+
+    def __getstate__(self) -> dict:
+        """
+        The session isn't pickled, a new one is opened once needed
+        """
+        state = self.__dict__.copy()
+        state["_session"] = None
+
+        return state
+
+    def _post(self, payload):
+
+        if self._session is None:
+
+            if self._url is None:
+
+                self._url = os.getenv("API_URL")
+
+            if not self._url:
+
+                raise EVMMissingAPIURL()
+
+            import requests
+
+            self._session = requests.Session()
+
+        response = self._session.post(self._url, json = payload)
+        response.raise_for_status()
+
+        return response.json()
+
+    def _request(self, query: tuple, block_number: int) -> dict:
+
+        self._next_id += 1
+
+        return _rpc_request(self._next_id, query, block_number)
+
+    def get_code(self, address: EVMAddress, block_number: int) -> bytes:
+
+        return self.get_batch([("code", address)], block_number)[0]
+
+    def get_balance(self, address: EVMAddress, block_number: int) -> int:
+
+        return self.get_batch([("balance", address)], block_number)[0]
+
+    def get_nonce(self, address: EVMAddress, block_number: int) -> int:
+
+        return self.get_batch([("nonce", address)], block_number)[0]
+
+    def get_storage_at(self, address: EVMAddress, slot: int, block_number: int) -> int:
+
+        return self.get_batch([("slot", address, slot)], block_number)[0]
+
+    def get_batch(self, queries: list, block_number: int) -> list:
+
+        results = []
+
+        for start in range(0, len(queries), self._batch_size):
+
+            chunk = queries[start:start + self._batch_size]
+            requests = [self._request(query, block_number) for query in chunk]
+
+            if len(requests) == 1:
+
+                responses = [self._post(requests[0])]
+
+            else:
+
+                # Batch responses may come back in any order
+                by_id = {response["id"]: response for response in self._post(requests)}
+                responses = [by_id[request["id"]] for request in requests]
+
+            for query, response in zip(chunk, responses):
+
+                results.append(_rpc_decode(query, response))
+
+        return results
+
+class EVMWeb3Provider(EVMStateProvider):
+    """
+    State provider querying the RPC node at url, API_URL by default. The
+    connection is only set up once state is first requested
+    """
+
+    def __init__(self, url: str = None):
+
+        self._url = url
+        self._w3 = None
+
+    def __getstate__(self) -> dict:
+        """
+        The connection isn't pickled, a new one is set up once needed
+        """
+        state = self.__dict__.copy()
+        state["_w3"] = None
+
+        return state
+
+    def _eth(self):
+
+        if self._w3 is None:
+
+            url = self._url if self._url is not None else os.getenv("API_URL")
+
+            if not url:
+
+                raise EVMMissingAPIURL()
+
+            from web3 import Web3
+
+            self._w3 = Web3(Web3.HTTPProvider(url))
+
+        return self._w3.eth
+
+    @staticmethod
+    def _checksum(address: EVMAddress) -> str:
+
+        from web3 import Web3
+
+        return Web3.toChecksumAddress(address.get_hex_with_prefix())
+
+    def get_code(self, address: EVMAddress, block_number: int) -> bytes:
+
+        return bytes(self._eth().get_code(self._checksum(address), block_number))
+
+    def get_balance(self, address: EVMAddress, block_number: int) -> int:
+
+        return int(self._eth().get_balance(self._checksum(address), block_number))
+
+    def get_nonce(self, address: EVMAddress, block_number: int) -> int:
+
+        return int(self._eth().get_transaction_count(self._checksum(address), block_number))
+
+    def get_storage_at(self, address: EVMAddress, slot: int, block_number: int) -> int:
+
+        value = self._eth().get_storage_at(self._checksum(address), slot, block_number)
+
+        return int.from_bytes(bytes(value), "big")
+
+class EVMCachedProvider(EVMStateProvider):
+    """
+    State provider answering from a SQLite file when it can and falling back
+    to another provider otherwise, storing whatever it fetches
+
+    Entries are keyed by chain id, block number, address and slot, so one
+    cache file can be shared by simulations of different chains and blocks.
+    Every miss costs a round-trip to the wrapped provider, which dwarfs the
+    cost of committing the new entry right away
+    """
+
+    # Slot column values of the non-storage entries of an account
+    _CODE = "code"
+    _BALANCE = "balance"
+    _NONCE = "nonce"
+
+    def __init__(self, provider: EVMStateProvider, path: str, chain_id: int):
+
+        self._provider = provider
+        self._chain_id = chain_id
+        self._path = path
+
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "chain_id INTEGER NOT NULL, "
+            "block_number INTEGER NOT NULL, "
+            "address TEXT NOT NULL, "
+            "slot TEXT NOT NULL, "
+            "value BLOB NOT NULL, "
+            "PRIMARY KEY (chain_id, block_number, address, slot))"
+        )
+        self._db.commit()
+
+        self._hits = 0
+        self._misses = 0
+
+    def __getstate__(self) -> dict:
+        """
+        The connection to the cache file isn't pickled, the file is opened
+        again on unpickling
+        """
+        state = self.__dict__.copy()
+        del state["_db"]
+
+        return state
+
+    def __setstate__(self, state: dict):
+
+        self.__dict__.update(state)
+        self._db = sqlite3.connect(self._path)
+
+    def _lookup(self, address: EVMAddress, slot: str, block_number: int) -> bytes:
+
+        row = self._db.execute(
+            "SELECT value FROM state WHERE chain_id = ? AND block_number = ? AND address = ? AND slot = ?",
+            (self._chain_id, block_number, address.get_hex(), slot)
+        ).fetchone()
+
+        if row is None:
+
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return row[0]
+
+    def _insert(self, address: EVMAddress, slot: str, block_number: int, value: bytes, commit: bool = True):
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?, ?)",
+            (self._chain_id, block_number, address.get_hex(), slot, value)
+        )
+
+        if commit:
+
+            self._db.commit()
+
+    def _key(self, query: tuple) -> str:
+        """
+        Returns the slot column value of a get_batch() query
+        """
+        if query[0] == "code":
+
+            return self._CODE
+
+        elif query[0] == "balance":
+
+            return self._BALANCE
+
+        elif query[0] == "nonce":
+
+            return self._NONCE
+
+        return f"{query[2]:064x}"
+
+    def get_code(self, address: EVMAddress, block_number: int) -> bytes:
+
+        code = self._lookup(address, self._CODE, block_number)
+
+        if code is None:
+
+            code = self._provider.get_code(address, block_number)
+            self._insert(address, self._CODE, block_number, code)
+
+        return bytes(code)
+
+    def get_balance(self, address: EVMAddress, block_number: int) -> int:
+
+        balance = self._lookup(address, self._BALANCE, block_number)
+
+        if balance is None:
+
+            value = self._provider.get_balance(address, block_number)
+            self._insert(address, self._BALANCE, block_number, value.to_bytes(32, "big"))
+
+            return value
+
+        return int.from_bytes(balance, "big")
+
+    def get_nonce(self, address: EVMAddress, block_number: int) -> int:
+
+        nonce = self._lookup(address, self._NONCE, block_number)
+
+        if nonce is None:
+
+            value = self._provider.get_nonce(address, block_number)
+            self._insert(address, self._NONCE, block_number, value.to_bytes(32, "big"))
+
+            return value
+
+        return int.from_bytes(nonce, "big")
+
+    def has_account(self, address: EVMAddress, block_number: int) -> bool:
+
+        count = self._db.execute(
+            "SELECT COUNT(*) FROM state WHERE chain_id = ? AND block_number = ? AND address = ? AND slot IN (?, ?)",
+            (self._chain_id, block_number, address.get_hex(), self._CODE, self._BALANCE)
+        ).fetchone()[0]
+
+        return count == 2
+
+    def add_account(self, address: EVMAddress, block_number: int, code: bytes, balance: int):
+
+        self._insert(address, self._CODE, block_number, code, commit = False)
+        self._insert(address, self._BALANCE, block_number, balance.to_bytes(32, "big"))
+
+    def get_batch(self, queries: list, block_number: int) -> list:
+
+        results = [None] * len(queries)
+        missing = []
+
+        for i, query in enumerate(queries):
+
+            stored = self._lookup(query[1], self._key(query), block_number)
+
+            if stored is None:
+
+                missing.append(i)
+
+            elif query[0] == "code":
+
+                results[i] = bytes(stored)
+
+            else:
+
+                results[i] = int.from_bytes(stored, "big")
+
+        if len(missing) == 0:
+
+            return results
+
+        fetched = self._provider.get_batch([queries[i] for i in missing], block_number)
+
+        for i, value in zip(missing, fetched):
+
+            query = queries[i]
+            results[i] = value
+
+            stored = value if query[0] == "code" else value.to_bytes(32, "big")
+            self._insert(query[1], self._key(query), block_number, stored, commit = False)
+
+        # One commit for the whole batch
+        self._db.commit()
+
+        return results
+
+    def get_storage_at(self, address: EVMAddress, slot: int, block_number: int) -> int:
+
+        key = f"{slot:064x}"
+        stored = self._lookup(address, key, block_number)
+
+        if stored is None:
+
+            value = self._provider.get_storage_at(address, slot, block_number)
+            self._insert(address, key, block_number, value.to_bytes(32, "big"))
+
+            return value
+
+        return int.from_bytes(stored, "big")
+
+    def get_hits(self) -> int:
+
+        return self._hits
+
+    def get_misses(self) -> int:
+
+        return self._misses
+
+    def close(self):
+
+        self._db.close()
+
+class EVMAsyncStateProvider():
+    """
+    Interface of state providers usable from asyncio code. get_many() runs
+    its queries (see EVMStateProvider) concurrently
+    """
+
+    async def query(self, query: tuple, block_number: int):
+
+        raise NotImplementedError()
+
+    async def get_code(self, address: EVMAddress, block_number: int) -> bytes:
+
+        return await self.query(("code", address), block_number)
+
+    async def get_balance(self, address: EVMAddress, block_number: int) -> int:
+
+        return await self.query(("balance", address), block_number)
+
+    async def get_nonce(self, address: EVMAddress, block_number: int) -> int:
+
+        return await self.query(("nonce", address), block_number)
+
+    async def get_storage_at(self, address: EVMAddress, slot: int, block_number: int) -> int:
+
+        return await self.query(("slot", address, slot), block_number)
+
+    async def get_many(self, queries: list, block_number: int) -> list:
+
+        return list(await asyncio.gather(*[self.query(query, block_number) for query in queries]))
+
+    async def get_account(self, address: EVMAddress, block_number: int) -> tuple:
+        """
+        Returns the (code, balance) of address
+        """
+        return tuple(await self.get_many([("code", address), ("balance", address)], block_number))
+
+    async def close(self):
+
+        pass
+
+class EVMAsyncJSONRPCProvider(EVMAsyncStateProvider):
+    """
+    Async state provider speaking JSON-RPC to the node at url, API_URL by
+    default, through an aiohttp session. At most concurrency requests are in
+    flight at any time
+    """
+
+    def __init__(self, url: str = None, concurrency: int = 16):
+
+        self._url = url
+        self._concurrency = concurrency
+        self._session = None
+        self._semaphore = None
+        self._next_id = 0
+
+    def _open(self):
+        """
+        Creates the session and semaphore, which are tied to the event loop
+        running when they are first needed
+        """
+        if self._url is None:
+
+            self._url = os.getenv("API_URL")
+
+        if not self._url:
+
+            raise EVMMissingAPIURL()
+
+        import aiohttp
+
+        self._session = aiohttp.ClientSession()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+
+    async def query(self, query: tuple, block_number: int):
+
+        if self._session is None:
+
+            self._open()
+
+        self._next_id += 1
+        request = _rpc_request(self._next_id, query, block_number)
+
+        async with self._semaphore:
+
+            async with self._session.post(self._url, json = request) as response:
+
+                response.raise_for_status()
+                body = await response.json()
+
+        return _rpc_decode(query, body)
+
+    async def close(self):
+
+        if self._session is not None:
+
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,219 @@
+"""
+Module containing the simulation of batches of transactions over a shared
+state
+"""
+import copy
+
+from .input import EVMInput
+from .interpreter import EVMInterpreter, EXCEPTIONAL_HALTS
+from .logs import EVMLogStorage
+from .state import EVMStorage
+from .utils.address import EVMAddress
+from .utils.u256 import U256
+from .utils.exceptions import EVMInsufficientBalance
+
+class EVMSimulationResult():
+    """
+    Outcome of one of the transactions simulated by simulate_batch()
+
+    state_diff is shaped like the return value of EVMStorage.get_state_diff().
+    A failed transaction has no logs, its only state change being the gas fee
+    paid by its sender, and error is the exception that halted it unless it
+    ended with REVERT. A transaction whose sender can't pay for it isn't
+    executed at all, its error being EVMInsufficientBalance
+    """
+
+    def __init__(self, success: bool, gas_used: int, gas_refund: int, output: bytes, logs: list, state_diff: dict, error: Exception = None):
+
+        self._success = success
+        self._gas_used = gas_used
+        self._gas_refund = gas_refund
+        self._output = output
+        self._logs = logs
+        self._state_diff = state_diff
+        self._error = error
+
+    def is_success(self) -> bool:
+
+        return self._success
+
+    def get_gas_used(self) -> int:
+
+        return self._gas_used
+
+    def get_gas_refund(self) -> int:
+
+        return self._gas_refund
+
+    def get_output(self) -> bytes:
+
+        return self._output
+
+    def get_logs(self) -> list:
+
+        return self._logs
+
+    def get_state_diff(self) -> dict:
+
+        return self._state_diff
+
+    def get_error(self) -> Exception:
+
+        return self._error
+
+def simulate_transaction(transaction: dict, base_state: EVMInput) -> EVMSimulationResult:
+    """
+    Executes transaction, a dict shaped like the [transaction] section of
+    execution.toml, against the state of base_state and returns its
+    EVMSimulationResult
+
+    The sender pays for the gas limit at the gas price up front, and is
+    handed back the price of the gas left over (refunds included) once the
+    transaction ends. Its value is then moved from the sender to the
+    recipient. A transaction that reverts or halts exceptionally has its
+    value transfer and state changes undone, but still pays for its gas. Any
+    other error is raised. The state changes of a successful transaction are
+    kept, but the transaction isn't finalized (see EVMStorage.finalize()), so
+    an enclosing snapshot can still undo it
+    """
+    storage = base_state.get_storage()
+
+    evm_input = copy.copy(base_state)
+    evm_input.load_transaction(transaction)
+    evm_input.set_log_storage(EVMLogStorage())
+
+    sender = evm_input.get_from()
+    value = evm_input.get_value()
+    gas_limit = evm_input.get_tx_gas_limit()
+    gas_price = evm_input.get_gas_price()
+
+    # Kept open for the whole transaction, its state diff being taken from it
+    id = storage.snapshot()
+
+    if value != 0 or gas_price != 0:
+
+        balance = storage.get_contract_balance(sender).to_int()
+
+        if balance < value + gas_limit * gas_price:
+
+            storage.revert(id)
+
+            return EVMSimulationResult(False, 0, 0, b"", [], {}, EVMInsufficientBalance())
+
+        storage.set_contract_balance(sender, U256.of(balance - gas_limit * gas_price))
+
+    # Undoes the value transfer and execution if the transaction fails,
+    # leaving the gas payment
+    execution_id = storage.snapshot()
+    error = None
+
+    try:
+
+        if value != 0:
+
+            _transfer(storage, sender, evm_input.get_to(), value)
+
+        evm_input.warm_access_list()
+
+        program = EVMInterpreter(evm_input)
+        program.run_evm()
+
+    except EXCEPTIONAL_HALTS as halt:
+
+        error = halt
+
+    except Exception:
+
+        storage.revert(id)
+        raise
+
+    if error is not None:
+
+        storage.revert(execution_id)
+        _repay_gas(storage, sender, gas_limit, gas_limit, 0, gas_price)
+
+        state_diff = storage.get_state_diff(id)
+        storage.commit(id)
+
+        return EVMSimulationResult(False, gas_limit, 0, b"", [], state_diff, error)
+
+    evm = program.get_evm()
+
+    if evm.is_reverted():
+
+        storage.revert(execution_id)
+        _repay_gas(storage, sender, gas_limit, evm.get_gas_used(), 0, gas_price)
+
+        state_diff = storage.get_state_diff(id)
+        storage.commit(id)
+
+        return EVMSimulationResult(False, evm.get_gas_used(), 0, evm.get_output(), [], state_diff)
+
+    storage.commit(execution_id)
+    _repay_gas(storage, sender, gas_limit, evm.get_gas_used(), evm.get_gas_refund(), gas_price)
+
+    state_diff = storage.get_state_diff(id)
+    storage.commit(id)
+
+    return EVMSimulationResult(
+        True,
+        evm.get_gas_used(),
+        evm.get_gas_refund(),
+        evm.get_output(),
+        evm_input.get_log_storage().get_logs(),
+        state_diff
+    )
+
+def _transfer(storage: EVMStorage, sender: EVMAddress, recipient: EVMAddress, value: int):
+    """
+    Moves value wei from sender to recipient
+    """
+    storage.set_contract_balance(sender, U256.of(storage.get_contract_balance(sender).to_int() - value))
+    storage.set_contract_balance(recipient, U256.of(storage.get_contract_balance(recipient).to_int() + value))
+
+def _repay_gas(storage: EVMStorage, sender: EVMAddress, gas_limit: int, gas_used: int, gas_refund: int, gas_price: int):
+    """
+    Hands sender back the price of the gas it paid for but didn't use. At
+    most a fifth of the gas used is refunded (EIP-3529)
+    """
+    if gas_price == 0:
+
+        return
+
+    gas_left = gas_limit - gas_used + min(gas_refund, gas_used // 5)
+    balance = storage.get_contract_balance(sender).to_int()
+
+    storage.set_contract_balance(sender, U256.of(balance + gas_left * gas_price))
+
+def simulate_batch(transactions: list, base_state: EVMInput) -> list:
+    """
+    Executes transactions in order, each one seeing the effects of the ones
+    before it, and returns an EVMSimulationResult per transaction (see
+    simulate_transaction())
+
+    transactions is a list of dicts shaped like the [transaction] section of
+    execution.toml. base_state is a loaded EVMInput (see
+    EVMInput.from_toml()) whose chain, block and execution settings apply to
+    every transaction. Its EVMStorage is shared by the whole batch, so state
+    pulled from the node is only pulled once, and holds the state left by the
+    last transaction once simulate_batch() returns. Decoded contract code and
+    hashed preimages are cached across transactions as well
+    """
+    storage = base_state.get_storage()
+    results = []
+
+    # Addresses warmed by the transaction base_state was loaded with are cold
+    # for the batch
+    storage.finalize()
+
+    for transaction in transactions:
+
+        try:
+
+            results.append(simulate_transaction(transaction, base_state))
+
+        finally:
+
+            storage.finalize()
+
+    return results
@@ -3,9 +3,12 @@ Module containg the state class and the storage component of the EVM
 """
 from .utils.u256 import U256
 from .utils.address import EVMAddress
-from dotenv import dotenv_values    
-from web3 import Web3
-import os
+from .provider import EVMStateProvider, EVMJSONRPCProvider
+from .utils.exceptions import EVMInvalidSnapshot
+
+# Seconds grab_contract() waits on a speculative fetch before pulling the
+# contract synchronously instead
+SPECULATIVE_FETCH_TIMEOUT = 30
 
 class EVMGlobalState():
     """
@@ -22,137 +25,332 @@ class EVMGlobalState():
 
 class EVMContractStorage():
 
-        def __init__(self, bytecode: str, slots: dict):
+        def __init__(self, bytecode, slots: dict, fetch_slot = None):
             """
-            Slots maps ints to U256 values
+            bytecode is either a hexadecimal string (with or without prefix)
+            or a bytes object. Slots maps ints to U256 values, the values of
+            the slots before execution
+
+            fetch_slot, if given, is called with the key of any slot that isn't
+            in slots the first time it is read and returns its value as an int.
+            Without it, slots that aren't in slots are 0
             """
-            bytecode = bytecode.lower() 
-            if bytecode[:2] == "0x":
+            if isinstance(bytecode, str):
+
+                bytecode = bytecode.lower() 
+                if bytecode[:2] == "0x":
+
+                    bytecode = bytecode[2:]
 
-                bytecode = bytecode[2:]
+                bytecode = bytes.fromhex(bytecode)
 
-            self._bytecode: str = bytecode
-            self._slots: dict[int: U256] = slots
-            # Copy of original self._slots, immutable
-            self._immutable_slots: dict[int, U256] = slots.copy()
+            self._bytecode: bytes = bytes(bytecode)
+            # Values of the slots before execution, never written to
+            self._original_slots: dict[int, U256] = slots
+            # Current values of the slots written during execution only
+            self._slots: dict[int, U256] = {}
 
-        def add_modified_slot(self, frame_number: int, slot: U256):
+            self._fetch_slot = fetch_slot
 
-            if frame_number not in self._modified_slots:
+        def get_bytecode(self) -> bytes:
 
-                self._modified_slots[frame_number] = set()
+            return self._bytecode
+
+        def get_bytecode_size(self) -> U256:
 
-            self._modified_slots[frame_number].add(slot.to_int())
+            return U256.of(len(self._bytecode))
 
-        def reset_modified_slots(self, frame_number: int):
+        def _load_original(self, key: int) -> U256:
             """
-            To be called at the end of every EVM execution context
+            Fetches the value slot key had before execution and records it.
+            Empty slots are recorded as well, so each slot is fetched at most
+            once
             """
-            if frame_number not in self._modified_slots:
+            if self._fetch_slot is None:
 
-                return
-
-            self._modified_slots[frame_number].clear()
+                return self.add_original_slot_value(key, 0)
 
-        def get_bytecode(self) -> str:
+            return self.add_original_slot_value(key, self._fetch_slot(key))
 
-            return self._bytecode
+        def is_slot_known(self, key: int) -> bool:
+            """
+            Returns whether reading slot key would not need a fetch
+            """
+            return self._fetch_slot is None or key in self._original_slots
 
-        def get_bytecode_size(self) -> U256:
+        def add_original_slot_value(self, key: int, value: int) -> U256:
+            """
+            Records value as the value slot key had before execution
+            """
+            value = U256.of(value)
 
-            size = len(self._bytecode) // 2
+            self._original_slots[key] = value
 
-            return U256(size)
+            return value
 
         def get_slot_value(self, key: int) -> U256:
 
-            if key not in self._slots:
+            value = self._slots.get(key)
 
-                return U256(0)
+            if value is None:
 
-            return self._slots[key]
+                return self.get_imumutable_slot_value(key)
 
-        def get_imumutable_slot_value(self, key: int) -> U256:
+            return value
 
-            if key not in self._immutable_slots:
+        def get_imumutable_slot_value(self, key: int) -> U256:
 
-                return U256(0)
+            if key not in self._original_slots:
 
-            return self._immutable_slots[key]
+                return self._load_original(key)
 
-        def set_slot_value(self, key: int, value: U256):
+            return self._original_slots[key]
 
+        def set_slot_value(self, key: int, value: U256) -> U256:
+            """
+            Writes value to slot key and returns the value previously written
+            to it, None if the slot hadn't been written
+            """
+            previous = self._slots.get(key)
             self._slots[key] = value
 
-        def get_bytecode_custom(self, offset: U256, length: U256) -> str:
+            return previous
+
+        def finalize(self):
+            """
+            Makes the written slot values the original values seen by the
+            next transaction
+            """
+            self._original_slots.update(self._slots)
+            self._slots = {}
+
+        def restore_slot_value(self, key: int, previous: U256):
+            """
+            Undoes set_slot_value(), previous being the value it returned
+            """
+            if previous is None:
 
+                del self._slots[key]
+
+            else:
+
+                self._slots[key] = previous
+
+        def get_bytecode_custom(self, offset: U256, length: U256) -> bytes:
+            """
+            Returns bytecode[offset:offset + length], right padded with zeros
+            if the range runs past the end of the code
+            """
             offset_val = offset.to_int()
             length_val = length.to_int()
 
-            result = ""
+            return self._bytecode[offset_val:offset_val + length_val].ljust(length_val, b"\x00")
+
+class EVMSlotFetcher():
+    """
+    Callable pulling the storage slots of the contract at address from
+    provider, handed to EVMContractStorage as fetch_slot. Unlike a closure, it
+    can be pickled along with the contract
+    """
+
+    def __init__(self, provider: EVMStateProvider, address: EVMAddress, block_number: int):
 
-            for i in range(length_val):
+        self._provider = provider
+        self._address = address
+        self._block_number = block_number
 
-                result = result + self._bytecode[offset_val + (i * 2): offset_val + (i * 2) + 2]
+    def __call__(self, key: int) -> int:
 
-            return result
+        return self._provider.get_storage_at(self._address, key, self._block_number)
 
 class EVMStorageMap():
 
-    def __init__(self, block_number: int):
+    def __init__(self, block_number: int, provider: EVMStateProvider = None):
 
         # Maps contract addresses to contract storage objects
         self._contract_mapping: dict[str: EVMContractStorage] = {}
         # Maps contract address to U256 values representing balances
         self._balance_mapping: dict[str: U256] = {}
 
-        url = os.getenv("API_URL")
-        self._w3 = Web3(Web3.HTTPProvider(url))
+        # Where contracts not stored locally are pulled from. Defaults to the
+        # node at API_URL, connected to only once it is first needed
+        self._provider = provider
+        # Maps addresses being fetched speculatively to Futures of their
+        # (code, balance)
+        self._in_flight = {}
 
         self._block_number = block_number
 
+    def __getstate__(self) -> dict:
+        """
+        Speculative fetches in flight aren't pickled
+        """
+        state = self.__dict__.copy()
+        state["_in_flight"] = {}
+
+        return state
+
+    def get_provider(self) -> EVMStateProvider:
+
+        if self._provider is None:
+
+            self._provider = EVMJSONRPCProvider()
+
+        return self._provider
+
     def grab_contract(self, address: EVMAddress):
         """
         Function that is called whenever the EVM requests data from a smart
         contract, but said contract has no data stored locally. Using the
-        provided RPC URL, grab_contract() pulls all data necessary to store the
-        contract locally
+        state provider, grab_contract() pulls the code and balance of the
+        contract right away. Storage slots are only pulled when first read,
+        as the slots a transaction touches (mappings especially) can't be
+        known in advance
 
         Ref: https://medium.com/coinmonks/a-practical-walkthrough-smart-contract-storage-d3383360ea1b
         """
-        bytecode = str(self._w3.eth.get_code(address.get_hex_with_prefix(), self._block_number))[2:]
-        balance = int(self._w3.eth.get_balance(address.get_hex_with_prefix(), self._block_number))
+        future = self._in_flight.pop(address.get_hex(), None)
+
+        if future is not None:
+
+            try:
+
+                bytecode, balance = future.result(timeout = SPECULATIVE_FETCH_TIMEOUT)
+                # A caching provider keeps the account for later runs
+                self.get_provider().add_account(address, self._block_number, bytecode, balance)
+
+                self._add_fetched_contract(address, bytecode, balance)
+                return
+
+            except Exception:
+                # A failed, cancelled or stalled speculative fetch is retried
+                # synchronously
+                pass
+
+        provider = self.get_provider()
+
+        bytecode = provider.get_code(address, self._block_number)
+        balance = provider.get_balance(address, self._block_number)
+
+        self._add_fetched_contract(address, bytecode, balance)
+
+    def speculate(self, addresses: list, prefetcher):
+        """
+        Starts fetching every address in addresses that isn't stored locally
+        with prefetcher (an EVMSpeculativePrefetcher). If the EVM then needs
+        one of them, grab_contract() waits for its fetch rather than starting
+        another. Addresses the state provider can answer without a request
+        (see EVMCachedProvider) aren't fetched either
+        """
+        provider = self.get_provider()
+
+        for address in addresses:
+
+            hex = address.get_hex()
+
+            if hex in self._contract_mapping or hex in self._in_flight:
+
+                continue
+
+            if not provider.has_account(address, self._block_number):
+
+                self._in_flight[hex] = prefetcher.submit(address, self._block_number)
+
+    def drop_speculation(self):
+        """
+        Forgets every speculative fetch in flight, cancelling those not done
+        yet. Contracts they were fetching are then pulled synchronously when
+        needed
+        """
+        for future in self._in_flight.values():
+
+            future.cancel()
+
+        self._in_flight = {}
+
+    def _add_fetched_contract(self, address: EVMAddress, bytecode: bytes, balance: int):
+        """
+        Stores a contract pulled from the state provider, whose storage slots
+        are pulled as they are read
+        """
+        fetch_slot = EVMSlotFetcher(self.get_provider(), address, self._block_number)
+
+        contract_storage = EVMContractStorage(bytecode, {}, fetch_slot)
+        self.add_contract(address, contract_storage, U256.of(balance))
+
+    def prefetch(self, pairs: list):
+        """
+        Pulls every account and storage slot in pairs that isn't stored
+        locally yet with as few requests as the state provider allows
+
+        pairs is a list of (EVMAddress, slot) tuples, slot being an int or
+        None when only the account itself is needed
+        """
+        account_queries = []
+        slot_queries = []
+        # Accounts and slots already queued, by lowercase hex address
+        accounts = set()
+        slots = set()
 
-        # Maps keys to values, int to U256
-        slot_map: dict[int: U256] = {}
+        for address, slot in pairs:
 
-        zero_counter = 0
-        slot_counter = 0
-        while zero_counter < 0:
+            hex = address.get_hex()
 
-            slot_value = int(str(self._w3.eth.get_storage_at(address.get_hex_with_prefix(), slot_counter, self._block_number)), 16)
+            if hex not in self._contract_mapping and hex not in accounts:
 
-            if slot_value != 0:
-                slot_map[slot_counter] = U256(slot_value)
+                accounts.add(hex)
+                account_queries.append(("code", address))
+                account_queries.append(("balance", address))
 
-            slot_counter += 1
-            zero_counter += 1
+            if slot is None or (hex, slot) in slots:
 
-        contract_storage = EVMContractStorage(bytecode, slot_map)
-        self.add_contract(address, contract_storage, U256(balance))
+                continue
+
+            if hex in accounts or not self._contract_mapping[hex].is_slot_known(slot):
+
+                slots.add((hex, slot))
+                slot_queries.append(("slot", address, slot))
+
+        if len(account_queries) + len(slot_queries) == 0:
+
+            return
+
+        results = self.get_provider().get_batch(account_queries + slot_queries, self._block_number)
+
+        # Accounts first, so the slots have a contract to go into
+        for i in range(0, len(account_queries), 2):
+
+            self._add_fetched_contract(account_queries[i][1], results[i], results[i + 1])
+
+        for query, value in zip(slot_queries, results[len(account_queries):]):
+
+            self._contract_mapping[query[1].get_hex()].add_original_slot_value(query[2], value)
 
     def add_contract(self, address: EVMAddress, data: EVMContractStorage, balance: U256):
 
         self._contract_mapping[address.get_hex()] = data
         self._balance_mapping[address.get_hex()] = balance
 
-    def set_slot_value(self, address: EVMAddress, slot_key: U256, slot_value: U256):
-
+    def set_slot_value(self, address: EVMAddress, slot_key: U256, slot_value: U256) -> U256:
+        """
+        Writes slot_value and returns what set_slot_value() of the contract
+        returned, to be handed back to restore_slot_value() on revert
+        """
         if address.get_hex() not in self._contract_mapping:
 
             self.grab_contract(address)
 
-        self._contract_mapping[address.get_hex()].set_slot_value(slot_key.to_int(), slot_value)
+        return self._contract_mapping[address.get_hex()].set_slot_value(slot_key.to_int(), slot_value)
+
+    def finalize(self):
+
+        for contract in self._contract_mapping.values():
+
+            contract.finalize()
+
+    def restore_slot_value(self, address: EVMAddress, key: int, previous: U256):
+
+        self._contract_mapping[address.get_hex()].restore_slot_value(key, previous)
 
     def get_slot_value(self, address: EVMAddress, slot_key: U256) -> U256:
 
@@ -170,7 +368,7 @@ class EVMStorageMap():
 
         return self._contract_mapping[address.get_hex()].get_imumutable_slot_value(slot_key.to_int())
 
-    def get_contract_bytecode(self, address: EVMAddress) -> str:
+    def get_contract_bytecode(self, address: EVMAddress) -> bytes:
 
         if address.get_hex() not in self._contract_mapping:
 
@@ -186,6 +384,15 @@ class EVMStorageMap():
         
         return self._balance_mapping[address.get_hex()]
 
+    def set_contract_balance(self, address: EVMAddress, balance: U256) -> U256:
+        """
+        Sets the balance of address and returns its previous balance
+        """
+        previous = self.get_contract_balance(address)
+        self._balance_mapping[address.get_hex()] = balance
+
+        return previous
+
     def get_contract_bytecode_size(self, address: EVMAddress) -> U256:
 
         if address.get_hex() not in self._balance_mapping:
@@ -194,7 +401,7 @@ class EVMStorageMap():
         
         return self._contract_mapping[address.get_hex()].get_bytecode_size()
 
-    def get_contract_bytecode_custom(self, address: EVMAddress, offset: U256, length: U256) -> str:
+    def get_contract_bytecode_custom(self, address: EVMAddress, offset: U256, length: U256) -> bytes:
 
         if address.get_hex() not in self._balance_mapping:
 
@@ -202,14 +409,6 @@ class EVMStorageMap():
         
         return self._contract_mapping[address.get_hex()].get_bytecode_custom(offset, length)
 
-    def is_slot_modified(self, address: EVMAddress, frame_number: int, slot: U256):
-
-        if address.get_hex() not in self._contract_mapping:
-
-            self.grab_contract(address)
-
-        return self._contract_mapping[address.get_hex()].is_slot_modified()
-
 class EVMAccessMap():
     """
     Class that incorporates the accessed addresses and the accessed storage
@@ -235,6 +434,14 @@ class EVMAccessMap():
 
         self._touched_storage_slots[address.get_hex()].add(key.to_int())
 
+    def remove_touched_address(self, address: EVMAddress):
+
+        self._touched_addresses.discard(address.get_hex())
+
+    def remove_touched_storage_slot(self, address: EVMAddress, key: U256):
+
+        self._touched_storage_slots[address.get_hex()].discard(key.to_int())
+
     def is_address_touched(self, address: EVMAddress) -> bool:
 
         return address.get_hex() in self._touched_addresses
@@ -258,39 +465,167 @@ class EVMStorage():
     locally. If not, EVMStorage will retrieve said data (and all other data of
     the associated contract address) and will store it locally for the rest of
     the execution runtime.
+
+    While a snapshot is open, every slot write, balance change and newly
+    touched address or slot appends an undo record to a journal. A snapshot
+    maps to a position in the journal, so taking one is O(1) and reverting to
+    one undoes only the changes made since. Snapshot ids are never reused, so
+    an id that has been closed is rejected rather than pointing at a later
+    position
     """
 
-    def __init__(self, block_number):
+    def __init__(self, block_number, provider: EVMStateProvider = None):
 
         self._access_map = EVMAccessMap()
-        self._storage_map = EVMStorageMap(block_number)
+        self._storage_map = EVMStorageMap(block_number, provider)
 
-    def load(self, address: EVMAddress, slot: U256) -> U256:
+        # Undo records, only kept while a snapshot is open
+        self._journal = []
+        # Journal position of each open snapshot by id, oldest first
+        self._snapshots = {}
+        self._next_snapshot = 0
 
-        is_touched = self._access_map.is_storage_slot_touched(address, slot)
+    def snapshot(self) -> int:
+        """
+        Opens a snapshot of the current state and returns its id
+        """
+        id = self._next_snapshot
+        self._next_snapshot += 1
+        self._snapshots[id] = len(self._journal)
 
-        if not is_touched:
+        return id
 
-            self._access_map.add_touched_storage_slot(address, slot)
-        
-        return self._storage_map.get_slot_value(address, slot)
+    def _close_snapshot(self, id: int) -> int:
+        """
+        Closes snapshot id along with every snapshot opened after it and
+        returns its journal position
+        """
+        if id not in self._snapshots:
 
-    def store(self, address: EVMAddress, slot: U256, slot_value: U256):
-        # NEED TO EVENTUALLY IMPLEMENT GAS REFUNDS
-        is_touched = self._access_map.is_storage_slot_touched(address, slot)
+            raise EVMInvalidSnapshot(id)
+
+        while True:
+
+            closed, position = self._snapshots.popitem()
+
+            if closed == id:
+
+                return position
+
+    def revert(self, id: int):
+        """
+        Undoes every change made since snapshot id was taken and closes it
+        """
+        position = self._close_snapshot(id)
+
+        while len(self._journal) > position:
+
+            record = self._journal.pop()
+
+            if record[0] == "slot":
+
+                self._storage_map.restore_slot_value(record[1], record[2], record[3])
+
+            elif record[0] == "balance":
+
+                self._storage_map.set_contract_balance(record[1], record[2])
+
+            elif record[0] == "address":
+
+                self._access_map.remove_touched_address(record[1])
+
+            else: # "touched_slot"
+
+                self._access_map.remove_touched_storage_slot(record[1], record[2])
+
+    def commit(self, id: int):
+        """
+        Keeps the changes made since snapshot id was taken and closes it. Once
+        no snapshot is open, the journal is dropped
+        """
+        self._close_snapshot(id)
+
+        if len(self._snapshots) == 0:
+
+            self._journal.clear()
+
+    def get_state_diff(self, id: int) -> dict:
+        """
+        Returns the changes made since snapshot id was taken, mapping the
+        lowercase hex address of every changed account to a dict with a
+        "storage" dict of slot keys and an optional "balance" entry, each
+        change being a (before, after) tuple of ints
+
+        Slots are compared with their value at the start of the transaction
+        """
+        if id not in self._snapshots:
+
+            raise EVMInvalidSnapshot(id)
+
+        balances = {}
+        slots = {}
+
+        for record in self._journal[self._snapshots[id]:]:
+
+            if record[0] == "balance" and record[1].get_hex() not in balances:
+
+                balances[record[1].get_hex()] = (record[1], record[2].to_int())
 
-        if not is_touched:
+            elif record[0] == "slot":
 
-            self._access_map.add_touched_storage_slot(address, slot)
+                slots[(record[1].get_hex(), record[2])] = record[1]
 
-        # Also need to add contract to touched addresses if not already 
-        is_address_touched = self._access_map.is_address_touched(address)
+        diff = {}
 
-        if not is_address_touched:
+        for hex, (address, before) in balances.items():
 
-            self._access_map.add_touched_address(address)
+            after = self._storage_map.get_contract_balance(address).to_int()
 
-        self._storage_map.set_slot_value(address, slot, slot_value)
+            if before != after:
+
+                diff.setdefault(hex, {"storage": {}})["balance"] = (before, after)
+
+        for (hex, key), address in slots.items():
+
+            before = self._storage_map.get_immutable_slot_value(address, U256.of(key)).to_int()
+            after = self._storage_map.get_slot_value(address, U256.of(key)).to_int()
+
+            if before != after:
+
+                diff.setdefault(hex, {"storage": {}})["storage"][key] = (before, after)
+
+        return diff
+
+    def finalize(self):
+        """
+        Ends the current transaction: every slot written becomes the original
+        value seen by the next transaction and every address and slot is cold
+        again. No snapshot may be open
+        """
+        if self._snapshots:
+
+            raise EVMInvalidSnapshot(next(reversed(self._snapshots)))
+
+        self._storage_map.finalize()
+        self._access_map = EVMAccessMap()
+
+    def load(self, address: EVMAddress, slot: U256) -> U256:
+
+        self.add_touched_storage_slot(address, slot)
+
+        return self._storage_map.get_slot_value(address, slot)
+
+    def store(self, address: EVMAddress, slot: U256, slot_value: U256):
+        # NEED TO EVENTUALLY IMPLEMENT GAS REFUNDS
+        self.add_touched_storage_slot(address, slot)
+        # Also need to add contract to touched addresses if not already
+        self.add_touched_address(address)
+
+        previous = self._storage_map.set_slot_value(address, slot, slot_value)
+
+        if self._snapshots:
+
+            self._journal.append(("slot", address, slot.to_int(), previous))
     
     def is_address_touched(self, address: EVMAddress) -> bool:
 
@@ -298,15 +633,11 @@ class EVMStorage():
 
     def is_storage_slot_touched(self, address: EVMAddress, slot_key: U256) -> bool:
 
-        return self._access_map.is_storage_slot_touched()
-
-    def get_contract_bytecode(self, address: EVMAddress) -> str:
-
-        is_touched = self._access_map.is_address_touched(address)
+        return self._access_map.is_storage_slot_touched(address, slot_key)
 
-        if not is_touched:
+    def get_contract_bytecode(self, address: EVMAddress) -> bytes:
 
-            self._access_map.add_touched_address(address)
+        self.add_touched_address(address)
 
         return self._storage_map.get_contract_bytecode(address)
 
@@ -314,46 +645,81 @@ class EVMStorage():
         """
         Front facing function to add touched addresses
         """
+        if self._access_map.is_address_touched(address):
+
+            return
+
         self._access_map.add_touched_address(address)
 
+        if self._snapshots:
+
+            self._journal.append(("address", address))
+
     def add_touched_storage_slot(self, address: EVMAddress, key: U256):
 
+        if self._access_map.is_storage_slot_touched(address, key):
+
+            return
+
         self._access_map.add_touched_storage_slot(address, key)
 
+        if self._snapshots:
+
+            self._journal.append(("touched_slot", address, key))
+
     def add_contract(self, address: EVMAddress, data: EVMContractStorage, balance: U256):
 
         self._storage_map.add_contract(address, data, balance)
 
     def get_contract_bytecode_size(self, address: EVMAddress) -> U256:
 
-        is_touched = self._access_map.is_address_touched(address)
-
-        if not is_touched:
-
-            self._access_map.add_touched_address(address)
+        self.add_touched_address(address)
 
         return self._storage_map.get_contract_bytecode_size(address)
 
-    def get_contract_bytecode_custom(self, address: EVMAddress, offset: U256, length: U256):
-
-        is_touched = self._access_map.is_address_touched(address)
-
-        if not is_touched:
+    def get_contract_bytecode_custom(self, address: EVMAddress, offset: U256, length: U256) -> bytes:
 
-            self._access_map.add_touched_address(address)
+        self.add_touched_address(address)
 
         return self._storage_map.get_contract_bytecode_custom(address, offset, length)
 
     def get_contract_balance(self, address: EVMAddress):
 
-        is_touched = self._access_map.is_address_touched(address)
+        self.add_touched_address(address)
 
-        if not is_touched:
+        return self._storage_map.get_contract_balance(address)
 
-            self._access_map.add_touched_address(address)
+    def set_contract_balance(self, address: EVMAddress, balance: U256):
 
-        return self._storage_map.get_contract_balance()
+        self.add_touched_address(address)
+
+        previous = self._storage_map.set_contract_balance(address, balance)
+
+        if self._snapshots:
+
+            self._journal.append(("balance", address, previous))
 
     def load_immutable(self, address: EVMAddress, key: U256):
 
-        return self._storage_map.get_immutable_slot_value(address, key)
\ No newline at end of file
+        return self._storage_map.get_immutable_slot_value(address, key)
+
+    def prefetch(self, pairs: list):
+        """
+        Pulls the (EVMAddress, slot or None) pairs that aren't stored locally
+        in bulk. Prefetching doesn't warm any address or slot
+        """
+        self._storage_map.prefetch(pairs)
+
+    def speculate(self, addresses: list, prefetcher):
+        """
+        Starts fetching addresses in the background with prefetcher. Doesn't
+        warm any address
+        """
+        self._storage_map.speculate(addresses, prefetcher)
+
+    def drop_speculation(self):
+        """
+        Forgets speculative fetches in flight, to be called once their
+        prefetcher is closed
+        """
+        self._storage_map.drop_speculation()
\ No newline at end of file
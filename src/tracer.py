@@ -0,0 +1,817 @@
+"""
+Module containing the tracer interface and the built-in tracers
+
+A tracer is attached to an EVMInterpreter and is notified of every call frame
+entered and exited, of every instruction executed and of every fault. The
+interpreter only runs its tracing loop when a tracer is attached, so untraced
+execution pays nothing for this module
+"""
+import json
+import struct
+from .utils.opcodes import get_readable_opcode
+from .utils.gas import static_gas
+from .bytecode import _stack_inputs
+
+# Opcodes that may write to memory beyond expanding it: CALLDATACOPY,
+# CODECOPY, EXTCODECOPY, RETURNDATACOPY, MSTORE, MSTORE8 and the CALL family,
+# which writes the output of the call to its return area
+MEMORY_WRITES = frozenset((0x37, 0x39, 0x3C, 0x3E, 0x52, 0x53, 0xF1, 0xF2, 0xF4, 0xFA))
+
+class EVMStepView():
+    """
+    Cheap, reusable view of the EVM right before an instruction executes
+
+    The interpreter updates the same EVMStepView in place for every step. The
+    pc, opcode, gas left and call depth are plain ints. The stack and memory
+    are only copied when get_stack() or get_memory() is called, so tracers that
+    don't need them never pay for a snapshot
+    """
+    __slots__ = ("_evm", "_pc", "_opcode", "_gas", "_depth")
+
+    def __init__(self, evm):
+
+        self._evm = evm
+        self._pc = 0
+        self._opcode = 0
+        self._gas = 0
+        self._depth = 0
+
+    def get_pc(self) -> int:
+
+        return self._pc
+
+    def get_opcode(self) -> int:
+
+        return self._opcode
+
+    def get_op_name(self) -> str:
+
+        return get_readable_opcode(f"{self._opcode:02X}")
+
+    def get_gas(self) -> int:
+        """
+        Returns the gas left before the instruction is charged
+        """
+        return self._gas
+
+    def get_depth(self) -> int:
+        """
+        Returns the call depth of the executing frame, 1 for the top level
+        """
+        return self._depth
+
+    def get_stack_size(self) -> int:
+
+        return len(self._evm._stack)
+
+    def get_stack(self) -> list:
+        """
+        Returns a copy of the stack as ints, bottom of the stack first
+        """
+        return list(self._evm._stack)
+
+    def get_stack_top(self, n: int) -> list:
+        """
+        Returns a copy of the top n items of the stack, bottom first
+        """
+        if n <= 0:
+
+            return []
+
+        return self._evm._stack[-n:]
+
+    def get_memory(self) -> bytes:
+        """
+        Returns a copy of memory
+        """
+        return bytes(self._evm._memory._memory)
+
+    def get_memory_size(self) -> int:
+
+        return len(self._evm._memory._memory)
+
+    def get_memory_view(self) -> memoryview:
+        """
+        Returns a read-only view over memory, without copying it. The view is
+        only valid until the instruction executes
+        """
+        return memoryview(self._evm._memory._memory).toreadonly()
+
+class EVMTracer():
+    """
+    Base class of all tracers, every hook does nothing by default
+    """
+
+    def on_tx_start(self, gas_limit: int):
+        """
+        Called before the transaction starts, with its gas limit
+        """
+        pass
+
+    def on_enter(self, call_type: str, sender: str, recipient: str, input: str, gas: int, value: int, depth: int):
+        """
+        Called when a call frame starts executing. Addresses are lowercase hex
+        strings without prefix and input is a hexadecimal string
+        """
+        pass
+
+    def on_step(self, step: EVMStepView):
+        """
+        Called right before every instruction executes
+        """
+        pass
+
+    def on_fault(self, step: EVMStepView, error: Exception):
+        """
+        Called when the instruction described by step raises error
+        """
+        pass
+
+    def on_exit(self, output: str, gas_used: int, error: Exception = None):
+        """
+        Called when a call frame stops executing, output is a hexadecimal
+        string
+        """
+        pass
+
+    def on_tx_end(self, gas_used: int):
+        """
+        Called once the transaction ends with the gas used as reported by its
+        receipt: intrinsic gas included and refunds deducted
+        """
+        pass
+
+class EVMPrintTracer(EVMTracer):
+    """
+    Tracer printing every instruction followed by the stack and memory it
+    leaves behind. Used for the "trace" verbosity level
+    """
+
+    def __init__(self):
+
+        self._evm = None
+
+    def _print_state(self):
+
+        if self._evm is not None:
+
+            self._evm.print_stack()
+            self._evm.print_memory()
+
+    def on_step(self, step: EVMStepView):
+
+        self._print_state()
+        self._evm = step._evm
+
+        print(f"[{hex(step.get_pc())}] {self._evm._rom.get_insn(step.get_pc())}")
+
+    def on_fault(self, step: EVMStepView, error: Exception):
+
+        print(f"FAULT at [{hex(step.get_pc())}] {step.get_op_name()}: {type(error).__name__}")
+
+    def on_exit(self, output: str, gas_used: int, error: Exception = None):
+
+        if error is None:
+
+            self._print_state()
+
+        self._evm = None
+
+class EVMStructLogTracer(EVMTracer):
+    """
+    Tracer producing the output of geth's default (struct log) tracer for
+    debug_traceTransaction
+
+    The gasCost of a step is only known once the next step of the same frame
+    (or the end of the frame) is reached, so one pending log is kept per depth
+    """
+
+    def __init__(self, enable_stack: bool = True, enable_memory: bool = False):
+
+        self._enable_stack = enable_stack
+        self._enable_memory = enable_memory
+
+        self._struct_logs = []
+        # Maps depth to the last log emitted at that depth
+        self._pending = {}
+        # Gas given to each frame currently executing, innermost last
+        self._frame_gas = []
+
+        self._gas_used = 0
+        self._failed = False
+        self._return_value = ""
+
+    def _close_pending(self, depth: int, gas: int):
+
+        log = self._pending.pop(depth, None)
+
+        if log is not None:
+
+            log["gasCost"] = log["gas"] - gas
+
+    def on_step(self, step: EVMStepView):
+
+        depth = step.get_depth()
+        gas = step.get_gas()
+
+        self._close_pending(depth, gas)
+
+        log = {
+            "pc": step.get_pc(),
+            "op": step.get_op_name(),
+            "gas": gas,
+            "gasCost": 0,
+            "depth": depth
+        }
+
+        if self._enable_stack:
+
+            log["stack"] = [hex(item) for item in step.get_stack()]
+
+        if self._enable_memory:
+
+            memory = step.get_memory()
+            log["memory"] = [memory[i:i + 32].hex() for i in range(0, len(memory), 32)]
+
+        self._struct_logs.append(log)
+        self._pending[depth] = log
+
+    def on_fault(self, step: EVMStepView, error: Exception):
+
+        log = self._pending.get(step.get_depth())
+
+        if log is not None:
+
+            log["error"] = type(error).__name__
+
+    def on_enter(self, call_type: str, sender: str, recipient: str, input: str, gas: int, value: int, depth: int):
+
+        self._frame_gas.append(gas)
+
+    def on_exit(self, output: str, gas_used: int, error: Exception = None):
+
+        depth = len(self._frame_gas)
+        gas_left = self._frame_gas.pop() - gas_used
+
+        self._close_pending(depth, gas_left)
+
+        if depth == 1:
+
+            self._gas_used = gas_used
+            self._failed = error is not None
+            self._return_value = output
+
+    def on_tx_end(self, gas_used: int):
+
+        self._gas_used = gas_used
+
+    def get_result(self) -> dict:
+
+        return {
+            "gas": self._gas_used,
+            "failed": self._failed,
+            "returnValue": self._return_value,
+            "structLogs": self._struct_logs
+        }
+
+    def to_json(self) -> str:
+
+        return json.dumps(self.get_result())
+
+class EVMCallTracer(EVMTracer):
+    """
+    Tracer producing the output of geth's callTracer for
+    debug_traceTransaction: a tree of call frames with their inputs, outputs
+    and gas usage
+
+    As in geth, the top-level frame reports the gas limit of the transaction
+    and the gas used by all of it, intrinsic gas included
+    """
+
+    def __init__(self):
+
+        # Frames currently executing, innermost last
+        self._frames = []
+        self._result = None
+        self._gas_limit = None
+
+    def on_tx_start(self, gas_limit: int):
+
+        self._gas_limit = gas_limit
+
+    def on_enter(self, call_type: str, sender: str, recipient: str, input: str, gas: int, value: int, depth: int):
+
+        if len(self._frames) == 0 and self._gas_limit is not None:
+
+            gas = self._gas_limit
+
+        frame = {
+            "type": call_type,
+            "from": "0x" + sender,
+            "to": "0x" + recipient,
+            "value": hex(value),
+            "gas": hex(gas),
+            "gasUsed": "0x0",
+            "input": "0x" + input
+        }
+
+        if len(self._frames) != 0:
+
+            self._frames[-1].setdefault("calls", []).append(frame)
+
+        self._frames.append(frame)
+
+    def on_exit(self, output: str, gas_used: int, error: Exception = None):
+
+        frame = self._frames.pop()
+
+        frame["gasUsed"] = hex(gas_used)
+        frame["output"] = "0x" + output
+
+        if error is not None:
+
+            frame["error"] = type(error).__name__
+
+        if len(self._frames) == 0:
+
+            self._result = frame
+
+    def on_tx_end(self, gas_used: int):
+
+        self._result["gasUsed"] = hex(gas_used)
+
+    def get_result(self) -> dict:
+
+        return self._result
+
+    def to_json(self) -> str:
+
+        return json.dumps(self._result)
+
+# Layout of the binary trace format written by EVMStreamTracer. A file starts
+# with TRACE_MAGIC and a flags byte, followed by records each starting with a
+# tag byte
+TRACE_MAGIC = b"LEVMTRC1"
+TRACE_FLAG_STACK = 1
+TRACE_FLAG_MEMORY = 2
+TRACE_FLAG_DIFFS = 4
+
+_STEP_TAG = 0
+_RESULT_TAG = 1
+
+# tag, pc, opcode, gas, gasCost, depth. Gas is signed, as it is negative on
+# the faulting step of a transaction whose gas limit is below its intrinsic
+# cost
+_step_header = struct.Struct("<BIBqqH")
+# tag, gasUsed, failed
+_result_header = struct.Struct("<BQB")
+_u8 = struct.Struct("<B")
+_u16 = struct.Struct("<H")
+_u32 = struct.Struct("<I")
+
+class EVMStreamTracer(EVMTracer):
+    """
+    Tracer streaming one record per step to a file instead of keeping the
+    trace in memory
+
+    Records are encoded either as JSON Lines ("jsonl") or in a compact binary
+    format ("binary", see read_trace()) and accumulated in a buffer which is
+    written out whenever it grows past flush_size bytes. With diffs enabled
+    each record only holds the stack items popped/pushed and the memory words
+    written since the previous record, rather than full snapshots
+
+    Only the step currently executing is held in memory, so the memory used
+    doesn't grow with the number of steps. The gasCost of a step is the gas
+    consumed until the next step of the same frame; for a step followed by a
+    call frame only its static gas is reported
+    """
+
+    def __init__(self, file, format: str = "jsonl", flush_size: int = 1 << 16,
+            diffs: bool = False, enable_stack: bool = True, enable_memory: bool = False):
+
+        if format not in ("jsonl", "binary"):
+
+            raise ValueError(f"Unknown trace format {format}")
+
+        if isinstance(file, str):
+
+            self._file = open(file, "wb")
+            self._owns_file = True
+
+        else:
+
+            self._file = file
+            self._owns_file = False
+
+        self._binary = format == "binary"
+        self._flush_size = flush_size
+        self._diffs = diffs
+        self._enable_stack = enable_stack
+        self._enable_memory = enable_memory
+
+        self._buffer = bytearray()
+        # Step waiting for its gasCost, as (pc, opcode, gas, depth, stack, memory, error)
+        self._pending = None
+        # Gas given to each frame currently executing, innermost last
+        self._frame_gas = []
+
+        # Stack height as of the previous record, the items its step pops
+        # and the call depth it was taken at
+        self._last_stack_size = 0
+        self._last_operands = []
+        self._last_stack_depth = None
+        # Memory as of the previous record, the call depth it was taken at
+        # and whether the step of that record may write to memory
+        self._last_memory = bytearray()
+        self._last_depth = None
+        self._memory_written = False
+
+        if self._binary:
+
+            flags = (TRACE_FLAG_STACK if enable_stack else 0) \
+                | (TRACE_FLAG_MEMORY if enable_memory else 0) \
+                | (TRACE_FLAG_DIFFS if diffs else 0)
+
+            self._buffer += TRACE_MAGIC
+            self._buffer += _u8.pack(flags)
+
+    def flush(self):
+        """
+        Writes the buffered records to the file
+        """
+        if len(self._buffer) != 0:
+
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+        self._file.flush()
+
+    def close(self):
+        """
+        Flushes the buffered records and closes the file if it was opened by
+        the tracer
+        """
+        self.flush()
+
+        if self._owns_file:
+
+            self._file.close()
+
+    def _stack_record(self, step: EVMStepView):
+        """
+        Returns the full stack, or (items popped, items pushed) since the
+        previous record when diffs are enabled
+
+        A step only changes the items it pops (see _stack_inputs) and pushes
+        on top of the rest, so only those are copied and compared. After a
+        switch of call frame the whole stack is recorded as pushed
+        """
+        if not self._diffs:
+
+            return step.get_stack()
+
+        size = step.get_stack_size()
+        depth = step.get_depth()
+
+        if depth != self._last_stack_depth:
+
+            pops = self._last_stack_size
+            pushed = step.get_stack()
+
+        else:
+
+            last = self._last_operands
+            pushed = step.get_stack_top(size - (self._last_stack_size - len(last)))
+            common = 0
+            limit = min(len(last), len(pushed))
+
+            while common < limit and last[common] == pushed[common]:
+
+                common += 1
+
+            pops = len(last) - common
+            pushed = pushed[common:]
+
+        self._last_stack_size = size
+        self._last_operands = step.get_stack_top(min(_stack_inputs[step.get_opcode()], size))
+        self._last_stack_depth = depth
+
+        return (pops, pushed)
+
+    def _memory_record(self, step: EVMStepView):
+        """
+        Returns the full memory, or (memory size, [(offset, word) ...]) of the
+        words that changed since the previous record when diffs are enabled
+
+        Memory is only compared word by word after a step that may write to it
+        (see MEMORY_WRITES) or a switch of call frame. After any other step it
+        can only have grown, with zeroes, so the cost of a record doesn't
+        depend on the size of memory
+        """
+        if not self._diffs:
+
+            return step.get_memory()
+
+        last = self._last_memory
+        size = step.get_memory_size()
+        depth = step.get_depth()
+        writes = []
+
+        if self._memory_written or depth != self._last_depth:
+
+            memory = step.get_memory_view()
+
+            if memory != last:
+
+                for offset in range(0, size, 32):
+
+                    word = memory[offset:offset + 32]
+
+                    if word != last[offset:offset + 32]:
+
+                        writes.append((offset, bytes(word)))
+
+                self._last_memory = bytearray(memory)
+
+        elif size > len(last):
+
+            zero = bytes(32)
+
+            for offset in range(len(last), size, 32):
+
+                writes.append((offset, zero))
+
+            last.extend(bytes(size - len(last)))
+
+        self._last_depth = depth
+        self._memory_written = step.get_opcode() in MEMORY_WRITES
+
+        return (size, writes)
+
+    def _write_pending(self, gas_cost: int):
+
+        pc, opcode, gas, depth, stack, memory, error = self._pending
+        self._pending = None
+
+        if self._binary:
+
+            self._encode_binary_step(pc, opcode, gas, gas_cost, depth, stack, memory, error)
+
+        else:
+
+            self._encode_json_step(pc, opcode, gas, gas_cost, depth, stack, memory, error)
+
+        if len(self._buffer) >= self._flush_size:
+
+            self.flush()
+
+    def _encode_json_step(self, pc, opcode, gas, gas_cost, depth, stack, memory, error):
+
+        record = {
+            "pc": pc,
+            "op": get_readable_opcode(f"{opcode:02X}"),
+            "gas": gas,
+            "gasCost": gas_cost,
+            "depth": depth
+        }
+
+        if error is not None:
+
+            record["error"] = error
+
+        if stack is not None:
+
+            if self._diffs:
+
+                record["stackPop"] = stack[0]
+                record["stackPush"] = [hex(item) for item in stack[1]]
+
+            else:
+
+                record["stack"] = [hex(item) for item in stack]
+
+        if memory is not None:
+
+            if self._diffs:
+
+                record["memSize"] = memory[0]
+                record["memWrites"] = [[offset, word.hex()] for offset, word in memory[1]]
+
+            else:
+
+                record["memory"] = memory.hex()
+
+        self._buffer += json.dumps(record, separators=(",", ":")).encode()
+        self._buffer += b"\n"
+
+    def _encode_binary_step(self, pc, opcode, gas, gas_cost, depth, stack, memory, error):
+
+        buffer = self._buffer
+
+        buffer += _step_header.pack(_STEP_TAG, pc, opcode, gas, gas_cost, depth)
+
+        error = b"" if error is None else error.encode()
+        buffer += _u8.pack(len(error))
+        buffer += error
+
+        if stack is not None:
+
+            if self._diffs:
+
+                pops, stack = stack
+                buffer += _u16.pack(pops)
+
+            buffer += _u16.pack(len(stack))
+
+            for item in stack:
+
+                buffer += item.to_bytes(32, "big")
+
+        if memory is not None:
+
+            if self._diffs:
+
+                size, writes = memory
+                buffer += _u32.pack(size)
+                buffer += _u32.pack(len(writes))
+
+                for offset, word in writes:
+
+                    buffer += _u32.pack(offset)
+                    buffer += word
+
+            else:
+
+                buffer += _u32.pack(len(memory))
+                buffer += memory
+
+    def on_enter(self, call_type: str, sender: str, recipient: str, input: str, gas: int, value: int, depth: int):
+
+        if self._pending is not None:
+
+            self._write_pending(static_gas[self._pending[1]])
+
+        self._frame_gas.append(gas)
+
+    def on_step(self, step: EVMStepView):
+
+        gas = step.get_gas()
+
+        if self._pending is not None:
+
+            if self._pending[3] == step.get_depth():
+
+                self._write_pending(self._pending[2] - gas)
+
+            else:
+
+                self._write_pending(static_gas[self._pending[1]])
+
+        self._pending = (
+            step.get_pc(),
+            step.get_opcode(),
+            gas,
+            step.get_depth(),
+            self._stack_record(step) if self._enable_stack else None,
+            self._memory_record(step) if self._enable_memory else None,
+            None
+        )
+
+    def on_fault(self, step: EVMStepView, error: Exception):
+
+        if self._pending is not None:
+
+            self._pending = self._pending[:6] + (type(error).__name__,)
+
+    def on_exit(self, output: str, gas_used: int, error: Exception = None):
+
+        gas_left = self._frame_gas.pop() - gas_used
+
+        if self._pending is not None:
+
+            self._write_pending(max(0, self._pending[2] - gas_left))
+
+        if len(self._frame_gas) != 0:
+
+            return
+
+        failed = error is not None
+
+        if self._binary:
+
+            output = bytes.fromhex(output)
+
+            self._buffer += _result_header.pack(_RESULT_TAG, gas_used, failed)
+            self._buffer += _u32.pack(len(output))
+            self._buffer += output
+
+        else:
+
+            record = {"output": output, "gasUsed": gas_used, "failed": failed}
+
+            if failed:
+
+                record["error"] = type(error).__name__
+
+            self._buffer += json.dumps(record, separators=(",", ":")).encode()
+            self._buffer += b"\n"
+
+        self.close()
+
+def read_trace(path: str):
+    """
+    Yields the records of a trace written by EVMStreamTracer as dicts, in
+    either format. Binary records are decoded to the same keys as JSON Lines
+    records, with stack items as ints and memory as bytes
+    """
+    with open(path, "rb") as file:
+
+        data = file.read()
+
+    if not data.startswith(TRACE_MAGIC):
+
+        for line in data.splitlines():
+
+            yield json.loads(line)
+
+        return
+
+    flags = data[len(TRACE_MAGIC)]
+    diffs = flags & TRACE_FLAG_DIFFS
+    offset = len(TRACE_MAGIC) + 1
+
+    while offset < len(data):
+
+        if data[offset] == _RESULT_TAG:
+
+            _, gas_used, failed = _result_header.unpack_from(data, offset)
+            offset += _result_header.size
+            (length,) = _u32.unpack_from(data, offset)
+            offset += _u32.size
+
+            yield {"output": data[offset:offset + length].hex(), "gasUsed": gas_used, "failed": bool(failed)}
+
+            offset += length
+            continue
+
+        _, pc, opcode, gas, gas_cost, depth = _step_header.unpack_from(data, offset)
+        offset += _step_header.size
+
+        record = {
+            "pc": pc,
+            "op": get_readable_opcode(f"{opcode:02X}"),
+            "gas": gas,
+            "gasCost": gas_cost,
+            "depth": depth
+        }
+
+        length = data[offset]
+        offset += 1
+
+        if length != 0:
+
+            record["error"] = data[offset:offset + length].decode()
+            offset += length
+
+        if flags & TRACE_FLAG_STACK:
+
+            if diffs:
+
+                (record["stackPop"],) = _u16.unpack_from(data, offset)
+                offset += _u16.size
+
+            (count,) = _u16.unpack_from(data, offset)
+            offset += _u16.size
+
+            items = [int.from_bytes(data[i:i + 32], "big") for i in range(offset, offset + 32 * count, 32)]
+            offset += 32 * count
+
+            record["stackPush" if diffs else "stack"] = items
+
+        if flags & TRACE_FLAG_MEMORY:
+
+            if diffs:
+
+                size, count = struct.unpack_from("<II", data, offset)
+                offset += 8
+
+                writes = []
+
+                for _ in range(count):
+
+                    (word_offset,) = _u32.unpack_from(data, offset)
+                    writes.append((word_offset, data[offset + 4:offset + 36]))
+                    offset += 36
+
+                record["memSize"] = size
+                record["memWrites"] = writes
+
+            else:
+
+                (length,) = _u32.unpack_from(data, offset)
+                offset += _u32.size
+
+                record["memory"] = data[offset:offset + length]
+                offset += length
+
+        yield record
@@ -11,12 +11,12 @@ class EVMTransaction():
 
     def __init__(self, tx_type: int, gas_price: int, gas_limit: int, origin: EVMAddress):
 
-        self._tx_type = None
+        self._tx_type = tx_type
         self._nonce = None
-        self._gas_price = None
-        self._gas_limit = None
+        self._gas_price = gas_price
+        self._gas_limit = gas_limit
         # MUST BE EOA
-        self._origin = None
+        self._origin = origin
 
     def get_tx_type(self):
 
@@ -42,10 +42,27 @@ class EVMMessage():
     """
     Values can mutate between internal transactions
     """
-    def __init__(self, data: str, sender: EVMAddress, sig: str, value: int, recipient: EVMAddress):
+    def __init__(self, data, sender: EVMAddress, sig: str, value: int, recipient: EVMAddress):
 
-        # Data passed with message (HEX)
-        self._data = data
+        # Data passed with message, either a hexadecimal string (with or
+        # without prefix) or a bytes-like object
+        if isinstance(data, str):
+
+            data = data.lower()
+            if data[:2] == "0x":
+
+                data = data[2:]
+
+            if len(data) % 2 != 0:
+                # A trailing nibble is treated as the high half of a final byte
+                data = data + "0"
+
+            data = bytes.fromhex(data)
+
+        # Data passed with message, as bytes
+        self._data = bytes(data)
+        # Size in bytes, constant for the lifetime of the message
+        self._data_size = U256.of(len(self._data))
         # Sender of message
         self._sender = sender
         # Function selector
@@ -57,8 +74,12 @@ class EVMMessage():
         
     def get_data(self):
         """
-        Returns message data in its entirety
+        Returns message data in its entirety as a hexadecimal string
         """
+        return self._data.hex()
+
+    def get_data_bytes(self) -> bytes:
+
         return self._data
 
     def get_sender(self) -> EVMAddress:
@@ -84,24 +105,25 @@ class EVMMessage():
         If i + 32 is greater than the rightmost index, return value is
         right-padded with 0s
         """
-        data_list = list(self._data)
-        data_str = ""
-        for i in range(i * 2, (i * 2) + 64):
-
-            try:
-                data_str += data_list[i]
-            except:
-                data_str += "00"
+        offset = i.to_int()
 
-        data_int = int(data_str, 16)
-        return U256(data_int)
+        return U256.from_bytes(self._data[offset:offset + 32].ljust(32, b"\x00"))
 
     def get_data_size(self) -> U256:
         """
         Returns size of message data in bytes
         """
-        pass
+        return self._data_size
 
     def load_data_custom(self, offset: U256, length: U256) -> str:
+        """
+        Returns msg.data[offset:offset+length] as a hexadecimal string, right
+        padded with 0s
+        """
+        return self.load_data_bytes(offset.to_int(), length.to_int()).hex()
 
-        pass
+    def load_data_bytes(self, offset: int, length: int) -> bytes:
+        """
+        Returns msg.data[offset:offset+length] as bytes, right padded with 0s
+        """
+        return self._data[offset:offset + length].ljust(length, b"\x00")
@@ -20,8 +20,8 @@ class EVMAddress():
             self._uint_representation = uint
             self._hex_representation = uint.to_address_hex()
         elif hex != None:
-            self._hex_representation == EVMAddress.format(hex)
-            self._uint_representation == U256.from_hex(EVMAddress.format(hex))
+            self._hex_representation = EVMAddress.format(hex)
+            self._uint_representation = U256.from_hex(self._hex_representation)
         else:
             raise EVMAddressFailedInitialization()      
 
@@ -37,19 +37,31 @@ class EVMAddress():
 
         return "0x" + self._hex_representation
 
+    def to_bytes(self) -> bytes:
+        """
+        Returns the address as a 20-byte big-endian bytes object
+        """
+        return self._uint_representation.to_int().to_bytes(20, "big")
+
+    def to_bytes32(self) -> bytes:
+        """
+        Returns the address left-padded to a 32-byte word, as it appears on
+        the stack, in memory and in log topics
+        """
+        return self._uint_representation.to_bytes32()
+
+    @staticmethod
+    def from_bytes(data: bytes):
+        """
+        Returns an EVMAddress from a 20-byte address or a 32-byte word, in
+        which case the upper 12 bytes are ignored
+        """
+        return EVMAddress(uint=U256.of(int.from_bytes(data[-20:], "big")))
+
     @staticmethod
     def format(address: str) -> str:
         # First remove prefix if possible
         if address[:2].lower() == "0x":
             address = address[2:]
 
-        address = address.lower()
-
-        # Check length
-        hex_str_len = len(address)
-        # How many zeros to prepend if necessary
-        preprend_len = 40 - hex_str_len
-        for i in range(preprend_len):
-            address = "0" + address
-
-        return address
\ No newline at end of file
+        return address.lower().rjust(40, "0")
\ No newline at end of file
@@ -85,3 +85,44 @@ class EVMMemoryOffsetTooLarge(Exception):
 class EVMMemoryInputLengthInconsistency(Exception):
 
     pass
+
+class EVMInvalidVerbosity(Exception):
+
+    pass
+
+class EVMInvalidRPCProvider(Exception):
+
+    pass
+
+class EVMMissingAPIURL(Exception):
+
+    pass
+
+class EVMRPCError(Exception):
+
+    pass
+
+class EVMInvalidSnapshot(Exception):
+
+    pass
+
+class EVMStaticStateChange(Exception):
+
+    pass
+
+class EVMReturnDataOutOfBounds(Exception):
+
+    pass
+
+class EVMExecutionReverted(Exception):
+    """
+    Not raised, handed to tracers as the error of a frame ended by REVERT
+    """
+    pass
+
+class EVMInsufficientBalance(Exception):
+    """
+    Not raised, the error of a simulated transaction whose sender can't pay
+    for its value and gas
+    """
+    pass
@@ -1,113 +1,140 @@
 
 from .exceptions import *
-from ..evm import EVM
+from typing import TYPE_CHECKING
 
-def sstore_gas_check(evm: EVM):
+if TYPE_CHECKING:
+    from ..evm import EVM
+
+# EIP-2929: accessing a cold account or storage slot costs this much on top of
+# the warm access cost charged as static gas
+COLD_ACCOUNT_ACCESS_SURCHARGE = 2500
+COLD_SLOAD_SURCHARGE = 2000
+
+# Charged by CALL and CALLCODE for transferring value, and by CALL for sending
+# value to an empty account
+CALL_VALUE_COST = 9000
+NEW_ACCOUNT_COST = 25000
+
+# EIP-2930: intrinsic cost of each access list entry
+ACCESS_LIST_ADDRESS_COST = 2400
+ACCESS_LIST_STORAGE_KEY_COST = 1900
+
+def sstore_gas_check(evm: "EVM"):
 
     if evm._gas <= 2300:
 
         raise EVMInsufficientGas()
 
-def charge_gas(evm: EVM, insn: str, metadata = None) -> int:
+def charge_gas(evm: "EVM", insn: str, metadata = None) -> int:
     """
+    Charges the dynamic portion of the gas cost of an instruction. The static
+    portion of every instruction (see opcodes_gas) is charged once per basic
+    block by the interpreter, so charge_gas() is only called by instructions
+    whose cost depends on their operands
+
     insn must be a string representing the hexadecimal represenation of the
     instruction gas is being charged for
 
     If charging for EXP operation, metadata is the number of bits of the
     exponent
     
-    If charging for SHA3 operation, metadata is a dictionary with the following
+    If charging for KECCAK256 operation, metadata is a dictionary with the following
     keys: data_size_words, mem_expansion_cost
     
-    If charging for CALLDATA, CODECOPY, or RETURNDATACOPY operation, then metadata is a dictionary with the following
-    keys: data_size_words, mem_expansion_cost
+    If charging for CALLDATACOPY, CODECOPY, EXTCODECOPY or RETURNDATACOPY
+    operation, then metadata is a dictionary with the following keys:
+    data_size_words, mem_expansion_cost. For EXTCODECOPY, it also has the key
+    is_cold
 
-    If charging for BALANCE, EXTCODESIZE, or EXTCODEHASH, then metadata is a
-    boolean representing whether if the address was touched or not
+    If charging for BALANCE, EXTCODESIZE, EXTCODEHASH or SLOAD operation, then
+    metadata is whether the account or slot accessed was cold
 
-    If charging for EXTCODECOPY, then metadata is a dict with the following
-    keys: is_touched, data_size_words, mem_expansion_cost
+    If charging for MLOAD, MSTORE, MSTORE8, RETURN or REVERT operation, then
+    metadata is the memory expansion cost
 
     If charging for SSTORE operation, then metadata is a dict with the following
     keys: gas_cost, gas_refund, is_touched
 
-    If charging for SLOAD operation, then metadata is a boolean representing
-    whether the storage slot was touched or not
+    If charging for LOG0-LOG4 operation, then metadata is a dict with the
+    following keys: data_size, mem_expansion_cost
+
+    If charging for CALL, CALLCODE, DELEGATECALL or STATICCALL operation, then
+    metadata is a dict with the following keys: mem_expansion_cost, is_cold,
+    value, new_account. The gas forwarded to the callee is deducted by the
+    operation itself
     """
 
     insn = insn.upper()
 
-    # If instruction has static gas cost
-    if insn in opcodes_gas:
-
-        if evm._gas - opcodes_gas[insn] < 0:
-
-            raise EVMInsufficientGas()
-
-        evm._gas -= opcodes_gas[insn]
-
-        return
-
     # Branch between all dynamic opcodes
 
     if insn == "0A": # EXP OPERATION
         exp_bytes = (metadata + 7) // 8
-        gas_cost = 10 + (50 * exp_bytes)
-        if evm._gas - gas_cost < 0:
+        gas_cost = 50 * exp_bytes
 
-            raise EVMInsufficientGas()
+    elif insn == "20": # KECCAK256 OPERATION
 
-        evm._gas -= gas_cost
+        gas_cost = 6 * metadata["data_size_words"] + metadata["mem_expansion_cost"]
 
-    elif insn == "20": # SHA3 OPERATION
+    elif insn in ("37", "39", "3C", "3E"): # CALLDATACOPY, CODECOPY, EXTCODECOPY, RETURNDATACOPY
 
-        gas_cost = 30 + 6 * metadata["data_size_words"] + metadata["mem_expansion_cost"]
+        gas_cost = (3 * metadata["data_size_words"]) + metadata["mem_expansion_cost"]
 
-        if evm._gas - gas_cost < 0:
+        if metadata.get("is_cold", False):
 
-            raise EVMInsufficientGas()
+            gas_cost += COLD_ACCOUNT_ACCESS_SURCHARGE
 
-        evm._gas -= gas_cost
+    elif insn in ("31", "3B", "3F"): # BALANCE, EXTCODESIZE, EXTCODEHASH
 
-    elif insn == "37": # CALLDATACOPY
+        gas_cost = COLD_ACCOUNT_ACCESS_SURCHARGE if metadata else 0
 
-        gas_cost = 3 + (3 * metadata["data_size_words"]) + metadata["mem_expansion_cost"]
+    elif insn == "54": # SLOAD
 
-        if evm._gas - gas_cost < 0:
+        gas_cost = COLD_SLOAD_SURCHARGE if metadata else 0
 
-            raise EVMInsufficientGas()
+    elif insn in ("51", "52", "53", "F3", "FD"): # MLOAD, MSTORE, MSTORE8, RETURN, REVERT
 
-        evm._gas -= gas_cost
+        gas_cost = metadata
 
-    elif insn == "39": # CODECOPY
+    elif insn == "55": # SSTORE
 
-        pass
+        gas_cost = metadata["gas_cost"]
+        evm._gas_refund += metadata["gas_refund"]
 
-    elif insn == "3C": # EXTCODECOPY
+    elif insn in ("A0", "A1", "A2", "A3", "A4"): # LOG0 - LOG4
 
-        pass
+        gas_cost = 8 * metadata["data_size"] + metadata["mem_expansion_cost"]
 
-    elif insn == "55": # SSTORE
+    elif insn in ("F1", "F2", "F4", "FA"): # CALL, CALLCODE, DELEGATECALL, STATICCALL
+
+        gas_cost = metadata["mem_expansion_cost"]
 
-        pass
+        if metadata["is_cold"]:
 
-    elif insn == "PUSH":
+            gas_cost += COLD_ACCOUNT_ACCESS_SURCHARGE
 
-        if evm._gas - 3 < 0:
+        if metadata["value"] != 0:
 
-            raise EVMInsufficientGas()
+            gas_cost += CALL_VALUE_COST
 
-        evm._gas -= 3
+        if metadata["new_account"]:
 
-    elif insn == "DUP":
+            gas_cost += NEW_ACCOUNT_COST
 
-        pass
     else:
         raise EVMNoAssociatedGasCost(insn)
 
-# The following opcodes have dynamic gas prices
-# EXP, SHA3, CALLDATACOPY, CODECOPY, EXTCODECOPY, SSTORE, LOG0, LOG1, LOG2,
-# LOG3, LOG4. CALL, CALLCODE, DELEGATECALL, SELFDESTRUCT
+    if evm._gas - gas_cost < 0:
+
+        raise EVMInsufficientGas()
+
+    evm._gas -= gas_cost
+
+# Static gas cost of every opcode. The following opcodes additionally have
+# dynamic gas prices charged through charge_gas()
+# EXP, KECCAK256, CALLDATACOPY, CODECOPY, EXTCODECOPY, RETURNDATACOPY, MLOAD, MSTORE,
+# MSTORE8, SSTORE, LOG0, LOG1, LOG2, LOG3, LOG4. CALL, CALLCODE, DELEGATECALL,
+# STATICCALL, SELFDESTRUCT
 opcodes_gas = {
 "00" : 		0,
 "01" : 		3,
@@ -119,6 +146,7 @@ opcodes_gas = {
 "07" : 		5,
 "08" : 		8,
 "09" : 		8,
+"0A" : 		10,
 "0B" : 		5,
 "10" : 		3,
 "11" : 		3,
@@ -131,97 +159,130 @@ opcodes_gas = {
 "18" : 		3,
 "19" : 		3,
 "1A" : 		3,
+"1B" : 		3,
+"1C" : 		3,
+"1D" : 		3,
+"20" : 		30,
 "30" : 		2,
-"31" : 		400,
+"31" : 		100,
 "32" : 		2,
 "33" : 		2,
 "34" : 		2,
 "35" : 		3,
 "36" : 		2,
+"37" : 		3,
 "38" : 		2,
+"39" : 		3,
 "3A" : 		2,
-"3B" : 		700,
+"3B" : 		100,
+"3C" : 		100,
+"3D" : 		2,
+"3E" : 		3,
+"3F" : 		100,
 "40" : 		20,
 "41" : 		2,
 "42" : 		2,
 "43" : 		2,
 "44" : 		2,
 "45" : 		2,
+"46" : 		2,
+"47" : 		5,
+"48" : 		2,
 "50" : 		2,
 "51" : 		3,
 "52" : 		3,
 "53" : 		3,
-"54" :  	200,
+"54" : 		100,
+"55" : 		0,
 "56" : 		8,
 "57" : 		10,
 "58" : 		2,
 "59" : 		2,
 "5A" : 		2,
 "5B" : 		1,
-"60" : 3,  
-"61" : 3, 
-"62" : 3, 
-"63" : 3, 
-"64" : 3, 
-"65" : 3, 
-"66" : 3, 
-"67" : 3, 
-"68" : 3, 
-"69" : 3, 
-"6A" : 3, 
-"6B" : 3, 
-"6C" : 3, 
-"6D" : 3, 
-"6E" : 3, 
-"6F" : 3, 
-"70" : 3, 
-"71" : 3, 
-"72" : 3, 
-"73" : 3, 
-"74" : 3, 
-"75" : 3, 
-"76" : 3, 
-"77" : 3, 
-"78" : 3, 
-"79" : 3, 
-"7A" : 3, 
-"7B" : 3, 
-"7C" : 3, 
-"7D" : 3, 
-"7E" : 3, 
-"7F" : 3, 
-"80" : 3, 
-"81" : 3, 
-"82" : 3, 
-"83" : 3, 
-"84" : 3, 
-"85" : 3, 
-"86" : 3, 
-"87" : 3, 
-"88" : 3, 
-"89" : 3, 
-"8A" : 3, 
-"8B" : 3, 
-"8C" : 3, 
-"8D" : 3, 
-"8E" : 3, 
-"8F" : 3, 
-"90" : 3, 
-"91" : 3, 
-"92" : 3, 
-"93" : 3, 
-"94" : 3, 
-"95" : 3, 
-"96" : 3, 
-"97" : 3, 
-"98" : 3, 
-"99" : 3, 
-"9A" : 3, 
-"9B" : 3, 
-"9C" : 3, 
-"9D" : 3, 
-"9E" : 3, 
-"9F" : 3, 
-"F0" : 32000,
-"F3" : 0
-}
\ No newline at end of file
+"60" : 		3,
+"61" : 		3,
+"62" : 		3,
+"63" : 		3,
+"64" : 		3,
+"65" : 		3,
+"66" : 		3,
+"67" : 		3,
+"68" : 		3,
+"69" : 		3,
+"6A" : 		3,
+"6B" : 		3,
+"6C" : 		3,
+"6D" : 		3,
+"6E" : 		3,
+"6F" : 		3,
+"70" : 		3,
+"71" : 		3,
+"72" : 		3,
+"73" : 		3,
+"74" : 		3,
+"75" : 		3,
+"76" : 		3,
+"77" : 		3,
+"78" : 		3,
+"79" : 		3,
+"7A" : 		3,
+"7B" : 		3,
+"7C" : 		3,
+"7D" : 		3,
+"7E" : 		3,
+"7F" : 		3,
+"80" : 		3,
+"81" : 		3,
+"82" : 		3,
+"83" : 		3,
+"84" : 		3,
+"85" : 		3,
+"86" : 		3,
+"87" : 		3,
+"88" : 		3,
+"89" : 		3,
+"8A" : 		3,
+"8B" : 		3,
+"8C" : 		3,
+"8D" : 		3,
+"8E" : 		3,
+"8F" : 		3,
+"90" : 		3,
+"91" : 		3,
+"92" : 		3,
+"93" : 		3,
+"94" : 		3,
+"95" : 		3,
+"96" : 		3,
+"97" : 		3,
+"98" : 		3,
+"99" : 		3,
+"9A" : 		3,
+"9B" : 		3,
+"9C" : 		3,
+"9D" : 		3,
+"9E" : 		3,
+"9F" : 		3,
+"A0" : 		375,
+"A1" : 		750,
+"A2" : 		1125,
+"A3" : 		1500,
+"A4" : 		1875,
+"F0" : 		32000,
+"F1" : 		100,
+"F2" : 		100,
+"F3" : 		0,
+"F4" : 		100,
+"F5" : 		32000,
+"FA" : 		100,
+"FD" : 		0,
+"FF" : 		5000
+}
+
+# Static gas cost indexed by integer opcode, undefined opcodes cost nothing
+static_gas = [0] * 256
+
+for _hex_op, _cost in opcodes_gas.items():
+
+    static_gas[int(_hex_op, 16)] = _cost
@@ -1,15 +1,65 @@
 """
 Module containg logic for hashing
 
-keccak256() can be found here
+keccak256() and keccak256_int() can be found here
 """
 
-from web3 import Web3
+from Crypto.Hash import keccak
 
-def keccak256(hex: str):
+# Number of 64-byte preimages whose hashes are remembered. Solidity hashes a
+# key and a slot number (two words) for every mapping access, so the same
+# preimages come up again and again
+MEMO_SIZE = 4096
 
-    # Execute hexadecimal logic
-    hashed_value = Web3.keccak(hexstr=hex).hex()
+# Maps 64-byte preimages to their hashes as ints. Emptied whenever it fills
+# up, which costs less per hash than keeping it in LRU order
+_memo = {}
 
-    return hashed_value[2:]
+# High bytes of the second word of the preimages worth memoizing. Mapping
+# slot numbers are small, so the memo is skipped for other 64-byte inputs
+# (two hashes, a key and a nested mapping's slot, ...), which would rarely hit
+# while paying for an insertion every time
+_SLOT_PREFIX = bytes(24)
 
+def _digest(data) -> bytes:
+
+    return keccak.new(data=data, digest_bits=256).digest()
+
+def keccak256_int(data) -> int:
+    """
+    Returns the keccak256 hash of the bytes-like object data as an int
+
+    Hashes of 64-byte preimages of a mapping slot (a word, then a slot number
+    below 2**64) are memoized. A miss only adds a dict lookup and insertion to
+    the hash itself, and the copy of data used as the key is hashed instead of
+    data (pycryptodome reads bytes faster than views)
+    """
+    if len(data) == 64 and data[32:56] == _SLOT_PREFIX:
+
+        key = bytes(data)
+        value = _memo.get(key)
+
+        if value is None:
+
+            value = int.from_bytes(keccak.new(data=key, digest_bits=256).digest(), "big")
+
+            if len(_memo) >= MEMO_SIZE:
+
+                _memo.clear()
+
+            _memo[key] = value
+
+        return value
+
+    return int.from_bytes(keccak.new(data=data, digest_bits=256).digest(), "big")
+
+def keccak256(hex: str) -> str:
+    """
+    Returns the keccak256 hash of the hexadecimal string hex as a 64 character
+    hexadecimal string without prefix
+    """
+    if hex.startswith(("0x", "0X")):
+
+        hex = hex[2:]
+
+    return _digest(bytes.fromhex(hex)).hex()
@@ -34,7 +34,7 @@ opcodes_str = {
 "1B"      : "SHL",
 "1C"      : "SHR",
 "1D"      : "SAR",
-"20"      : "SHA3",
+"20"      : "KECCAK256",
 "30"      : "ADDRESS",
 "31"      : "BALANCE",
 "32"      : "ORIGIN",
@@ -222,3 +222,171 @@ swap_opcodes = [
     "9E",
     "9F"
 ]
+
+# Maps opcodes to (items popped, items pushed). The number of items an
+# instruction requires on the stack is the number it pops
+opcodes_stack = {
+"00"      : (0, 0),
+"01"      : (2, 1),
+"02"      : (2, 1),
+"03"      : (2, 1),
+"04"      : (2, 1),
+"05"      : (2, 1),
+"06"      : (2, 1),
+"07"      : (2, 1),
+"08"      : (3, 1),
+"09"      : (3, 1),
+"0A"      : (2, 1),
+"0B"      : (2, 1),
+"10"      : (2, 1),
+"11"      : (2, 1),
+"12"      : (2, 1),
+"13"      : (2, 1),
+"14"      : (2, 1),
+"15"      : (1, 1),
+"16"      : (2, 1),
+"17"      : (2, 1),
+"18"      : (2, 1),
+"19"      : (1, 1),
+"1A"      : (2, 1),
+"1B"      : (2, 1),
+"1C"      : (2, 1),
+"1D"      : (2, 1),
+"20"      : (2, 1),
+"30"      : (0, 1),
+"31"      : (1, 1),
+"32"      : (0, 1),
+"33"      : (0, 1),
+"34"      : (0, 1),
+"35"      : (1, 1),
+"36"      : (0, 1),
+"37"      : (3, 0),
+"38"      : (0, 1),
+"39"      : (3, 0),
+"3A"      : (0, 1),
+"3B"      : (1, 1),
+"3C"      : (4, 0),
+"3D"      : (0, 1),
+"3E"      : (3, 0),
+"3F"      : (1, 1),
+"40"      : (1, 1),
+"41"      : (0, 1),
+"42"      : (0, 1),
+"43"      : (0, 1),
+"44"      : (0, 1),
+"45"      : (0, 1),
+"46"      : (0, 1),
+"47"      : (0, 1),
+"48"      : (0, 1),
+"50"      : (1, 0),
+"51"      : (1, 1),
+"52"      : (2, 0),
+"53"      : (2, 0),
+"54"      : (1, 1),
+"55"      : (2, 0),
+"56"      : (1, 0),
+"57"      : (2, 0),
+"58"      : (0, 1),
+"59"      : (0, 1),
+"5A"      : (0, 1),
+"5B"      : (0, 0),
+"60"      : (0, 1),
+"61"      : (0, 1),
+"62"      : (0, 1),
+"63"      : (0, 1),
+"64"      : (0, 1),
+"65"      : (0, 1),
+"66"      : (0, 1),
+"67"      : (0, 1),
+"68"      : (0, 1),
+"69"      : (0, 1),
+"6A"      : (0, 1),
+"6B"      : (0, 1),
+"6C"      : (0, 1),
+"6D"      : (0, 1),
+"6E"      : (0, 1),
+"6F"      : (0, 1),
+"70"      : (0, 1),
+"71"      : (0, 1),
+"72"      : (0, 1),
+"73"      : (0, 1),
+"74"      : (0, 1),
+"75"      : (0, 1),
+"76"      : (0, 1),
+"77"      : (0, 1),
+"78"      : (0, 1),
+"79"      : (0, 1),
+"7A"      : (0, 1),
+"7B"      : (0, 1),
+"7C"      : (0, 1),
+"7D"      : (0, 1),
+"7E"      : (0, 1),
+"7F"      : (0, 1),
+"80"      : (1, 2),
+"81"      : (2, 3),
+"82"      : (3, 4),
+"83"      : (4, 5),
+"84"      : (5, 6),
+"85"      : (6, 7),
+"86"      : (7, 8),
+"87"      : (8, 9),
+"88"      : (9, 10),
+"89"      : (10, 11),
+"8A"      : (11, 12),
+"8B"      : (12, 13),
+"8C"      : (13, 14),
+"8D"      : (14, 15),
+"8E"      : (15, 16),
+"8F"      : (16, 17),
+"90"      : (2, 2),
+"91"      : (3, 3),
+"92"      : (4, 4),
+"93"      : (5, 5),
+"94"      : (6, 6),
+"95"      : (7, 7),
+"96"      : (8, 8),
+"97"      : (9, 9),
+"98"      : (10, 10),
+"99"      : (11, 11),
+"9A"      : (12, 12),
+"9B"      : (13, 13),
+"9C"      : (14, 14),
+"9D"      : (15, 15),
+"9E"      : (16, 16),
+"9F"      : (17, 17),
+"A0"      : (2, 0),
+"A1"      : (3, 0),
+"A2"      : (4, 0),
+"A3"      : (5, 0),
+"A4"      : (6, 0),
+"F0"      : (3, 1),
+"F1"      : (7, 1),
+"F2"      : (7, 1),
+"F3"      : (2, 0),
+"F4"      : (6, 1),
+"F5"      : (4, 1),
+"FA"      : (6, 1),
+"FD"      : (2, 0),
+"FF"      : (1, 0),
+}
+
+# Opcodes after which no further instruction of the same basic block may run,
+# either because control flow leaves the block or because the instruction
+# depends on the exact amount of gas left
+block_ending_opcodes = [
+    "00",
+    "55",
+    "56",
+    "57",
+    "5A",
+    "F0",
+    "F1",
+    "F2",
+    "F3",
+    "F4",
+    "F5",
+    "FA",
+    "FD",
+    "FE",
+    "FF"
+]
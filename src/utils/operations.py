@@ -2,349 +2,302 @@
 Module containing the logic for all EVM operations
 
 Each function takes care of the associated stack, memory, program counter, and
-gas 
+dynamic gas. The static gas of every instruction is charged once per basic
+block by the interpreter
+
+Stack items are plain ints in the range [0, 2**256 - 1] (see EVMIntStack), so
+every result is masked back into that range. U256 objects are only created when
+values are handed to the memory, storage, or address APIs
 """
 
-from ..bytecode import EVMInstruction
-from .u256 import U256
+from ..bytecode import EVMInstruction, load_rom
+from .u256 import U256, UINT256_MAX, UINT256_CEILING, signed_div, signed_mod, sign_extend, signed_lt, signed_gt, arithmetic_shr
 from .gas import charge_gas, sstore_gas_check
-from .hashing import keccak256
+from .hashing import keccak256_int
 from .exceptions import *
 from .address import EVMAddress
 from ..logs import EVMLog
-from ..evm import EVM
+from ..transaction import EVMMessage
+from ..evm import EVM, CALL_DEPTH_LIMIT, LAST_PRECOMPILE
+
+# Mask used to truncate stack items to 160-bit addresses
+ADDRESS_MASK = 2**160 - 1
+
+def _to_address(value: int) -> EVMAddress:
+
+    return EVMAddress(uint=U256.of(value & ADDRESS_MASK))
 
 def stop(evm: EVM):
 
     evm._stop = True
     evm._pc += 1
-    charge_gas(evm, "00")
 
 def add(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.add(a, b))
+    evm._stack.push((a + b) & UINT256_MAX)
 
     evm._pc += 1
 
-    charge_gas(evm, "01")
-
 def mul(evm: EVM):
 
     a = evm._stack.pop()
-    b = evm._stack.pop()    
-    evm._stack.push(U256.mul(a, b))
+    b = evm._stack.pop()
+    evm._stack.push((a * b) & UINT256_MAX)
 
     evm._pc += 1
 
-    charge_gas(evm, "02")
-
 def sub(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.sub(a, b))
+    evm._stack.push((a - b) & UINT256_MAX)
 
     evm._pc += 1
 
-    charge_gas(evm, "03")
-
 def div(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.div(a, b))
+    evm._stack.push(a // b if b != 0 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "04")
-
 def sdiv(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.div(a, b))
+    evm._stack.push(signed_div(a, b))
 
     evm._pc += 1
 
-    charge_gas(evm, "05")
-
 def mod(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.mod(a, b))
+    evm._stack.push(a % b if b != 0 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "06")
-
 def smod(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.smod(a, b))
+    evm._stack.push(signed_mod(a, b))
 
     evm._pc += 1
 
-    charge_gas(evm, "07")
-
 def addmod(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
     N = evm._stack.pop()
-    evm._stack.push(U256.addmod(a, b, N))
+    evm._stack.push((a + b) % N if N != 0 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "08")
-
 def mulmod(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
     N = evm._stack.pop()
-    evm._stack.push(U256.mulmod(a, b, N))
+    evm._stack.push((a * b) % N if N != 0 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "09")
-
 def exp(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.exp(a, b))
+    evm._stack.push(pow(a, b, UINT256_CEILING))
 
     evm._pc += 1
 
-    binary_b = bin(b.to_int())[2:]
-    charge_gas(evm, "0A", metadata = len(binary_b))
+    charge_gas(evm, "0A", metadata = b.bit_length())
 
 def signextend(evm: EVM):
 
     b = evm._stack.pop()
     x = evm._stack.pop()
-    evm._stack.push(U256.sign_extend(b, x))
+    evm._stack.push(sign_extend(b, x))
 
     evm._pc += 1
 
-    charge_gas(evm, "0B")
-
 def lt(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.lt(a, b))
+    evm._stack.push(1 if a < b else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "10")
-
-def gt(evm: EVM): 
+def gt(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.gt(a, b))
+    evm._stack.push(1 if a > b else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "11")
-
 def slt(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.slt(a, b))
+    evm._stack.push(signed_lt(a, b))
 
     evm._pc += 1
 
-    charge_gas(evm, "12")
-
 def sgt(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.sgt(a, b))
+    evm._stack.push(signed_gt(a, b))
 
     evm._pc += 1
 
-    charge_gas(evm, "13")
-
 def eq(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.eq(a, b))
+    evm._stack.push(1 if a == b else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "14")
-
 def iszero(evm: EVM):
 
     a = evm._stack.pop()
-    evm._stack.push(U256.is_zero(a))
+    evm._stack.push(1 if a == 0 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "15")
-
 def bitwise_and(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.bitwise_and(a, b))
+    evm._stack.push(a & b)
 
     evm._pc += 1
 
-    charge_gas(evm, "16")
-
 def bitwise_or(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.bitwise_or(a, b))
+    evm._stack.push(a | b)
 
     evm._pc += 1
 
-    charge_gas(evm, "17")
-
 def bitwise_xor(evm: EVM):
 
     a = evm._stack.pop()
     b = evm._stack.pop()
-    evm._stack.push(U256.bitwise_xor(a, b))
+    evm._stack.push(a ^ b)
 
     evm._pc += 1
 
-    charge_gas(evm, "18")
-
 def bitwise_not(evm: EVM):
 
     a = evm._stack.pop()
-    evm._stack.push(U256.bitwise_not(a))
+    evm._stack.push(a ^ UINT256_MAX)
 
     evm._pc += 1
 
-    charge_gas(evm, "19")
-
 def byte(evm: EVM):
 
     i = evm._stack.pop()
     x = evm._stack.pop()
-    evm._stack.push(U256.byte(i, x))
+    # Byte 0 is the most significant byte
+    evm._stack.push((x >> (248 - i * 8)) & 0xFF if i < 32 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "1A")
-
 def shl(evm: EVM):
 
     shift = evm._stack.pop()
     value = evm._stack.pop()
-    evm._stack.push(U256.shl(shift, value))
+    evm._stack.push((value << shift) & UINT256_MAX if shift < 256 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "1B")
-
 def shr(evm: EVM):
 
     shift = evm._stack.pop()
     value = evm._stack.pop()
-    evm._stack.push(U256.shr(shift, value))
+    evm._stack.push(value >> shift if shift < 256 else 0)
 
     evm._pc += 1
 
-    charge_gas(evm, "1C")
-
 def sar(evm: EVM):
 
     shift = evm._stack.pop()
     value = evm._stack.pop()
-    evm._stack.push(U256.sar(shift, value))
+    evm._stack.push(arithmetic_shr(shift, value))
 
     evm._pc += 1
 
-    charge_gas(evm, "1D")
-
 def sha3(evm: EVM):
 
     # Pop items from stack
     offset = evm._stack.pop()
     length = evm._stack.pop()
 
+    mem_cost = evm._memory.expand_to(offset, length, evm._gas)
+
     # Get value from memory
-    value = evm._memory.load_custom(offset, length)
+    with evm._memory.read_view(offset, length) as value:
 
-    # Every two chars is a byte
-    value_byte_len = len(value.get_value()) // 2
-    value_word_len = (value_byte_len + 31) // 32 
+        evm._stack.push(keccak256_int(value))
 
-    hashed_value = keccak256(hex = value)
-
-    evm._stack.push(
-        U256(int(hashed_value, 16))
-    )
+    value_word_len = (length + 31) // 32
 
     evm._pc += 1
 
     charge_gas(
-        evm, 
-        "20", 
+        evm,
+        "20",
         {
             "data_size_words": value_word_len,
-            "mem_expansion_cost": value.get_mem_expansion_cost()
+            "mem_expansion_cost": mem_cost
         }
     )
 
 def address(evm: EVM):
 
     evm._stack.push(
-        evm._msg.get_recipient()
+        evm._msg.get_recipient().get_uint().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "30")
-
 def balance(evm: EVM):
 
-    address = evm._stack.pop()
-
-    is_touched = evm._storage.is_address_touched(EVMAddress(uint=address))
+    address = _to_address(evm._stack.pop())
+    is_cold = not evm._storage.is_address_touched(address)
 
     evm._stack.push(
-        evm._storage.get_contract_balance(EVMAddress(uint=address))
+        evm._storage.get_contract_balance(address).to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "31", is_touched)
+    charge_gas(evm, "31", is_cold)
 
 def origin(evm: EVM):
 
     evm._stack.push(
-        evm._tx.get_origin()
+        evm._tx.get_origin().get_uint().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "32")
-
 def caller(evm: EVM):
 
     evm._stack.push(
-        evm._msg.get_sender()
+        evm._msg.get_sender().get_uint().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "33")
-
 def callvalue(evm: EVM):
 
     evm._stack.push(
@@ -353,50 +306,44 @@ def callvalue(evm: EVM):
 
     evm._pc += 1
 
-    charge_gas(evm, "34")
-
 def calldataload(evm: EVM):
 
     i = evm._stack.pop()
 
     evm._stack.push(
-        evm._msg.load_data(i)
+        evm._msg.load_data(U256.of(i)).to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "35")
-
 def calldatasize(evm: EVM):
 
     evm._stack.push(
-        evm._msg.get_data_size()
+        evm._msg.get_data_size().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "36")
-
 def calldatacopy(evm: EVM):
 
     destOffset = evm._stack.pop()
     offset = evm._stack.pop()
     length = evm._stack.pop()
-    
-    data = evm._msg.load_data_custom(offset, length)
 
-    return_value = evm._memory.store_custom(destOffset, length, data)
+    mem_cost = evm._memory.expand_to(destOffset, length, evm._gas)
+
+    evm._memory.write_bytes(destOffset, evm._msg.load_data_bytes(offset, length))
 
-    words = (length.to_int() + 31) // 32
+    words = (length + 31) // 32
 
     evm._pc += 1
 
     charge_gas(
-        evm, 
+        evm,
         "37",
         {
-            words,
-            return_value.get_mem_expansion_cost()
+            "data_size_words": words,
+            "mem_expansion_cost": mem_cost
         }
         )
 
@@ -408,19 +355,17 @@ def codesize(evm: EVM):
 
     evm._pc += 1
 
-    charge_gas(evm, "38")
-
 def codecopy(evm: EVM):
-    
+
     destOffset = evm._stack.pop()
     offset = evm._stack.pop()
     length = evm._stack.pop()
 
-    code = evm._rom.get_code(offset, length)
+    mem_cost = evm._memory.expand_to(destOffset, length, evm._gas)
 
-    return_val = evm._memory.store_custom(destOffset, length, code)
+    evm._memory.write_bytes(destOffset, evm._rom.get_code_bytes(offset, length))
 
-    words = (length.to_int() + 31) // 32
+    words = (length + 31) // 32
 
     evm._pc += 1
 
@@ -429,7 +374,7 @@ def codecopy(evm: EVM):
         "39",
         {
             "data_size_words": words,
-            "mem_expansion_cost": return_val.get_mem_expansion_cost()
+            "mem_expansion_cost": mem_cost
         }
     )
 
@@ -441,299 +386,284 @@ def gasprice(evm: EVM):
 
     evm._pc += 1
 
-    charge_gas(evm, "3A")
-
 def extcodesize(evm: EVM):
 
-    address = EVMAddress(evm._stack.pop())
-
-    is_touched = evm._storage.is_address_touched(address)
+    address = _to_address(evm._stack.pop())
+    is_cold = not evm._storage.is_address_touched(address)
 
     size = evm._storage.get_contract_bytecode_size(address)
 
-    evm._stack.push(size)
+    evm._stack.push(size.to_int())
 
     evm._pc += 1
 
-    charge_gas(evm, "3B", is_touched)
-
+    charge_gas(evm, "3B", is_cold)
 
 def extcodecopy(evm: EVM):
 
-    address = EVMAddress(evm._stack.pop())
+    address = _to_address(evm._stack.pop())
     destOffset = evm._stack.pop()
     offset = evm._stack.pop()
     length = evm._stack.pop()
+    is_cold = not evm._storage.is_address_touched(address)
 
-    is_touched = evm._storage.is_address_touched(address)
+    mem_cost = evm._memory.expand_to(destOffset, length, evm._gas)
 
-    code = evm._storage.get_contract_bytecode_custom(address, offset, length)
+    code = evm._storage.get_contract_bytecode_custom(address, U256.of(offset), U256.of(length))
 
-    code_len = len(code) // 2 # Bytes
-    data_size_words = (code_len + 31) // 32
+    evm._memory.write_bytes(destOffset, code)
 
-    return_val = evm._memory.store_custom(destOffset, length, code)
+    data_size_words = (length + 31) // 32
 
     evm._pc += 1
 
     charge_gas(
-        evm, 
-        "3C", 
+        evm,
+        "3C",
         {
-            "is_touched": is_touched,
             "data_size_words": data_size_words,
-            "mem_expansion_cost": return_val.get_mem_expansion_cost()
+            "mem_expansion_cost": mem_cost,
+            "is_cold": is_cold
         }
     )
 
 def returndatasize(evm: EVM):
 
-    evm._stack.push(
-        U256(len(evm._return_data.get_data()))
-    )
+    evm._stack.push(evm._return_data.get_size())
 
     evm._pc += 1
 
-    charge_gas(evm, "3D")
-
 def returndatacopy(evm: EVM):
 
     destOffset = evm._stack.pop()
     offset = evm._stack.pop()
     length = evm._stack.pop()
 
-    data = evm._return_data.get_data_custom(offset, length)
+    # Checked before expanding, as reading past the end is an exceptional halt
+    data = evm._return_data.load_bytes(offset, length)
 
-    data_size = len(data) // 2
-    data_word_size = (data_size + 31) // 32
+    mem_cost = evm._memory.expand_to(destOffset, length, evm._gas)
 
-    return_val = evm._memory.store_custom(destOffset, length, data)
+    evm._memory.write_bytes(destOffset, data)
+
+    data_word_size = (length + 31) // 32
 
     evm._pc += 1
 
     charge_gas(
-        evm, 
-        "3E", 
+        evm,
+        "3E",
         {
             "data_size_words": data_word_size,
-            "mem_expansion_cost": return_val.get_mem_expansion_cost()
+            "mem_expansion_cost": mem_cost
         }
         )
 
 def extcodehash(evm: EVM):
 
-    pass
+    raise EVMOperationNotImplemented()
 
 def blockhash(evm: EVM):
 
-    pass
+    raise EVMOperationNotImplemented()
 
 def coinbase(evm: EVM):
 
     evm._stack.push(
-        evm._current_block.get_coinbase()
+        evm._current_block.get_coinbase().get_uint().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "41")
-
 def timestamp(evm: EVM):
 
     evm._stack.push(
-        evm._current_block.get_timestamp()
+        evm._current_block.get_timestamp().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "42")
-
 def number(evm: EVM):
 
     evm._stack.push(
-        evm._current_block.get_number()
+        evm._current_block.get_number().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "43")
-
 def difficulty(evm: EVM):
 
     evm._stack.push(
-        evm._current_block.get_difficulty()
+        evm._current_block.get_difficulty().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "44")
-
 def gaslimit(evm: EVM):
 
     evm._stack.push(
-        evm._current_block.get_gas_limit()
+        evm._current_block.get_gas_limit().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "45")
-
 def chainid(evm: EVM):
 
     evm._stack.push(
-        U256(evm._state.get_chain_id())
+        evm._state.get_chain_id()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "46")
-
 def selfbalance(evm: EVM):
 
     # Don't need to check for touched addresses since executing contract's
     # addresses is already added during EVM initialization
 
     evm._stack.push(
-        evm._storage.get_contract_balance(evm._msg.get_recipient())
+        evm._storage.get_contract_balance(evm._msg.get_recipient()).to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "47")
-
 def basefee(evm: EVM):
 
     evm._stack.push(
-        evm._current_block.get_base_fee()
+        evm._current_block.get_base_fee().to_int()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "48")
-
 def pop(evm: EVM):
 
     evm._stack.pop()
 
     evm._pc += 1
 
-    charge_gas(evm, "50")
-
 def mload(evm: EVM):
 
     offset = evm._stack.pop()
 
-    return_val = evm._memory.load(offset)
+    mem_cost = evm._memory.expand_to(offset, 32, evm._gas)
+
+    evm._stack.push(evm._memory.read_word(offset))
 
     evm._pc += 1
 
-    charge_gas(evm, "51", return_val.get_mem_expansion_cost())
+    charge_gas(evm, "51", mem_cost)
 
 def mstore(evm: EVM):
 
     offset = evm._stack.pop()
     value = evm._stack.pop()
 
-    return_val = evm._memory.store(offset, value)
+    mem_cost = evm._memory.expand_to(offset, 32, evm._gas)
+
+    evm._memory.write_word(offset, value)
 
     evm._pc += 1
 
-    charge_gas(evm, "52", return_val.get_mem_expansion_cost())
+    charge_gas(evm, "52", mem_cost)
 
 def mstore8(evm: EVM):
 
     offset = evm._stack.pop()
     value = evm._stack.pop()
 
-    value = U256.bitwise_and(value, U256(255))
+    mem_cost = evm._memory.expand_to(offset, 1, evm._gas)
 
-    return_val = evm._memory.store(offset, value)
+    # Only the least significant byte is written
+    evm._memory.write_byte(offset, value & 0xFF)
 
     evm._pc += 1
 
-    charge_gas(evm, "53", return_val.get_mem_expansion_cost())
+    charge_gas(evm, "53", mem_cost)
 
 def sload(evm: EVM):
 
-    key = evm._stack.pop()
-
-    is_slot_touched = evm._storage.is_storage_slot_touched(evm._msg.get_recipient())
+    key = U256.of(evm._stack.pop())
+    is_cold = not evm._storage.is_storage_slot_touched(evm._msg.get_recipient(), key)
 
     value = evm._storage.load(
         evm._msg.get_recipient(),
         key
     )
 
-    evm._stack.push(value)
+    evm._stack.push(value.to_int())
 
     evm._pc += 1
 
-    charge_gas(evm, "54", is_slot_touched)
+    charge_gas(evm, "54", is_cold)
 
 def sstore(evm: EVM):
     """
     Perhaps the most difficult operation in terms of gas...
     """
-    key = evm._stack.pop()
+    key = U256.of(evm._stack.pop())
     new_value = evm._stack.pop()
 
-    original_value = evm._storage.load_immutable(
+    if evm._static:
+
+        raise EVMStaticStateChange()
+
+    sstore_gas_check(evm)
+
+    # Must be checked before loading, which marks the slot as touched
+    is_slot_touched = evm._storage.is_storage_slot_touched(
         evm._msg.get_recipient(),
         key
     )
+
+    original_value = evm._storage.load_immutable(
+        evm._msg.get_recipient(),
+        key
+    ).to_int()
     current_value = evm._storage.load(
         evm._msg.get_recipient(),
         key
-    )
+    ).to_int()
 
     gas_cost = 0
     gas_refund = 0
 
-    sstore_gas_check(evm)
-
-    is_slot_touched = evm._storage.is_storage_slot_touched(
-        evm._msg.get_recipient(),
-        key
-    )
-
     if not is_slot_touched:
 
         gas_cost += 2100
 
-    if new_value.to_int() == current_value.to_int():
+    if new_value == current_value:
         gas_cost += 100
     else: # new_value != current_value
-        if current_value.to_int() == original_value.to_int():
-            if original_value.to_int() == 0:
+        if current_value == original_value:
+            if original_value == 0:
                 gas_cost += 20000
             else: # original_value != 0
                 gas_cost += 2900
-                if new_value.to_int() == 0:
+                if new_value == 0:
                     gas_refund += 4800
         else: # current_value != original value
             gas_cost += 100
-            if original_value.to_int() != 0:
-                if current_value.to_int() == 0:
+            if original_value != 0:
+                if current_value == 0:
                     gas_refund -= 4800
-                elif new_value.to_int() == 0:
+                elif new_value == 0:
                     gas_refund += 4800
-            if new_value.to_int() == original_value.to_int():
-                if original_value.to_int() == 0:
+            if new_value == original_value:
+                if original_value == 0:
                     gas_refund += 19900
                 else: # original_value != 0
                     gas_refund += 2800
 
     evm._storage.store(
         evm._msg.get_recipient(),
-        key, 
-        new_value
+        key,
+        U256.of(new_value)
     )
 
     evm._pc += 1
 
     charge_gas(
-        evm, 
-        "55", 
+        evm,
+        "55",
         {
             "gas_cost": gas_cost,
             "gas_refund": gas_refund,
@@ -744,223 +674,276 @@ def sstore(evm: EVM):
 def jump(evm: EVM):
 
     destination = evm._stack.pop()
-    assoc_insn = evm._rom.get_insn(destination.to_int())
-    if assoc_insn != "5B":
 
-        raise EVMInvalidJumpDesination(destination.to_int())
+    if not evm._rom.is_valid_jump_destination(destination):
 
-    evm._pc = destination.to_int()
+        raise EVMInvalidJumpDesination(destination)
 
-    charge_gas(evm, "56")
+    evm._pc = destination
 
 def jumpi(evm: EVM):
 
     destination = evm._stack.pop()
     condition = evm._stack.pop()
 
-    if condition.to_int() == 0:
+    if condition == 0:
         evm._pc += 1
     else:
-        assoc_insn = evm._rom.get_insn(destination.to_int())
-        
-        if assoc_insn != "5B":
-
-            raise EVMInvalidJumpDesination(destination.to_int())
+        if not evm._rom.is_valid_jump_destination(destination):
 
-        evm._pc = destination.to_int()
+            raise EVMInvalidJumpDesination(destination)
 
-    charge_gas(evm, "57")
+        evm._pc = destination
 
 def pc(evm: EVM):
 
-    evm._stack.push(
-        U256(evm._pc)
-    )
+    evm._stack.push(evm._pc)
 
     evm._pc += 1
 
-    charge_gas(evm, "58")
-
 def msize(evm: EVM):
 
     evm._stack.push(
-        evm._memory.get_size()
+        evm._memory.get_msize()
     )
 
     evm._pc += 1
 
-    charge_gas(evm, "59")
-
 def gas(evm: EVM):
 
-    evm._stack.push(
-        U256(evm._gas)
-    )
+    evm._stack.push(evm._gas)
 
     evm._pc += 1
 
-    charge_gas(evm, "5A")
-
 def jumpdest(evm: EVM):
 
     evm._pc += 1
-    charge_gas(evm, "5B")
 
-def push(evm: EVM, bytes_to_push: str, size: int):
+def push(evm: EVM, value: int, size: int):
 
-    evm._stack.push(
-        U256(int(bytes_to_push, 16))
-    )
+    evm._stack.push(value)
 
     evm._pc += 1 + size
 
-    charge_gas(evm, "PUSH")
-
 def dup(evm: EVM, index_to_dup: int):
 
-    evm._stack.dup(int)
+    evm._stack.push(evm._stack[-index_to_dup])
 
     evm._pc += 1
 
-    charge_gas(evm, "DUP")
-
 def swap(evm: EVM, index_to_swap: int):
 
-    evm._stack.swap(index_to_swap)
+    stack = evm._stack
+    stack[-1], stack[-1 - index_to_swap] = stack[-1 - index_to_swap], stack[-1]
 
     evm._pc += 1
 
-    charge_gas(evm, "SWAP")
-
-def log0(evm: EVM):
-
+def _log(evm: EVM, topic_count: int):
+    """
+    Shared logic of LOG0 - LOG4
+    """
     offset = evm._stack.pop()
     length = evm._stack.pop()
+    topics = [evm._stack.pop().to_bytes(32, "big") for _ in range(topic_count)]
 
-    return_val = evm._memory.load_custom(offset, length)
+    if evm._static:
 
-    log = EVMLog(
-        evm._msg.get_recipient(),
-        return_val.get_value()
-    )
+        raise EVMStaticStateChange()
+
+    mem_cost = evm._memory.expand_to(offset, length, evm._gas)
+
+    with evm._memory.read_view(offset, length) as data:
+
+        log = EVMLog(
+            evm._msg.get_recipient(),
+            bytes(data),
+            *topics
+            )
 
     evm._log_storage.add_log(log)
 
     evm._pc += 1
 
-    charge_gas(evm , "A0", return_val.get_mem_expansion_cost())
+    charge_gas(
+        evm,
+        f"A{topic_count}",
+        {
+            "data_size": length,
+            "mem_expansion_cost": mem_cost
+        }
+    )
+
+def log0(evm: EVM):
+
+    _log(evm, 0)
 
 def log1(evm: EVM):
 
-    offset = evm._stack.pop()
-    length = evm._stack.pop()
-    topic0 = evm._stack.pop()
+    _log(evm, 1)
 
-    return_val = evm._memory.load_custom(offset, length)
+def log2(evm: EVM):
 
-    log = EVMLog(
-        evm._msg.get_recipient(),
-        return_val.get_value(),
-        topic0=topic0.to_hex_string()
-        )
+    _log(evm, 2)
 
-    evm._log_storage.add_log(log)
+def log3(evm: EVM):
 
-    evm._pc += 1
+    _log(evm, 3)
 
-    charge_gas(evm , "A0", return_val.get_mem_expansion_cost())
+def log4(evm: EVM):
 
-def log2(evm: EVM):
+    _log(evm, 4)
 
-    offset = evm._stack.pop()
-    length = evm._stack.pop()
-    topic0 = evm._stack.pop()
-    topic1 = evm._stack.pop()
+def create(evm: EVM):
 
-    return_val = evm._memory.load_custom(offset, length)
+    raise EVMOperationNotImplemented()
 
-    log = EVMLog(
-        evm._msg.get_recipient(),
-        return_val.get_value(),
-        topic0=topic0.to_hex_string(),
-        topic1=topic1.to_hex_string()
-        )
+def _call(evm: EVM, call_type: str, insn: str):
+    """
+    Shared logic of CALL, CALLCODE, DELEGATECALL and STATICCALL
 
-    evm._log_storage.add_log(log)
+    Charges the call and starts executing the callee in a new frame (see
+    EVM.enter_frame()). The interpreter resumes the caller, pushing whether
+    the call succeeded, once the callee stops. Calls past the depth limit or
+    transferring more than the caller's balance fail without executing
+    """
+    gas = evm._stack.pop()
+    address = _to_address(evm._stack.pop())
+    value = evm._stack.pop() if call_type in ("CALL", "CALLCODE") else 0
+    args_offset = evm._stack.pop()
+    args_size = evm._stack.pop()
+    ret_offset = evm._stack.pop()
+    ret_size = evm._stack.pop()
 
-    evm._pc += 1
+    if evm._static and call_type == "CALL" and value != 0:
 
-    charge_gas(evm , "A0", return_val.get_mem_expansion_cost())
+        raise EVMStaticStateChange()
 
-def log3(evm: EVM):
+    if 0 < address.get_uint().to_int() <= LAST_PRECOMPILE:
 
-    offset = evm._stack.pop()
-    length = evm._stack.pop()
-    topic0 = evm._stack.pop()
-    topic1 = evm._stack.pop()
-    topic2 = evm._stack.pop()
+        raise EVMOperationNotImplemented(f"precompile {address.get_hex()}")
 
-    return_val = evm._memory.load_custom(offset, length)
+    mem_cost = evm._memory.expand_to(args_offset, args_size, evm._gas)
+    mem_cost += evm._memory.expand_to(ret_offset, ret_size, evm._gas - mem_cost)
 
-    log = EVMLog(
-        evm._msg.get_recipient(),
-        return_val.get_value(),
-        topic0=topic0.to_hex_string(),
-        topic1=topic1.to_hex_string(),
-        topic2=topic2.to_hex_string()
-        )
+    is_cold = not evm._storage.is_address_touched(address)
+    # Sending value to an empty account creates it
+    new_account = (
+        call_type == "CALL"
+        and value != 0
+        and evm._storage.get_contract_balance(address).to_int() == 0
+        and evm._storage.get_contract_bytecode_size(address).to_int() == 0
+    )
 
-    evm._log_storage.add_log(log)
+    evm._storage.add_touched_address(address)
 
     evm._pc += 1
 
-    charge_gas(evm , "A0", return_val.get_mem_expansion_cost())
+    charge_gas(
+        evm,
+        insn,
+        {
+            "mem_expansion_cost": mem_cost,
+            "is_cold": is_cold,
+            "value": value,
+            "new_account": new_account
+        }
+    )
 
-def log4(evm: EVM):
+    # EIP-150: at most all but one 64th of the remaining gas is forwarded
+    call_gas = min(gas, evm._gas - evm._gas // 64)
+    evm._gas -= call_gas
 
-    offset = evm._stack.pop()
-    length = evm._stack.pop()
-    topic0 = evm._stack.pop()
-    topic1 = evm._stack.pop()
-    topic2 = evm._stack.pop()
-    topic3 = evm._stack.pop()
+    if value != 0:
+        # Stipend given to the callee for free
+        call_gas += 2300
 
-    return_val = evm._memory.load_custom(offset, length)
+    current = evm._msg.get_recipient()
 
-    log = EVMLog(
-        evm._msg.get_recipient(),
-        return_val.get_value(),
-        topic0=topic0.to_hex_string(),
-        topic1=topic1.to_hex_string(),
-        topic2=topic2.to_hex_string(),
-        topic3=topic3.to_hex_string()
-        )
+    if len(evm._frames) >= CALL_DEPTH_LIMIT or (value != 0 and evm._storage.get_contract_balance(current).to_int() < value):
 
-    evm._log_storage.add_log(log)
+        evm._gas += call_gas
+        evm.clear_return_data()
+        evm._stack.push(0)
+        return
 
-    evm._pc += 1
+    with evm._memory.read_view(args_offset, args_size) as data:
 
-    charge_gas(evm , "A0", return_val.get_mem_expansion_cost())
+        data = bytes(data)
 
-def create(evm: EVM):
+    if call_type == "CALL":
 
-    raise EVMOperationNotImplemented()
+        msg = EVMMessage(data, current, data[:4].hex(), value, address)
+
+    elif call_type == "CALLCODE":
+
+        msg = EVMMessage(data, current, data[:4].hex(), value, current)
+
+    elif call_type == "DELEGATECALL":
+
+        msg = EVMMessage(data, evm._msg.get_sender(), data[:4].hex(), evm._msg.get_value(), current)
+
+    else: # STATICCALL
+
+        msg = EVMMessage(data, current, data[:4].hex(), 0, address)
+
+    rom = load_rom(evm._storage.get_contract_bytecode(address))
+
+    evm.enter_frame(
+        call_type,
+        address,
+        msg,
+        rom,
+        call_gas,
+        evm._static or call_type == "STATICCALL",
+        ret_offset,
+        ret_size
+    )
+
+    if call_type == "CALL" and value != 0:
+        # Inside the new frame, so the transfer is undone if the call fails
+        evm._storage.set_contract_balance(
+            current,
+            U256.of(evm._storage.get_contract_balance(current).to_int() - value)
+        )
+        evm._storage.set_contract_balance(
+            address,
+            U256.of(evm._storage.get_contract_balance(address).to_int() + value)
+        )
 
 def call(evm: EVM):
 
-    raise EVMOperationNotImplemented()
+    _call(evm, "CALL", "F1")
 
 def callcode(evm: EVM):
 
-    raise EVMOperationNotImplemented()
+    _call(evm, "CALLCODE", "F2")
+
+def _halt_with_output(evm: EVM, insn: str):
+    """
+    Shared logic of RETURN and REVERT. The output is a view over memory, so
+    it isn't copied on its way to the caller
+    """
+    offset = evm._stack.pop()
+    length = evm._stack.pop()
+
+    mem_cost = evm._memory.expand_to(offset, length, evm._gas)
+
+    if length != 0:
+
+        evm._output = evm._memory.read_view(offset, length)
+
+    evm._stop = True
+    evm._pc += 1
+
+    charge_gas(evm, insn, mem_cost)
 
 def return_op(evm: EVM):
 
-    raise EVMOperationNotImplemented()
+    _halt_with_output(evm, "F3")
 
 def delegatecall(evm: EVM):
 
-    raise EVMOperationNotImplemented()
+    _call(evm, "DELEGATECALL", "F4")
 
 def create2(evm: EVM):
 
@@ -968,186 +951,159 @@ def create2(evm: EVM):
 
 def staticcall(evm: EVM):
 
-    raise EVMOperationNotImplemented()
+    _call(evm, "STATICCALL", "FA")
 
 def revert(evm: EVM):
 
-    raise EVMOperationNotImplemented()
+    evm._reverted = True
+    _halt_with_output(evm, "FD")
 
 def selfdestruct(evm: EVM):
 
     raise EVMOperationNotImplemented()
 
+def invalid(evm: EVM):
+
+    raise EVMInstructionNotFound(f"{evm._rom.get_opcode(evm._pc):02X}")
+
+def _make_push(size: int):
+    """
+    Returns a handler for PUSH<size> with the push width already bound
+    """
+    def push_n(evm: EVM):
+
+        push(evm, evm._rom._immediates[evm._pc], size)
+
+    push_n.__name__ = f"push{size}"
+    return push_n
+
+def _make_dup(index: int):
+    """
+    Returns a handler for DUP<index> with the stack index already bound
+    """
+    def dup_n(evm: EVM):
+
+        dup(evm, index)
+
+    dup_n.__name__ = f"dup{index}"
+    return dup_n
+
+def _make_swap(index: int):
+    """
+    Returns a handler for SWAP<index> with the stack index already bound
+    """
+    def swap_n(evm: EVM):
+
+        swap(evm, index)
+
+    swap_n.__name__ = f"swap{index}"
+    return swap_n
+
+def _build_jump_table() -> list:
+    """
+    Builds the 256-entry dispatch table mapping every integer opcode to the
+    function responsible for executing it. Undefined opcodes map to invalid()
+    """
+    table = [invalid] * 256
+
+    handlers = {
+        0x00: stop,
+        0x01: add,
+        0x02: mul,
+        0x03: sub,
+        0x04: div,
+        0x05: sdiv,
+        0x06: mod,
+        0x07: smod,
+        0x08: addmod,
+        0x09: mulmod,
+        0x0A: exp,
+        0x0B: signextend,
+        0x10: lt,
+        0x11: gt,
+        0x12: slt,
+        0x13: sgt,
+        0x14: eq,
+        0x15: iszero,
+        0x16: bitwise_and,
+        0x17: bitwise_or,
+        0x18: bitwise_xor,
+        0x19: bitwise_not,
+        0x1A: byte,
+        0x1B: shl,
+        0x1C: shr,
+        0x1D: sar,
+        0x20: sha3,
+        0x30: address,
+        0x31: balance,
+        0x32: origin,
+        0x33: caller,
+        0x34: callvalue,
+        0x35: calldataload,
+        0x36: calldatasize,
+        0x37: calldatacopy,
+        0x38: codesize,
+        0x39: codecopy,
+        0x3A: gasprice,
+        0x3B: extcodesize,
+        0x3C: extcodecopy,
+        0x3D: returndatasize,
+        0x3E: returndatacopy,
+        0x3F: extcodehash,
+        0x40: blockhash,
+        0x41: coinbase,
+        0x42: timestamp,
+        0x43: number,
+        0x44: difficulty,
+        0x45: gaslimit,
+        0x46: chainid,
+        0x47: selfbalance,
+        0x48: basefee,
+        0x50: pop,
+        0x51: mload,
+        0x52: mstore,
+        0x53: mstore8,
+        0x54: sload,
+        0x55: sstore,
+        0x56: jump,
+        0x57: jumpi,
+        0x58: pc,
+        0x59: msize,
+        0x5A: gas,
+        0x5B: jumpdest,
+        0xA0: log0,
+        0xA1: log1,
+        0xA2: log2,
+        0xA3: log3,
+        0xA4: log4,
+        0xF0: create,
+        0xF1: call,
+        0xF2: callcode,
+        0xF3: return_op,
+        0xF4: delegatecall,
+        0xF5: create2,
+        0xFA: staticcall,
+        0xFD: revert,
+        0xFF: selfdestruct,
+    }
+
+    for opcode, handler in handlers.items():
+        table[opcode] = handler
+
+    for i in range(1, 33):
+        table[0x5F + i] = _make_push(i)
+
+    for i in range(1, 17):
+        table[0x7F + i] = _make_dup(i)
+        table[0x8F + i] = _make_swap(i)
+
+    return table
+
+# Indexed directly by the integer opcode of the instruction being executed
+jump_table = _build_jump_table()
+
 def match_insn(evm: EVM, insn: EVMInstruction):
     """
     Function reponsible for matching EVM instruction to associated function
     """
-    readable_insn = insn.get_readable_op()
-    hex_insn = insn.get_hex_code()
-
-    if hex_insn == "00":
-        stop(evm)
-    elif hex_insn == "01":
-        add(evm)
-    elif hex_insn == "02":
-        mul(evm)
-    elif hex_insn == "03":
-        sub(evm)
-    elif hex_insn == "04":
-        div(evm)
-    elif hex_insn == "05":
-        sdiv(evm)
-    elif hex_insn == "06":
-        mod(evm) 
-    elif hex_insn == "07":
-        smod(evm)
-    elif hex_insn == "08":
-        addmod(evm)
-    elif hex_insn == "09":
-        mulmod(evm)
-    elif hex_insn == "0A":
-        exp(evm)
-    elif hex_insn == "0B":
-        signextend(evm)
-    elif hex_insn == "10":
-        lt(evm)
-    elif hex_insn == "11":
-        gt(evm)
-    elif hex_insn == "12":
-        slt(evm)
-    elif hex_insn == "13":
-        sgt(evm)
-    elif hex_insn == "14":
-        eq(evm)
-    elif hex_insn == "15":
-        iszero(evm)
-    elif hex_insn == "16":
-        bitwise_and(evm)
-    elif hex_insn == "17":
-        bitwise_or(evm)
-    elif hex_insn == "18":
-        bitwise_xor(evm)
-    elif hex_insn == "19":
-        bitwise_not(evm)
-    elif hex_insn == "1A":
-        byte(evm)
-    elif hex_insn == "1B":
-        shl(evm)
-    elif hex_insn == "1C":
-        shr(evm)
-    elif hex_insn == "1D":
-        sar(evm)
-    elif hex_insn == "20":
-        sha3(evm)
-    elif hex_insn == "30":
-        address(evm)
-    elif hex_insn == "31":
-        balance(evm)
-    elif hex_insn == "32":
-        origin(evm)
-    elif hex_insn == "33":
-        caller(evm)
-    elif hex_insn == "34":
-        callvalue(evm)
-    elif hex_insn == "35":
-        calldataload(evm)
-    elif hex_insn == "36":
-        calldatasize(evm)
-    elif hex_insn == "37":
-        calldatacopy(evm)
-    elif hex_insn == "38":
-        codesize(evm)
-    elif hex_insn == "39":
-        codecopy(evm)
-    elif hex_insn == "3A":
-        gasprice(evm)
-    elif hex_insn == "3B":
-        extcodesize(evm)
-    elif hex_insn == "3C":
-        extcodesize(evm)
-    elif hex_insn == "3D":
-        returndatasize(evm)
-    elif hex_insn == "3E":
-        returndatacopy(evm)
-    elif hex_insn == "3F":
-        extcodehash(evm)
-    elif hex_insn == "40":
-        blockhash(evm)
-    elif hex_insn == "41":
-        coinbase(evm)
-    elif hex_insn == "42":
-        timestamp(evm)
-    elif hex_insn == "43":
-        number(evm)
-    elif hex_insn == "44":
-        difficulty(evm)
-    elif hex_insn == "45":
-        gaslimit(evm)
-    elif hex_insn == "46":
-        chainid(evm)
-    elif hex_insn == "47":
-        selfbalance(evm)
-    elif hex_insn == "48":
-        basefee(evm)
-    elif hex_insn == "50":
-        pop(evm)
-    elif hex_insn == "51":
-        mload(evm)
-    elif hex_insn == "52":
-        mstore(evm)
-    elif hex_insn == "53":
-        mstore8(evm)
-    elif hex_insn == "54":
-        sload(evm)
-    elif hex_insn == "55":
-        sstore(evm)
-    elif hex_insn == "56":
-        jump(evm)
-    elif hex_insn == "57":
-        jumpi(evm)
-    elif hex_insn == "58":
-        pc(evm)
-    elif hex_insn == "59":
-        msize(evm)
-    elif hex_insn == "5A":
-        gas(evm)
-    elif hex_insn == "5B":
-        jumpdest(evm)
-    elif readable_insn[:4] == "PUSH":
-        push(evm, insn.get_metadata(), int(readable_insn[4:]))
-    elif readable_insn[:3] == "DUP":
-        dup(evm, insn.get_metadata())
-    elif readable_insn[:4] == "SWAP":
-        swap(evm, insn.get_metadata())
-    elif hex_insn == "A0":
-        log0(evm)
-    elif hex_insn == "A1":
-        log1(evm)
-    elif hex_insn == "A2":
-        log2(evm)
-    elif hex_insn == "A3":
-        log3(evm)
-    elif hex_insn == "A4":
-        log4(evm)
-    elif hex_insn == "F0":
-        create(evm)
-    elif hex_insn == "F1":
-        call(evm)
-    elif hex_insn == "F2":
-        callcode(evm) 
-    elif hex_insn == "F3":
-        return_op(evm)
-    elif hex_insn == "F4":
-        delegatecall(evm)
-    elif hex_insn == "F5":
-        create2(evm)
-    elif hex_insn == "FA":
-        staticcall(evm)
-    elif hex_insn == "FD":
-        revert(evm)
-    elif hex_insn == "FF":
-        selfdestruct(evm)
-    else:
-        # Might have to incorporate for INVALID
-        raise EVMInstructionNotFound(hex_insn)
-    
\ No newline at end of file
+    jump_table[insn.get_opcode()](evm)
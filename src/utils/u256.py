@@ -5,8 +5,112 @@ File containing the U256 class and its associated logic
 from .exceptions import * 
 from math import floor
 
+# Largest value representable by a U256. Native int arithmetic on 256-bit words
+# is masked with UINT256_MAX
+UINT256_MAX = 2**256 - 1
+UINT256_CEILING = 2**256
+# Sign bit of a 256-bit two's complement word
+SIGN_BIT = 2**255
+
+def to_signed(value: int) -> int:
+    """
+    Returns the two's complement interpretation of a 256-bit unsigned int
+    """
+    if value & SIGN_BIT:
+
+        return value - UINT256_CEILING
+
+    return value
+
+def from_signed(value: int) -> int:
+    """
+    Returns the 256-bit two's complement representation of a signed int
+    """
+    return value & UINT256_MAX
+
+def signed_div(a: int, b: int) -> int:
+    """
+    Returns the SDIV of two 256-bit words, rounding towards zero. Division by
+    zero returns 0
+    """
+    if b == 0:
+
+        return 0
+
+    signed_a = to_signed(a)
+    signed_b = to_signed(b)
+
+    quotient = abs(signed_a) // abs(signed_b)
+
+    if (signed_a < 0) != (signed_b < 0):
+
+        quotient = -quotient
+
+    # -2**255 / -1 overflows back to -2**255 once masked
+    return quotient & UINT256_MAX
+
+def signed_mod(a: int, b: int) -> int:
+    """
+    Returns the SMOD of two 256-bit words, taking the sign of a. Modulo zero
+    returns 0
+    """
+    if b == 0:
+
+        return 0
+
+    signed_a = to_signed(a)
+    remainder = abs(signed_a) % abs(to_signed(b))
+
+    if signed_a < 0:
+
+        remainder = -remainder
+
+    return remainder & UINT256_MAX
+
+def sign_extend(b: int, x: int) -> int:
+    """
+    Returns x sign extended from (b + 1) * 8 bits to 256 bits
+    """
+    if b > 30:
+
+        return x
+
+    bits = (b + 1) * 8
+    low_mask = (1 << bits) - 1
+
+    if x & (1 << (bits - 1)):
+
+        return x | (UINT256_MAX ^ low_mask)
+
+    return x & low_mask
+
+def signed_lt(a: int, b: int) -> int:
+    """
+    Returns 1 if a < b as signed 256-bit words, 0 otherwise
+    """
+    # Flipping the sign bit maps signed order onto unsigned order
+    return 1 if (a ^ SIGN_BIT) < (b ^ SIGN_BIT) else 0
+
+def signed_gt(a: int, b: int) -> int:
+    """
+    Returns 1 if a > b as signed 256-bit words, 0 otherwise
+    """
+    return 1 if (a ^ SIGN_BIT) > (b ^ SIGN_BIT) else 0
+
+def arithmetic_shr(shift: int, value: int) -> int:
+    """
+    Returns value >> shift, filling with the sign bit of value
+    """
+    if shift >= 256:
+
+        return UINT256_MAX if value & SIGN_BIT else 0
+
+    return (to_signed(value) >> shift) & UINT256_MAX
+
 class U256:
 
+    __slots__ = ("_value",)
+
     def __init__(self, value: int):
         """
         Args:
@@ -26,32 +130,14 @@ class U256:
         """
         Returns a lowercase 256-bit binary string representation of the underlying value
         """
-        # Convert to Binary String
-        temp_bin_value = bin(self._value)
-        # Delete prefix
-        temp_bin_value = temp_bin_value[2:]
-        # Sign extend
-        chars_needed = 256 - len(temp_bin_value)
-        for i in range(chars_needed):
-            temp_bin_value = "0" + temp_bin_value
-
-        return temp_bin_value
+        return f"{self._value:0256b}"
 
     def to_hex_string(self) -> str:
         """
         Returns a lowercase 256-bit hexadecimal string representation of the
         underlying value
         """
-        # Convert to Hex Value
-        temp_hex_value = hex(self._value)
-        # Delete prefix
-        temp_hex_value = temp_hex_value[2:]
-        # Sign Extend
-        chars_needed = 64 - len(temp_hex_value)
-        for i in range(chars_needed):
-            temp_hex_value = "0" + temp_hex_value
-
-        return temp_hex_value
+        return f"{self._value:064x}"
 
     def to_address_hex(self) -> str:
         """
@@ -66,17 +152,43 @@ class U256:
 
             raise U256AddressConversionFailure(self._value)
 
-        hex_str = hex(self._value)
-        # Remove prefix
-        hex_str = hex_str[2:]
-        # Check length
-        hex_str_len = len(hex_str)
-        # How many zeros to prepend if necessary
-        preprend_len = 40 - hex_str_len
-        for i in range(preprend_len):
-            hex_str = "0" + hex_str
+        return f"{self._value:040x}"
+
+    def to_bytes32(self) -> bytes:
+        """
+        Returns the underlying value as a 32-byte big-endian bytes object
+        """
+        return self._value.to_bytes(32, "big")
 
-        return hex_str
+    @staticmethod
+    def from_bytes(data: bytes):
+        """
+        Returns a U256 object representing the big-endian unsigned integer
+        value of data, which must be at most 32 bytes long
+        """
+        if len(data) > 32:
+
+            raise U256InputOutOfBounds(data)
+
+        return U256.of(int.from_bytes(data, "big"))
+
+    @staticmethod
+    def of(value: int):
+        """
+        Returns the interned U256 object for value when there is one (0..255,
+        powers of two and 2**256 - 1), otherwise a new U256 object. U256
+        objects are never mutated, so interned ones can be shared freely
+        """
+        # Only ints are looked up, as True and 1.0 would match the entry of 1
+        if type(value) is int:
+
+            interned = _interned.get(value)
+
+            if interned is not None:
+
+                return interned
+
+        return U256(value)
 
     @staticmethod
     def from_hex(hex: str):
@@ -89,7 +201,7 @@ class U256:
             hex = hex[2:]
 
         hex_int = int(hex, 16)
-        return U256(hex_int)
+        return U256.of(hex_int)
 
     def __str__(self):
         return self.to_hex_string()
@@ -100,68 +212,29 @@ class U256:
 
     def get_bit_length(self) -> int:
 
-        # Convert number to binary
-        binary_value = bin(self._value)
-        binary_value = binary_value[2:]
-
-        return len(binary_value)
+        # bin(0) is "0b0", so 0 has a bit length of 1
+        return max(1, self._value.bit_length())
 
     def to_signed_int(self) -> int:
         """
         Returns two's complement interpretation of underlying U256 binary representation
         """
 
-        if self.to_binary_string()[0] == '0': # If already nonnegative
-            return self._value
-        else: # MSB indicates negative value
-            value = 0
-            msb_exp = 255
-            for bit in self.to_binary_string():
-                if msb_exp == 255 and bit == '1': 
-                    value -= 2 ** msb_exp
-                elif bit == '1':
-                    value += 2 ** msb_exp
-                msb_exp -= 1
-            return value
+        return to_signed(self._value)
 
     @staticmethod
     def from_signed_integer(value: int):
         """
-        Given a signed integer, if value is nonnegative, then this function
-        defaults to the U256 initializer. If value is negative, then function
-        first treats value as a nonnegative value, gets the binary version of
-        it, and then converts it to a negative binary represenation via two's
-        complement conversion.
+        Returns a U256 object holding the two's complement representation of
+        value
 
         If integer is not in the range [-2**255, 2**255 - 1], then
         from_signed_integer() raises a U256InputOutOfBounds exception
         """
         if value < -(2 ** 255) or value > (2**255 - 1): # If value is out of bounds for conversion
             raise U256InputOutOfBounds(value)
-        elif value >= 0:
-            return U256(value)
-        else: # Conversion is possible
-            abs_val = abs(value)
-            abs_val_bin = U256(abs_val).to_binary_string()
-            abs_val_bin_lst = list(abs_val_bin)
-            # Flip bits
-            for i in range(len(abs_val_bin_lst)):
-                if abs_val_bin_lst[i] == '0':
-                    abs_val_bin_lst[i] = '1' # FIX
-                else: # Char is '1'
-                    abs_val_bin_lst[i] = '0' # FIX
-            # Now 'add 1'
-            temp = 1
-            for i in range(len(abs_val_bin_lst) - 1, -1, -1): # LOOP BACKWARDS   
-
-                if int(abs_val_bin_lst[i]) + temp == 2:
-                    abs_val_bin_lst[i] = '0' # FIX
-                elif int(abs_val_bin_lst[i]) + temp == 1:
-                    temp = 0
-                    abs_val_bin_lst[i] = '1' # FIX
-
-            converted_value = int("".join(abs_val_bin_lst), 2)
-            return U256(converted_value)
+
+        return U256.of(from_signed(value))
 
     @staticmethod
     def add(a, b):
@@ -172,7 +245,7 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
 
-        return U256((a._value + b._value) % (2**256)) 
+        return U256.of((a._value + b._value) % (2**256)) 
 
     @staticmethod
     def mul(a, b):
@@ -182,7 +255,7 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
 
-        return U256((a._value * b._value) % (2**256))
+        return U256.of((a._value * b._value) % (2**256))
 
     @staticmethod
     def sub(a, b):
@@ -192,7 +265,7 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
 
-        return U256((a._value - b._value) % (2**256))
+        return U256.of((a._value - b._value) % (2**256))
 
     @staticmethod
     def div(a, b):
@@ -203,9 +276,9 @@ class U256:
             raise U256InvalidInputType()
 
         if (b._value == 0):
-            return U256(0)
+            return U256.of(0)
 
-        return U256(a._value // b._value)
+        return U256.of(a._value // b._value)
 
     @staticmethod
     def mod(a, b):
@@ -217,9 +290,9 @@ class U256:
 
         if b.to_int() == 0:
 
-            return U256(0)
+            return U256.of(0)
 
-        return U256(a._value % b._value)
+        return U256.of(a._value % b._value)
 
     @staticmethod
     def addmod(a, b, N):
@@ -231,9 +304,9 @@ class U256:
 
         if N.to_int() == 0:
 
-            return U256(0)
+            return U256.of(0)
         
-        return U256((a._value + b._value) % N._value)
+        return U256.of((a._value + b._value) % N._value)
 
     @staticmethod
     def __sign(a) -> int:
@@ -243,9 +316,7 @@ class U256:
         if not isinstance(a, U256):
             raise U256InvalidInputType()
 
-        a_msb = a.to_binary_string()[0]
-
-        if a_msb == "1": # Negative
+        if a._value & SIGN_BIT: # Negative
             return -1
         else: # Nonnegative
             return 1
@@ -261,21 +332,7 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
 
-        signed_a = a.to_signed_int()
-        signed_b = b.to_signed_int()
-
-        if signed_a == -(2**255) and signed_b == 0:
-            return U256.from_signed_integer(-(2**255))
-        elif signed_b == 0:
-            return U256(0)
-
-        a_sign = U256.__sign(a)
-        b_sign = U256.__sign(b)
-        sign = a_sign * b_sign
-
-        return U256.from_signed_integer(
-            sign * (abs(a.to_signed_int()) // abs(b.to_signed_int())) 
-        )
+        return U256.of(signed_div(a._value, b._value))
 
     @staticmethod
     def sign_extend(b, x):
@@ -289,17 +346,7 @@ class U256:
         if not isinstance(b, U256) or not isinstance(x, U256):
             raise U256InvalidInputType()
 
-        # First grab the rightmost bits based on b
-        binary_x = x.to_binary_string()
-        bits_to_grab = (b.to_int() + 1) * 8
-        sliced_binary = binary_x[256 - bits_to_grab:]
-        msb = sliced_binary[0]
-        if msb == '0': # Sign extend with 0s
-            padded_bits = '0' * (256 - bits_to_grab)
-        else: # Sign extend with 1s
-            padded_bits = '1' * (256 - bits_to_grab)
-        new_val = int(padded_bits + sliced_binary, 2)
-        return U256(new_val)
+        return U256.of(sign_extend(b._value, x._value))
 
     @staticmethod
     def smod(a, b):
@@ -310,17 +357,8 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        signed_a = a.to_signed_int()
-        signed_b = b.to_signed_int()
-
-        if signed_b == 0:
-            return U256(0)
-        
-        sign = U256.__sign(a)
 
-        return U256.from_signed_integer(
-            sign * (abs(signed_a) % abs(signed_b))
-        )
+        return U256.of(signed_mod(a._value, b._value))
 
     @staticmethod
     def mulmod(a, b, N):
@@ -332,9 +370,9 @@ class U256:
 
         if N.to_signed_int() == 0:
 
-            return U256(0)
+            return U256.of(0)
 
-        return U256((a.to_int() * b.to_int()) % N.to_int())
+        return U256.of((a.to_int() * b.to_int()) % N.to_int())
 
     @staticmethod
     def exp(a, b):
@@ -343,7 +381,7 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        return U256((a._value ** b._value) % (2 ** 256))
+        return U256.of((a._value ** b._value) % (2 ** 256))
 
     @staticmethod
     def lt(a, b):
@@ -353,9 +391,9 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
         if not a.to_int() < b.to_int():
-            return U256(0)
+            return U256.of(0)
         else:
-            return U256(1)
+            return U256.of(1)
 
     @staticmethod
     def gt(a, b):
@@ -365,9 +403,9 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
         if not a.to_int() > b.to_int():
-            return U256(0)
+            return U256.of(0)
         else:
-            return U256(1)
+            return U256.of(1)
 
     @staticmethod
     def slt(a, b):
@@ -376,13 +414,8 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        signed_a = a.to_signed_int()
-        signed_b = b.to_signed_int()
 
-        if not signed_a < signed_b:
-            return U256(0)
-        else:
-            return U256(1)
+        return U256.of(signed_lt(a._value, b._value))
 
     @staticmethod
     def sgt(a, b):
@@ -391,13 +424,8 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        signed_a = a.to_signed_int()
-        signed_b = b.to_signed_int()
 
-        if not signed_a > signed_b:
-            return U256(0)
-        else:
-            return U256(1)
+        return U256.of(signed_gt(a._value, b._value))
 
     @staticmethod
     def eq(a, b):
@@ -407,9 +435,9 @@ class U256:
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
         if a.to_int() == b.to_int():
-            return U256(1)
+            return U256.of(1)
         else:
-            return U256(0)
+            return U256.of(0)
 
     @staticmethod
     def is_zero(a):
@@ -420,9 +448,9 @@ class U256:
             raise U256InvalidInputType()
         
         if a.to_int() == 0:
-            return U256(1)
+            return U256.of(1)
         else:
-            return U256(0)
+            return U256.of(0)
 
     @staticmethod
     def bitwise_and(a, b):
@@ -431,7 +459,7 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        return U256(a.to_int() & b.to_int())
+        return U256.of(a.to_int() & b.to_int())
 
     @staticmethod
     def bitwise_or(a, b):
@@ -440,7 +468,7 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        return U256(a.to_int() | b.to_int())
+        return U256.of(a.to_int() | b.to_int())
 
     @staticmethod
     def bitwise_xor(a, b):
@@ -449,7 +477,7 @@ class U256:
         """
         if not isinstance(a, U256) or not isinstance(b, U256):
             raise U256InvalidInputType()
-        return U256(a.to_int() ^ b.to_int())
+        return U256.of(a.to_int() ^ b.to_int())
 
     @staticmethod
     def bitwise_not(a):
@@ -458,13 +486,7 @@ class U256:
         """
         if not isinstance(a, U256):
             raise U256InvalidInputType()
-        a_binary_lst = list(a.to_binary_string())
-        for i in range(len(a_binary_lst)):
-            if a_binary_lst[i] == '0':
-                a_binary_lst[i] = '1'
-            else:
-                a_binary_lst[i] = '0'
-        return U256(int("".join(a_binary_lst), 2))
+        return U256.of(UINT256_MAX ^ a._value)
 
     @staticmethod
     def byte(i, x):
@@ -479,14 +501,9 @@ class U256:
 
         if i.to_int() > 31:
 
-            return U256(0)
-
-        x_binary = x.to_binary_string()
-
-        byte_segment = x_binary[(i_val*8): (i_val*8) + 8]
-        int_segment = int(byte_segment, 2)
+            return U256.of(0)
 
-        return U256(int_segment)
+        return U256.of((x._value >> (248 - 8 * i_val)) & 0xFF)
 
     @staticmethod 
     def shl(shift, value):
@@ -500,7 +517,7 @@ class U256:
         shift_int = shift.to_int()
         value_int = value.to_int()
 
-        return U256(
+        return U256.of(
             (value_int * (2**shift_int)) % (2**256)
         )
 
@@ -517,9 +534,9 @@ class U256:
         value_int = value.to_int()
 
         if shift_int >= 256:
-            return U256(0)
+            return U256.of(0)
 
-        return U256(
+        return U256.of(
             value_int >> shift_int
         )
 
@@ -533,12 +550,14 @@ class U256:
 
             raise U256InvalidInputType()
 
-        shift_int = shift.to_signed_int()
-        value_signed_int = value.to_signed_int()
+        return U256.of(arithmetic_shr(shift._value, value._value))
 
-        if shift_int >= 256:
-            return U256(0)
+# U256 objects handed out by U256.of() for the most common values
+_interned = {}
 
-        return U256.from_signed_integer(
-            value_signed_int >> shift_int
-        )
+for _i in range(256):
+
+    _interned[_i] = U256(_i)
+    _interned.setdefault(1 << _i, U256(1 << _i))
+
+_interned[UINT256_MAX] = U256(UINT256_MAX)
@@ -0,0 +1,235 @@
+"""
+Shared helpers for tests that need a full EVM instance
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.input import EVMInput
+from src.interpreter import EVMInterpreter
+from src.provider import EVMStateProvider
+from src.utils.address import EVMAddress
+
+class FakeProvider(EVMStateProvider):
+    """
+    In-memory state provider recording every request made to it
+
+    accounts maps lowercase hex addresses (without prefix) to dicts with
+    optional "code" (bytes), "balance" (int) and "slots" (int to int) entries
+    """
+
+    def __init__(self, accounts: dict = None):
+
+        self.accounts = accounts if accounts is not None else {}
+        self.calls = []
+
+    def _account(self, address: EVMAddress) -> dict:
+
+        return self.accounts.get(address.get_hex(), {})
+
+    def get_code(self, address: EVMAddress, block_number: int) -> bytes:
+
+        self.calls.append(("code", address.get_hex(), block_number))
+        return self._account(address).get("code", b"")
+
+    def get_balance(self, address: EVMAddress, block_number: int) -> int:
+
+        self.calls.append(("balance", address.get_hex(), block_number))
+        return self._account(address).get("balance", 0)
+
+    def get_storage_at(self, address: EVMAddress, slot: int, block_number: int) -> int:
+
+        self.calls.append(("slot", address.get_hex(), slot, block_number))
+        return self._account(address).get("slots", {}).get(slot, 0)
+
+class StubRPCServer():
+    """
+    Local HTTP server answering eth_getCode, eth_getBalance,
+    eth_getTransactionCount and eth_getStorageAt JSON-RPC requests (single or
+    batched) from an accounts dict shaped like FakeProvider's, plus an
+    optional "nonce" entry. Every request body received is recorded in posts.
+    Each request takes at least delay seconds, and max_in_flight records the
+    most requests ever handled at once. To be used as a context manager
+    """
+
+    def __init__(self, accounts: dict = None, delay: float = 0):
+
+        self.accounts = accounts if accounts is not None else {}
+        self.posts = []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+                with stub._lock:
+
+                    stub.posts.append(payload)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+
+                time.sleep(stub.delay)
+
+                with stub._lock:
+
+                    stub.in_flight -= 1
+
+                if isinstance(payload, list):
+
+                    # Answer batches in reverse order, as nodes are free to
+                    response = [stub._answer(request) for request in reversed(payload)]
+
+                else:
+
+                    response = stub._answer(payload)
+
+                body = json.dumps(response).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _answer(self, request: dict) -> dict:
+
+        params = request["params"]
+        account = self.accounts.get(params[0][2:].lower(), {})
+
+        if request["method"] == "eth_getCode":
+
+            result = "0x" + account.get("code", b"").hex()
+
+        elif request["method"] == "eth_getBalance":
+
+            result = hex(account.get("balance", 0))
+
+        elif request["method"] == "eth_getTransactionCount":
+
+            result = hex(account.get("nonce", 0))
+
+        elif request["method"] == "eth_getStorageAt":
+
+            result = "0x" + f"{account.get('slots', {}).get(int(params[1], 16), 0):064x}"
+
+        else:
+
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "method not found"}}
+
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def __enter__(self):
+
+        threading.Thread(target = self._server.serve_forever, args = (0.01,), daemon = True).start()
+        return self
+
+    def __exit__(self, *args):
+
+        self._server.shutdown()
+        self._server.server_close()
+
+def build_toml_dict(bytecode: str, gas_limit: int = 100000, calldata: str = "", verbosity: str = "silent") -> dict:
+
+    return {
+        "chain": {
+            "chain_id": 1
+        },
+        "block": {
+            "timestamp": 0,
+            "difficulty": 0,
+            "gas_limit": 0,
+            "base_fee": 0,
+            "number": 14000000,
+            "coinbase": "0x2b591e99afE9f32eAA6214f7B7629768c40Eeb39"
+        },
+        "transaction": {
+            "from": "0x0e3df4a1f586fb9f0007a59602d3b26a95337deb",
+            "to": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+            "calldata": calldata,
+            "value": 0,
+            "gas_limit": gas_limit,
+            "gas_price": 0,
+            "is_transfer_only": False,
+            "type": 0,
+            "sig": ""
+        },
+        "contracts": [
+            {
+                "address": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+                "bytecode": bytecode,
+                "balance": 0,
+                "nonce": 0,
+                "slots": {}
+            }
+        ],
+        "execution": {
+            "verbosity": verbosity
+        }
+    }
+
+def build_base(bytecode: str, provider: EVMStateProvider = None, slots: dict = None, sender_balance: int = None) -> EVMInput:
+    """
+    Loads the base state of simulate_batch() and simulate_parallel() tests:
+    the contract running bytecode with slots, or nothing but provider when
+    one is given, plus the sender holding sender_balance if it is given
+    """
+    toml_dict = build_toml_dict(bytecode)
+
+    if slots is not None:
+
+        toml_dict["contracts"][0]["slots"] = slots
+
+    if provider is not None:
+
+        toml_dict["contracts"] = []
+
+    if sender_balance is not None:
+
+        toml_dict["contracts"].append({
+            "address": toml_dict["transaction"]["from"],
+            "bytecode": "",
+            "balance": sender_balance,
+            "nonce": 0,
+            "slots": {}
+        })
+
+    base_state = EVMInput()
+    base_state.from_toml(toml_dict, provider)
+
+    return base_state
+
+def build_transaction(calldata: str = "", gas_limit: int = 100000, value: int = 0, gas_price: int = 0) -> dict:
+
+    transaction = build_toml_dict("", gas_limit, calldata)["transaction"]
+    transaction["value"] = value
+    transaction["gas_price"] = gas_price
+
+    return transaction
+
+def build_interpreter(bytecode: str, gas_limit: int = 100000, calldata: str = "", provider: EVMStateProvider = None, prefetcher = None) -> EVMInterpreter:
+
+    evm_input = EVMInput()
+    evm_input.from_toml(build_toml_dict(bytecode, gas_limit, calldata), provider)
+
+    return EVMInterpreter(evm_input, prefetcher = prefetcher)
+
+def run_bytecode(bytecode: str, gas_limit: int = 100000, calldata: str = "", provider: EVMStateProvider = None) -> EVMInterpreter:
+
+    program = build_interpreter(bytecode, gas_limit, calldata, provider)
+    program.run_evm()
+
+    return program
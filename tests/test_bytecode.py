@@ -0,0 +1,162 @@
+from src.bytecode import EVMRom
+from src.utils.u256 import U256
+from src.utils.exceptions import *
+import pytest
+
+class TestRomDecoding:
+
+    def test_one(self):
+
+        # PUSH1 1 PUSH1 1 ADD
+        rom = EVMRom("6001600101")
+
+        assert(rom.get_size() == 5)
+        assert(list(rom._code) == [0x60, 0x01, 0x60, 0x01, 0x01])
+        assert(rom._immediates == [1, None, 1, None, None])
+        assert(rom._next_pc == [2, 0, 4, 0, 5])
+
+    def test_two(self):
+
+        rom = EVMRom("0x6001600101")
+
+        assert(rom.get_size() == 5)
+
+    def test_three(self):
+
+        rom = EVMRom(bytes.fromhex("7f" + "ff" * 32))
+
+        assert(rom.get_immediate(0) == 2**256 - 1)
+        assert(rom._next_pc[0] == 33)
+
+    def test_four(self):
+
+        # PUSH3 with only two bytes of data left is right padded with zeros
+        rom = EVMRom("620102")
+
+        assert(rom.get_immediate(0) == 0x010200)
+
+    def test_five(self):
+
+        rom = EVMRom("")
+
+        assert(rom.get_size() == 0)
+
+    def test_six(self):
+
+        # 24KB worth of PUSH32 instructions
+        rom = EVMRom(bytes.fromhex(("7f" + "ab" * 32) * 744))
+
+        assert(rom.get_immediate(33 * 743) == int("ab" * 32, 16))
+
+class TestRomInstructions:
+
+    def test_one(self):
+
+        rom = EVMRom("6001600101")
+        insn = rom.get_insn(0)
+
+        assert(insn.get_readable_op() == "PUSH1")
+        assert(insn.get_metadata() == "01")
+        assert(insn.get_len() == 2)
+
+    def test_two(self):
+
+        rom = EVMRom("6001600101")
+
+        assert(rom.get_insn(4).get_opcode() == 0x01)
+
+    def test_three(self):
+
+        rom = EVMRom("6001600101")
+
+        # Offset 1 is PUSH data, not an instruction
+        with pytest.raises(EVMInstructionNotFound):
+
+            rom.get_insn(1)
+
+class TestRomCode:
+
+    def test_one(self):
+
+        rom = EVMRom("6001600101")
+
+        assert(rom.get_code(U256(1), U256(2)) == "0160")
+
+    def test_two(self):
+
+        rom = EVMRom("6001600101")
+
+        assert(rom.get_code(U256(4), U256(3)) == "010000")
+
+    def test_three(self):
+
+        rom = EVMRom("6001600101")
+
+        assert(rom.get_code_bytes(3, 4) == b"\x01\x01\x00\x00")
+
+class TestRomJumpDestinations:
+
+    def test_one(self):
+
+        # PUSH1 4 JUMP STOP JUMPDEST
+        rom = EVMRom("600456005b")
+
+        assert(rom.is_valid_jump_destination(4))
+        assert(not rom.is_valid_jump_destination(3))
+
+    def test_two(self):
+
+        # PUSH1 0x5b: the 0x5b byte is PUSH data, not a JUMPDEST
+        rom = EVMRom("605b")
+
+        assert(not rom.is_valid_jump_destination(1))
+
+    def test_three(self):
+
+        rom = EVMRom("5b")
+
+        assert(not rom.is_valid_jump_destination(1))
+        assert(not rom.is_valid_jump_destination(2**256 - 1))
+
+class TestRomBlocks:
+
+    def test_one(self):
+
+        # PUSH1 4 JUMP | STOP | JUMPDEST PUSH1 1
+        rom = EVMRom("600456005b6001")
+
+        assert(rom.get_block(0) == (11, 0, 1, 2))
+        assert(rom.get_block(3) == (0, 0, 0, 1))
+        assert(rom.get_block(4) == (4, 0, 1, 2))
+        assert(rom.get_block(1) is None)
+        assert(rom.get_block(5) is None)
+
+    def test_two(self):
+
+        # ADD POP needs two items on entry and never grows the stack
+        rom = EVMRom("0150")
+
+        assert(rom.get_block(0) == (5, 2, 0, 2))
+
+    def test_three(self):
+
+        # PUSH1 1 DUP1 DUP1 grows the stack by three
+        rom = EVMRom("60018080")
+
+        assert(rom.get_block(0) == (9, 0, 3, 3))
+
+    def test_four(self):
+
+        # GAS ends a block since it observes the remaining gas
+        rom = EVMRom("5a6001")
+
+        assert(rom.get_block(0) == (2, 0, 1, 1))
+        assert(rom.get_block(1) == (3, 0, 1, 1))
+
+    def test_five(self):
+
+        # Undefined opcode 0x0C ends a block
+        rom = EVMRom("0c6001")
+
+        assert(rom.get_block(0) == (0, 0, 0, 1))
+        assert(rom.get_block(1) == (3, 0, 1, 1))
@@ -0,0 +1,322 @@
+import pytest
+from src.input import EVMInput
+from src.interpreter import EVMInterpreter
+from src.tracer import EVMCallTracer
+from src.utils.address import EVMAddress
+from src.utils.u256 import U256
+from src.utils.exceptions import EVMReturnDataOutOfBounds, EVMInstructionNotFound
+from tests.helpers import build_toml_dict
+
+CALLER = "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+CALLEE = "00000000000000000000000000000000000000aa"
+EMPTY = "00000000000000000000000000000000000000bb"
+
+def call_code(opcode: str, address: str = CALLEE, gas: int = 0xffff, value: int = 0, ret_size: int = 0) -> str:
+    """
+    Bytecode calling address with gas, no arguments and a return area of
+    ret_size bytes at offset 0. value is only pushed for CALL and CALLCODE
+    """
+    code = f"60{ret_size:02x}" + "6000" * 3
+
+    if opcode in ("F1", "F2"):
+
+        code += f"60{value:02x}"
+
+    return code + "73" + address + f"62{gas:06x}" + opcode
+
+def run_calls(bytecode: str, callee: str, gas_limit: int = 100000, balance: int = 0, tracer = None) -> EVMInterpreter:
+
+    toml_dict = build_toml_dict(bytecode, gas_limit)
+    toml_dict["contracts"][0]["balance"] = balance
+    toml_dict["contracts"].append({"address": "0x" + CALLEE, "bytecode": callee, "balance": 0, "nonce": 0, "slots": {}})
+    toml_dict["contracts"].append({"address": "0x" + EMPTY, "bytecode": "", "balance": 0, "nonce": 0, "slots": {}})
+
+    evm_input = EVMInput()
+    evm_input.from_toml(toml_dict)
+
+    program = EVMInterpreter(evm_input, tracer)
+    program.run_evm()
+
+    return program
+
+def slot(program: EVMInterpreter, address: str, key: int) -> int:
+
+    return program._evm._storage.load(EVMAddress(hex = "0x" + address), U256(key)).to_int()
+
+class TestCall:
+
+    def test_one(self):
+
+        # Callee: PUSH1 1 PUSH1 1 SSTORE
+        program = run_calls(call_code("F1"), "6001600155")
+
+        assert(program._evm._stack.pop() == 1)
+        assert(slot(program, CALLEE, 1) == 1)
+        assert(slot(program, CALLER, 1) == 0)
+        assert(program._evm._frame_number == 0)
+
+    def test_two(self):
+
+        # A callee halting exceptionally is undone and consumes its gas
+        # Callee: PUSH1 1 PUSH1 1 SSTORE INVALID
+        program = run_calls(call_code("F1", gas = 0x8000), "6001600155fe")
+
+        assert(program._evm._stack.pop() == 0)
+        assert(slot(program, CALLEE, 1) == 0)
+        assert(program._evm._gas == 100000 - 21000 - 7 * 3 - 100 - 2500 - 0x8000)
+
+    def test_three(self):
+
+        # A call to code-less account costs the call and nothing else
+        program = run_calls(call_code("F1", EMPTY, gas = 0), "00")
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._gas == 100000 - 21000 - 7 * 3 - 100 - 2500)
+
+    def test_four(self):
+
+        # Calls and their results are reported to the tracer
+        tracer = EVMCallTracer()
+        run_calls(call_code("F1"), "6001600155", tracer = tracer)
+
+        result = tracer.get_result()
+
+        assert(len(result["calls"]) == 1)
+        assert(result["calls"][0]["type"] == "CALL")
+        assert(result["calls"][0]["from"] == "0x" + CALLER)
+        assert(result["calls"][0]["to"] == "0x" + CALLEE)
+
+    def test_five(self):
+
+        # Only all but one 64th of the remaining gas is forwarded
+        # Callee: GAS
+        program = run_calls(call_code("F1", gas = 0xffffff), "5a")
+
+        remaining = 100000 - 21000 - 7 * 3 - 100 - 2500
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._gas == remaining - 2)
+
+class TestValueTransfer:
+
+    def test_one(self):
+
+        program = run_calls(call_code("F1", EMPTY, gas = 0, value = 5), "00", balance = 10)
+
+        storage = program._evm._storage
+
+        assert(program._evm._stack.pop() == 1)
+        assert(storage.get_contract_balance(EVMAddress(hex = "0x" + EMPTY)).to_int() == 5)
+        assert(storage.get_contract_balance(EVMAddress(hex = "0x" + CALLER)).to_int() == 5)
+        # Sending value to an empty account creates it. The unused 2300 gas
+        # stipend is handed back
+        assert(program._evm._gas == 100000 - 21000 - 7 * 3 - 100 - 2500 - 9000 - 25000 + 2300)
+
+    def test_two(self):
+
+        # Sending more than the balance fails without executing the callee
+        program = run_calls(call_code("F1", gas = 0x8000, value = 11), "6001600155", balance = 10)
+
+        storage = program._evm._storage
+
+        assert(program._evm._stack.pop() == 0)
+        assert(slot(program, CALLEE, 1) == 0)
+        assert(storage.get_contract_balance(EVMAddress(hex = "0x" + CALLER)).to_int() == 10)
+
+    def test_three(self):
+
+        # The transfer is undone when the callee fails
+        program = run_calls(call_code("F1", value = 5), "fe", balance = 10)
+
+        storage = program._evm._storage
+
+        assert(program._evm._stack.pop() == 0)
+        assert(storage.get_contract_balance(EVMAddress(hex = "0x" + CALLEE)).to_int() == 0)
+
+class TestCallTypes:
+
+    def test_one(self):
+
+        # State can't change inside a STATICCALL
+        program = run_calls(call_code("FA"), "6001600155")
+
+        assert(program._evm._stack.pop() == 0)
+        assert(slot(program, CALLEE, 1) == 0)
+
+    def test_two(self):
+
+        # Nor can logs be emitted. Callee: PUSH1 0 PUSH1 0 LOG0
+        program = run_calls(call_code("FA"), "60006000a0")
+
+        assert(program._evm._stack.pop() == 0)
+        assert(len(program._evm._log_storage.get_logs()) == 0)
+
+    def test_three(self):
+
+        # DELEGATECALL and CALLCODE run the callee's code on the caller's storage
+        for opcode in ("F4", "F2"):
+
+            program = run_calls(call_code(opcode), "6001600155")
+
+            assert(program._evm._stack.pop() == 1)
+            assert(slot(program, CALLER, 1) == 1)
+            assert(slot(program, CALLEE, 1) == 0)
+
+    def test_four(self):
+
+        # DELEGATECALL keeps the sender of the caller. Callee: CALLER PUSH1 0 SSTORE
+        program = run_calls(call_code("F4"), "33600055")
+
+        assert(slot(program, CALLER, 0) == 0x0e3df4a1f586fb9f0007a59602d3b26a95337deb)
+
+    def test_five(self):
+
+        # Logs of a failed callee are dropped. Callee: PUSH1 0 PUSH1 0 LOG0 INVALID
+        program = run_calls(call_code("F1"), "60006000a0fe")
+
+        assert(program._evm._stack.pop() == 0)
+        assert(len(program._evm._log_storage.get_logs()) == 0)
+
+class TestFrames:
+
+    def test_one(self):
+
+        # A contract calling itself with all its gas stops at the depth limit
+        # without exhausting the Python stack
+        # PUSH1 0 (x5) ADDRESS GAS CALL
+        program = run_calls("6000" * 5 + "305af1", "00", gas_limit = 10**13)
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._frames == [])
+        # Each of the 1024 nested frames left its stack for reuse
+        assert(len(program._evm._stack_pool) == 1024)
+
+    def test_two(self):
+
+        # Sequential calls reuse the same pooled stack and memory
+        program = run_calls(call_code("F1") + call_code("F1"), "6001600155")
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._stack.pop() == 1)
+        assert(len(program._evm._stack_pool) == 1)
+        assert(len(program._evm._memory_pool) == 1)
+
+# PUSH1 42 PUSH1 0 MSTORE PUSH1 32 PUSH1 0 RETURN
+RETURN_42 = "602a60005260206000f3"
+
+class TestReturn:
+
+    def test_one(self):
+
+        program = run_calls(RETURN_42, "00")
+
+        assert(program._evm.get_output() == (42).to_bytes(32, "big"))
+        assert(not program._evm.is_reverted())
+        # The output is handed over as a view over memory
+        assert(isinstance(program._evm._output, memoryview))
+
+    def test_two(self):
+
+        # The output is copied to the return area and kept as return data
+        # CALL POP RETURNDATASIZE PUSH1 0 MLOAD
+        program = run_calls(call_code("F1", ret_size = 32) + "503d600051", RETURN_42)
+
+        assert(program._evm._stack.pop() == 42)
+        assert(program._evm._stack.pop() == 32)
+
+    def test_three(self):
+
+        # REVERT undoes the state changes of the callee, but not its output or
+        # the gas it didn't use
+        # Callee: PUSH1 1 PUSH1 1 SSTORE PUSH1 32 PUSH1 0 REVERT
+        program = run_calls(call_code("F1", gas = 0x8000) + "3d", "600160015560206000fd")
+
+        assert(program._evm._stack.pop() == 32)
+        assert(program._evm._stack.pop() == 0)
+        assert(slot(program, CALLEE, 1) == 0)
+        assert(program._evm._gas > 100000 - 21000 - 0x8000)
+
+    def test_four(self):
+
+        # Return data is only copied once the memory of the callee is reused
+        program = run_calls(call_code("F1"), RETURN_42)
+
+        return_data = program._evm._return_data
+
+        assert(isinstance(return_data.get_data_bytes(), memoryview))
+
+        program._evm._memory_pool[-1].reset()
+
+        assert(isinstance(return_data.get_data_bytes(), bytes))
+        assert(return_data.get_data_bytes() == (42).to_bytes(32, "big"))
+
+    def test_five(self):
+
+        # Sequential calls copy nothing, the first return data being dropped
+        # before its memory is reused
+        # CALL RETURNDATASIZE
+        program = run_calls(call_code("F1") + call_code("F1") + "3d", RETURN_42)
+
+        assert(program._evm._stack.pop() == 32)
+        assert(isinstance(program._evm._return_data.get_data_bytes(), memoryview))
+
+    def test_six(self):
+
+        # Reading past the end of the return data is an exceptional halt
+        # PUSH1 1 PUSH1 0 PUSH1 0 RETURNDATACOPY
+        with pytest.raises(EVMReturnDataOutOfBounds):
+
+            run_calls("6001600060003e", "00")
+
+        # PUSH1 32 PUSH1 0 REVERT
+        program = run_calls("60206000fd", "00")
+
+        assert(program._evm.is_reverted())
+
+    def test_seven(self):
+
+        # A REVERT of the outermost frame undoes its state changes and logs too
+        # PUSH1 1 PUSH1 0 SSTORE PUSH1 0 PUSH1 0 LOG0 PUSH1 0 PUSH1 0 REVERT
+        program = run_calls("600160005560006000a060006000fd", "00")
+
+        assert(program._evm.is_reverted())
+        assert(slot(program, CALLER, 0) == 0)
+        assert(len(program._evm._log_storage.get_logs()) == 0)
+
+    def test_eight(self):
+
+        # As does an exceptional halt. PUSH1 1 PUSH1 0 SSTORE PUSH1 0 PUSH1 0 LOG0 INVALID
+        toml_dict = build_toml_dict("600160005560006000a0fe")
+
+        evm_input = EVMInput()
+        evm_input.from_toml(toml_dict)
+
+        program = EVMInterpreter(evm_input)
+
+        with pytest.raises(EVMInstructionNotFound):
+
+            program.run_evm()
+
+        assert(slot(program, CALLER, 0) == 0)
+        assert(len(program._evm._log_storage.get_logs()) == 0)
+
+
+    def test_nine(self):
+
+        # The return data of a callee is dropped with it, leaving no view over
+        # the memory of the frame it called
+        toml_dict = build_toml_dict(call_code("F1") + "00")
+        toml_dict["contracts"].append({"address": "0x" + CALLEE, "bytecode": call_code("F1", EMPTY) + "00", "balance": 0, "nonce": 0, "slots": {}})
+        toml_dict["contracts"].append({"address": "0x" + EMPTY, "bytecode": RETURN_42, "balance": 0, "nonce": 0, "slots": {}})
+
+        evm_input = EVMInput()
+        evm_input.from_toml(toml_dict)
+
+        program = EVMInterpreter(evm_input)
+        program.run_evm()
+
+        for memory in program._evm._memory_pool:
+
+            assert(memory._exported is None)
+            # Fails with BufferError while a view is exported
+            memory._memory.extend(bytes(32))
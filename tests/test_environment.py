@@ -0,0 +1,61 @@
+from tests.helpers import run_bytecode
+
+class TestAddresses:
+
+    def test_one(self):
+
+        # ADDRESS
+        program = run_bytecode("30")
+
+        assert(program._evm._stack.pop() == 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2)
+
+    def test_two(self):
+
+        # CALLER
+        program = run_bytecode("33")
+
+        assert(program._evm._stack.pop() == 0x0e3df4a1f586fb9f0007a59602d3b26a95337deb)
+
+    def test_three(self):
+
+        # ORIGIN
+        program = run_bytecode("32")
+
+        assert(program._evm._stack.pop() == 0x0e3df4a1f586fb9f0007a59602d3b26a95337deb)
+
+class TestCalldata:
+
+    def test_one(self):
+
+        # PUSH1 0 CALLDATALOAD
+        program = run_bytecode("600035", calldata = "0x" + "11" * 32)
+
+        assert(program._evm._stack.pop() == int("11" * 32, 16))
+
+    def test_two(self):
+
+        # PUSH1 1 CALLDATALOAD, missing bytes are zero
+        program = run_bytecode("600135", calldata = "0x1122")
+
+        assert(program._evm._stack.pop() == 0x22 << 248)
+
+    def test_three(self):
+
+        # CALLDATASIZE
+        program = run_bytecode("36", calldata = "0x11223344")
+
+        assert(program._evm._stack.pop() == 4)
+
+    def test_four(self):
+
+        # PUSH1 4 PUSH1 1 PUSH1 0 CALLDATACOPY
+        program = run_bytecode("60046001600037", calldata = "0x112233")
+
+        assert(bytes(program._evm._memory._memory[:4]) == b"\x22\x33\x00\x00")
+
+    def test_five(self):
+
+        # CODECOPY of the whole program and past its end
+        program = run_bytecode("6005600060003900")
+
+        assert(bytes(program._evm._memory._memory[:5]) == bytes.fromhex("6005600060"))
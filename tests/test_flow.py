@@ -0,0 +1,49 @@
+from src.utils.exceptions import *
+from tests.helpers import run_bytecode
+import pytest
+
+class TestJump:
+
+    def test_one(self):
+
+        # PUSH1 4 JUMP STOP JUMPDEST PUSH1 1
+        program = run_bytecode("600456005b6001")
+
+        assert(program._evm._stack.pop() == 1)
+
+    def test_two(self):
+
+        # PUSH1 4 JUMP PUSH1 0x5b, destination lies inside PUSH data
+        with pytest.raises(EVMInvalidJumpDesination):
+
+            run_bytecode("600456605b")
+
+    def test_three(self):
+
+        # PUSH1 3 JUMP STOP, destination is not a JUMPDEST
+        with pytest.raises(EVMInvalidJumpDesination):
+
+            run_bytecode("60035600")
+
+class TestJumpi:
+
+    def test_one(self):
+
+        # PUSH1 1 PUSH1 7 JUMPI STOP STOP JUMPDEST PUSH1 2
+        program = run_bytecode("600160075700005b6002")
+
+        assert(program._evm._stack.pop() == 2)
+
+    def test_two(self):
+
+        # PUSH1 0 PUSH1 6 JUMPI PUSH1 3 STOP
+        program = run_bytecode("600060065760030000")
+
+        assert(program._evm._stack.pop() == 3)
+
+    def test_three(self):
+
+        # PUSH1 1 PUSH1 5 JUMPI, destination is not a JUMPDEST
+        with pytest.raises(EVMInvalidJumpDesination):
+
+            run_bytecode("600160055700")
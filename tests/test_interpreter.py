@@ -0,0 +1,231 @@
+from src.utils.operations import jump_table, invalid
+from src.utils.exceptions import *
+from src.input import EVMInput
+from src.interpreter import EVMInterpreter
+from tests.helpers import run_bytecode, build_toml_dict
+import pytest
+
+class TestJumpTable:
+
+    def test_one(self):
+
+        assert(len(jump_table) == 256)
+
+    def test_two(self):
+
+        # 0x0C is not a defined opcode
+        assert(jump_table[0x0C] is invalid)
+
+    def test_three(self):
+
+        assert(jump_table[0x60].__name__ == "push1")
+        assert(jump_table[0x7F].__name__ == "push32")
+        assert(jump_table[0x80].__name__ == "dup1")
+        assert(jump_table[0x9F].__name__ == "swap16")
+
+class TestDispatch:
+
+    def test_one(self):
+
+        # PUSH1 1 PUSH1 2 ADD
+        program = run_bytecode("6001600201")
+
+        assert(program._evm._stack.pop() == 3)
+
+    def test_two(self):
+
+        # PUSH1 1 PUSH1 2 DUP2
+        program = run_bytecode("6001600281")
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._stack.pop() == 2)
+
+    def test_three(self):
+
+        # PUSH1 1 PUSH1 2 SWAP1
+        program = run_bytecode("6001600290")
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._stack.pop() == 2)
+
+    def test_four(self):
+
+        # PUSH2 0x0102
+        program = run_bytecode("610102")
+
+        assert(program._evm._stack.pop() == 0x0102)
+
+    def test_five(self):
+
+        with pytest.raises(EVMInstructionNotFound):
+
+            run_bytecode("0c")
+
+class TestBlockGas:
+
+    def test_one(self):
+
+        # PUSH1 1 PUSH1 2 ADD
+        program = run_bytecode("6001600201")
+
+        assert(program._evm._gas == 100000 - 21000 - 9)
+
+    def test_two(self):
+
+        # PUSH1 4 JUMP STOP JUMPDEST PUSH1 1, the skipped STOP is never charged
+        program = run_bytecode("600456005b6001")
+
+        assert(program._evm._gas == 100000 - 21000 - 15)
+
+    def test_three(self):
+
+        # PUSH1 1 GAS, GAS pushes the gas left after its own cost
+        program = run_bytecode("60015a")
+
+        assert(program._evm._stack.pop() == 100000 - 21000 - 5)
+
+    def test_four(self):
+
+        with pytest.raises(EVMInsufficientGas):
+
+            run_bytecode("6001600201", gas_limit = 21008)
+
+    def test_five(self):
+
+        # ADD on an empty stack fails before executing
+        with pytest.raises(EVMEmptyStack):
+
+            run_bytecode("01")
+
+    def test_six(self):
+
+        # PUSH1 2 PUSH1 3 EXP costs 10 static and 50 per exponent byte
+        program = run_bytecode("600260030a")
+
+        assert(program._evm._stack.pop() == 9)
+        assert(program._evm._gas == 100000 - 21000 - 6 - 60)
+
+class TestNativeOperations:
+
+    def test_one(self):
+
+        # PUSH1 1 PUSH1 0 SUB wraps around
+        program = run_bytecode("6001600003")
+
+        assert(program._evm._stack.pop() == 2**256 - 1)
+
+    def test_two(self):
+
+        # PUSH1 2 PUSH32 2**255 MUL overflows to 0
+        program = run_bytecode("6002" + "7f80" + "00" * 31 + "02")
+
+        assert(program._evm._stack.pop() == 0)
+
+    def test_three(self):
+
+        # PUSH1 0 NOT
+        program = run_bytecode("600019")
+
+        assert(program._evm._stack.pop() == 2**256 - 1)
+
+    def test_four(self):
+
+        # PUSH2 0xabcd PUSH1 30 BYTE
+        program = run_bytecode("61abcd601e1a")
+
+        assert(program._evm._stack.pop() == 0xab)
+
+    def test_five(self):
+
+        # PUSH1 1 PUSH2 256 SHL
+        program = run_bytecode("60016101001b")
+
+        assert(program._evm._stack.pop() == 0)
+
+    def test_six(self):
+
+        # PUSH1 -1 (as 2**256 - 1) PUSH1 2 SDIV via PUSH32
+        program = run_bytecode("6002" + "7f" + "ff" * 32 + "05")
+
+        # -1 / 2 == 0 (truncated towards zero)
+        assert(program._evm._stack.pop() == 0)
+
+    def test_seven(self):
+
+        # PUSH1 0xff PUSH1 0 MSTORE8 PUSH1 0 MLOAD
+        program = run_bytecode("60ff600053600051")
+
+        assert(program._evm._stack.pop() == 0xff << 248)
+
+class TestMemoryGas:
+
+    def test_one(self):
+
+        # PUSH1 1 PUSH1 0 MSTORE, one word of memory costs 3
+        program = run_bytecode("6001600052")
+
+        assert(program._evm._gas == 100000 - 21000 - 9 - 3)
+
+    def test_two(self):
+
+        # PUSH1 1 PUSH1 0 MSTORE PUSH1 0 MLOAD, MLOAD doesn't expand memory
+        program = run_bytecode("6001600052600051")
+
+        assert(program._evm._stack.pop() == 1)
+        assert(program._evm._gas == 100000 - 21000 - 15 - 3)
+
+    def test_three(self):
+
+        # PUSH1 0 PUSH1 33 MSTORE8 MSIZE
+        program = run_bytecode("600060215359")
+
+        assert(program._evm._stack.pop() == 64)
+
+class TestVerbosity:
+
+    def test_one(self, capsys):
+
+        run_bytecode("6001600201")
+
+        assert(capsys.readouterr().out == "")
+
+    def test_two(self, capsys):
+
+        evm_input = EVMInput()
+        evm_input.from_toml(build_toml_dict("6001600201", verbosity = "summary"))
+        EVMInterpreter(evm_input).run_evm()
+
+        out = capsys.readouterr().out
+        assert("Gas used: 21009" in out)
+        assert("ADD" not in out)
+
+    def test_three(self, capsys):
+
+        evm_input = EVMInput()
+        evm_input.from_toml(build_toml_dict("6001600201", verbosity = "trace"))
+        EVMInterpreter(evm_input).run_evm()
+
+        out = capsys.readouterr().out
+        assert("[0x4] ADD" in out)
+        assert("Gas used: 21009" in out)
+
+    def test_four(self):
+
+        evm_input = EVMInput()
+
+        with pytest.raises(EVMInvalidVerbosity):
+
+            evm_input.from_toml(build_toml_dict("00", verbosity = "loud"))
+
+    def test_five(self, capsys):
+
+        # PUSH1 1 PUSH1 0 SSTORE PUSH1 0 PUSH1 0 LOG0 PUSH1 1 PUSH1 0 REVERT
+        evm_input = EVMInput()
+        evm_input.from_toml(build_toml_dict("600160005560006000a060016000fd", verbosity = "summary"))
+        EVMInterpreter(evm_input).run_evm()
+
+        out = capsys.readouterr().out
+        assert("Logs emitted: 0" in out)
+        assert("Reverted: True" in out)
+        assert("Output: 0x00" in out)
+
@@ -1,4 +1,5 @@
-from src.utils.hashing import keccak256
+from src.utils.hashing import keccak256, keccak256_int, _memo, MEMO_SIZE
+from tests.helpers import run_bytecode
 import pytest
 
 class TestKeccak:
@@ -22,3 +23,55 @@ class TestKeccak:
             value = "0000000000000000000000000000000000000000000000000000000000000000"
             return_val = keccak256(hex = value)
             assert(return_val == "290decd9548b62a8d60345a988386fc84ba6bc95484008f6362f93160ef3e563")
+
+    class TestInt:
+
+        def test_one(self):
+
+            assert(keccak256_int(b"") == 0xc5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470)
+            assert(keccak256_int(bytes(4)) == int(keccak256(hex = "00000000"), 16))
+
+        def test_two(self):
+
+            # Memory is hashed through a memoryview, without copying
+            data = bytearray(b"\xff" * 4)
+
+            with memoryview(data) as view:
+
+                assert(keccak256_int(view) == int(keccak256(hex = "FFFFFFFF"), 16))
+
+        def test_three(self):
+
+            # 64-byte preimages (a key and a mapping slot) are memoized
+            preimage = (7).to_bytes(32, "big") + (3).to_bytes(32, "big")
+
+            first = keccak256_int(preimage)
+
+            assert(_memo[preimage] == first)
+
+            second = keccak256_int(memoryview(preimage))
+
+            assert(first == second == int(keccak256(hex = preimage.hex()), 16))
+
+            # Unlike other 64-byte inputs, which would rarely hit
+            other = b"\xff" * 64
+
+            assert(keccak256_int(other) == int(keccak256(hex = other.hex()), 16))
+            assert(other not in _memo)
+
+        def test_four(self):
+
+            # PUSH1 0 PUSH1 0 MSTORE PUSH1 32 PUSH1 0 KECCAK256
+            program = run_bytecode("60006000526020600020")
+
+            assert(program._evm._stack.pop() == 0x290decd9548b62a8d60345a988386fc84ba6bc95484008f6362f93160ef3e563)
+
+        def test_five(self):
+
+            # The memo never holds more than MEMO_SIZE preimages
+            for i in range(MEMO_SIZE + 1):
+
+                keccak256_int(i.to_bytes(64, "big"))
+
+            assert(len(_memo) <= MEMO_SIZE)
+            assert(keccak256_int(bytes(64)) == int(keccak256(hex = "00" * 64), 16))
@@ -0,0 +1,44 @@
+from src.utils.address import EVMAddress
+from src.utils.u256 import U256
+from tests.helpers import run_bytecode
+
+class TestAddressBytes:
+
+    def test_one(self):
+
+        address = EVMAddress(hex="0x1")
+
+        assert(address.get_hex() == "0" * 39 + "1")
+        assert(address.to_bytes() == b"\x00" * 19 + b"\x01")
+        assert(address.to_bytes32() == b"\x00" * 31 + b"\x01")
+
+    def test_two(self):
+
+        word = b"\xff" * 12 + bytes.fromhex("c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2")
+
+        assert(EVMAddress.from_bytes(word).get_hex() == "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2")
+        assert(EVMAddress.from_bytes(word[12:]).get_uint().to_int() == 0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2)
+
+class TestLogs:
+
+    def test_one(self):
+
+        # PUSH1 0xaa PUSH1 0 MSTORE8 PUSH1 7 PUSH1 1 PUSH1 0 LOG1
+        program = run_bytecode("60aa600053" + "6007" + "6001" + "6000" + "a1")
+
+        logs = program._evm._log_storage.get_logs()
+
+        assert(len(logs) == 1)
+        assert(logs[0].get_data() == b"\xaa")
+        assert(logs[0].get_topics() == [U256(7).to_bytes32()])
+        assert(logs[0].get_address().get_hex() == "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2")
+
+    def test_two(self):
+
+        # PUSH1 2 PUSH1 1 PUSH1 0 PUSH1 0 LOG2
+        program = run_bytecode("6002600160006000a2")
+
+        log = program._evm._log_storage.get_logs()[0]
+
+        assert(log.get_data() == b"")
+        assert(log.get_topics() == [U256(1).to_bytes32(), U256(2).to_bytes32()])
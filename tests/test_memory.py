@@ -43,11 +43,7 @@ class TestMemoryMethods:
             
             mem.store(offset, value)
 
-            assert_value = ""
-
-            for i in range(32):
-
-                assert_value += mem._memory[i]
+            assert_value = mem._memory[0:32].hex()
 
             assert(assert_value == "ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff")
 
@@ -59,14 +55,7 @@ class TestMemoryMethods:
 
             mem.store(offset, value)
 
-            assert_value = ""
-
-            for i in range(32):
-
-                try:
-                    assert_value += mem._memory[i]
-                except KeyError:
-                    assert_value += "00"
+            assert_value = mem._memory[0:32].hex()
 
             assert(assert_value == "00000000000000000000000000000000000000000000000000000000000000ff")
 
@@ -78,14 +67,7 @@ class TestMemoryMethods:
 
             mem.store(offset, value)
 
-            assert_value = ""
-
-            for i in range(32):
-
-                try:
-                    assert_value += mem._memory[i+1]
-                except KeyError:
-                    assert_value += "00"
+            assert_value = mem._memory[1:33].hex()
 
             assert(assert_value == "00000000000000000000000000000000000000000000000000000000000000ff")
 
@@ -146,9 +128,7 @@ class TestMemoryMethods:
 
             mem = EVMMemory()
 
-            for i in range(32):
-
-                mem._memory[i] = "ff"
+            mem._memory = bytearray(b"\xff" * 32)
 
             value = mem.load(U256(1))
 
@@ -217,7 +197,7 @@ class TestMemoryMethods:
 
             mem.store_custom(offset, length, value)
 
-            assert(mem._memory[0] == "ff")
+            assert(mem._memory[0] == 0xff)
 
         def test_six(self):
 
@@ -229,7 +209,7 @@ class TestMemoryMethods:
 
             mem.store_custom(offset, length, value)
 
-            assert(mem._memory[0] == "ff")
+            assert(mem._memory[0] == 0xff)
 
         def test_seven(self):
 
@@ -241,11 +221,7 @@ class TestMemoryMethods:
 
             mem.store_custom(offset, length, value)
 
-            assert_value = ""
-
-            for i in range(33):
-
-                assert_value += mem._memory[i]
+            assert_value = mem._memory[0:33].hex()
 
             assert(assert_value == "ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff")
 
@@ -286,9 +262,7 @@ class TestMemoryMethods:
         def test_three(self):
 
             mem = EVMMemory()
-            for i in range(32):
-
-                mem._memory[i] = "ff"
+            mem._memory = bytearray(b"\xff" * 32)
 
             offset = U256(0)
             length = U256(32)
@@ -300,9 +274,7 @@ class TestMemoryMethods:
 
             mem = EVMMemory()
 
-            for i in range(32):
-
-                mem._memory[i] = "ff"
+            mem._memory = bytearray(b"\xff" * 32)
 
             offset = U256(0)
             length = U256(33)
@@ -336,3 +308,116 @@ class TestMemoryMethods:
             mem.store(U256(0), U256(2**256 - 1))
 
             assert(mem.get_size().to_int() == 31)
+
+    class TestLoadBytes:
+
+        def test_one(self):
+
+            mem = EVMMemory()
+            mem.store(U256(0), U256(2**256 - 1))
+
+            return_val = mem.load_bytes(U256(30), U256(4))
+
+            assert(isinstance(return_val.get_value(), memoryview))
+            assert(bytes(return_val.get_value()) == b"\xff\xff\x00\x00")
+
+        def test_two(self):
+
+            mem = EVMMemory()
+
+            return_val = mem.load_bytes(U256(0), U256(0))
+
+            assert(bytes(return_val.get_value()) == b"")
+            assert(len(mem._memory) == 0)
+
+        def test_three(self):
+
+            # An empty read is valid at any offset and costs nothing
+            mem = EVMMemory()
+
+            return_val = mem.load_bytes(U256(2**256 - 1), U256(0))
+
+            assert(bytes(return_val.get_value()) == b"")
+            assert(return_val.get_mem_expansion_cost() == 0)
+
+            # As is an empty write
+            return_val = mem.store_custom(U256(2**256 - 1), U256(0), b"")
+
+            assert(return_val.get_mem_expansion_cost() == 0)
+            assert(len(mem._memory) == 0)
+
+    class TestExpansion:
+
+        def test_one(self):
+
+            mem = EVMMemory()
+
+            mem.store_custom(U256(0), U256(1), b"\x01")
+
+            assert(len(mem._memory) == 32)
+
+        def test_two(self):
+
+            mem = EVMMemory()
+
+            mem.store(U256(1), U256(1))
+
+            assert(len(mem._memory) == 64)
+
+        def test_three(self):
+
+            mem = EVMMemory()
+
+            # Views handed out by load_custom are released, so memory can grow
+            mem.load_custom(U256(0), U256(32))
+            mem.store(U256(64), U256(1))
+
+            assert(len(mem._memory) == 96)
+
+    class TestExpandTo:
+
+        def test_one(self):
+
+            mem = EVMMemory()
+
+            assert(mem.expand_to(0, 32) == 3)
+            assert(mem.expand_to(0, 32) == 0)
+            assert(mem.get_mem_cost() == 3)
+
+        def test_two(self):
+
+            mem = EVMMemory()
+
+            assert(mem.expand_to(100, 0) == 0)
+            assert(mem.get_msize() == 0)
+
+        def test_three(self):
+
+            mem = EVMMemory()
+
+            mem.expand_to(0, 32)
+
+            # 1024 words cost 3 * 1024 + 1024 ** 2 // 512
+            assert(mem.expand_to(0, 1024 * 32) == 3 * 1024 + 2048 - 3)
+            assert(mem.get_msize() == 1024 * 32)
+
+        def test_four(self):
+
+            mem = EVMMemory()
+
+            with pytest.raises(EVMInsufficientGas):
+
+                mem.expand_to(2**64, 32, available_gas = 30000000)
+
+            assert(mem.get_msize() == 0)
+
+        def test_five(self):
+
+            mem = EVMMemory()
+
+            mem.store(U256(0), U256(1))
+            return_val = mem.store_custom(U256(64), U256(1), "ff")
+
+            # Cost is based on the offset written to, not the previous size
+            assert(return_val.get_mem_expansion_cost() == 6)
+            assert(mem.get_msize() == 96)
@@ -0,0 +1,94 @@
+import pickle
+from src.parallel import simulate_parallel
+from src.provider import EVMJSONRPCProvider, EVMCachedProvider
+from src.utils.address import EVMAddress
+from src.utils.u256 import U256
+from tests.helpers import build_base, build_transaction, FakeProvider
+
+CONTRACT = "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+# PUSH1 0 CALLDATALOAD PUSH1 0 SLOAD ADD PUSH1 0 SSTORE
+ADD_CALLDATA = "60003560005401600055"
+
+def build_transactions(count: int) -> list:
+
+    return [build_transaction(calldata = f"{i:064x}") for i in range(1, count + 1)]
+
+class TestSimulateParallel:
+
+    def test_one(self):
+
+        # Every transaction starts from the same state, whichever worker runs
+        # it and whatever ran there before
+        results = dict(simulate_parallel(build_transactions(6), build_base(ADD_CALLDATA, slots = {"0": 100}), max_workers = 2))
+
+        assert(sorted(results) == list(range(6)))
+
+        for i, result in results.items():
+
+            assert(result.is_success())
+            assert(result.get_state_diff() == {CONTRACT: {"storage": {0: (100, 100 + i + 1)}}})
+
+    def test_two(self):
+
+        # Chunks keep results tied to the index of their transaction
+        results = dict(simulate_parallel(build_transactions(5), build_base(ADD_CALLDATA, slots = {"0": 100}), max_workers = 2, chunk_size = 2))
+
+        assert(sorted(results) == list(range(5)))
+        assert(results[4].get_state_diff()[CONTRACT]["storage"][0] == (100, 105))
+
+    def test_three(self):
+
+        # base_state itself is left as it was
+        base_state = build_base(ADD_CALLDATA, slots = {"0": 100})
+        list(simulate_parallel(build_transactions(2), base_state, max_workers = 1))
+
+        storage = base_state.get_storage()
+
+        assert(storage.load(EVMAddress(hex = "0x" + CONTRACT), U256(0)).to_int() == 100)
+
+    def test_four(self):
+
+        # Contracts pulled from a provider still fetch their slots lazily in the
+        # workers
+        provider = FakeProvider({CONTRACT: {"code": bytes.fromhex(ADD_CALLDATA), "slots": {0: 7}}})
+        results = dict(simulate_parallel(build_transactions(3), build_base(ADD_CALLDATA, provider = provider), max_workers = 2))
+
+        assert(results[2].get_state_diff() == {CONTRACT: {"storage": {0: (7, 10)}}})
+
+class TestPickling:
+
+    def test_one(self):
+
+        # Contracts pulled from a provider survive pickling with their slot
+        # fetching intact
+        provider = FakeProvider({CONTRACT: {"code": bytes.fromhex("00"), "slots": {3: 9}}})
+        base_state = build_base(ADD_CALLDATA, provider = provider)
+        base_state.get_storage().get_contract_bytecode(EVMAddress(hex = "0x" + CONTRACT))
+
+        copy = pickle.loads(pickle.dumps(base_state))
+        slot = copy.get_storage().load(EVMAddress(hex = "0x" + CONTRACT), U256(3))
+
+        assert(slot.to_int() == 9)
+
+    def test_two(self):
+
+        # Open connections aren't pickled
+        provider = EVMJSONRPCProvider("http://127.0.0.1:1")
+        provider._session = object()
+
+        copy = pickle.loads(pickle.dumps(provider))
+
+        assert(copy._session is None)
+        assert(copy._url == "http://127.0.0.1:1")
+
+    def test_three(self, tmp_path):
+
+        # The cache file is opened again on unpickling
+        provider = EVMCachedProvider(FakeProvider({CONTRACT: {"code": b"\x00"}}), str(tmp_path / "cache.db"), 1)
+        provider.get_code(EVMAddress(hex = "0x" + CONTRACT), 14000000)
+
+        copy = pickle.loads(pickle.dumps(provider))
+
+        assert(copy.get_code(EVMAddress(hex = "0x" + CONTRACT), 14000000) == b"\x00")
+        assert(copy.get_hits() == 1)
@@ -0,0 +1,438 @@
+from src.bytecode import EVMRom
+from src.input import EVMInput
+from src.prefetch import EVMSpeculativePrefetcher
+from src.provider import EVMCachedProvider, EVMWeb3Provider, EVMJSONRPCProvider, EVMAsyncJSONRPCProvider, EVMAsyncStateProvider
+from src.state import EVMStorage
+from src.utils.address import EVMAddress
+from src.utils.u256 import U256
+from src.utils.exceptions import EVMMissingAPIURL, EVMInvalidRPCProvider
+from tests.helpers import FakeProvider, StubRPCServer, run_bytecode, build_interpreter, build_toml_dict
+import asyncio
+import pytest
+
+OTHER = "00000000000000000000000000000000000000aa"
+THIRD = "00000000000000000000000000000000000000bb"
+
+def other_address() -> EVMAddress:
+
+    return EVMAddress(hex = OTHER)
+
+class StalledProvider(EVMAsyncStateProvider):
+    """
+    Async provider whose queries never answer, and which still awaits while
+    they are cancelled
+    """
+
+    async def query(self, query: tuple, block_number: int):
+
+        try:
+
+            await asyncio.sleep(3600)
+
+        except asyncio.CancelledError:
+
+            await asyncio.sleep(0.01)
+            raise
+
+class TestStorageMapProvider:
+
+    def test_one(self):
+
+        provider = FakeProvider({OTHER: {"code": b"\x60\x01\x00", "balance": 7}})
+
+        # PUSH1 0xaa EXTCODESIZE PUSH1 0xaa BALANCE
+        program = run_bytecode("60aa3b60aa31", provider = provider)
+
+        assert(program._evm._stack.pop() == 7)
+        assert(program._evm._stack.pop() == 3)
+        # The contract is fetched once and then stored locally
+        assert(provider.calls == [("code", OTHER, 14000000), ("balance", OTHER, 14000000)])
+
+    def test_two(self):
+
+        provider = FakeProvider()
+
+        run_bytecode("00", provider = provider)
+
+        # Contracts listed in the toml never hit the provider
+        assert(provider.calls == [])
+
+class TestCachedProvider:
+
+    def test_one(self, tmp_path):
+
+        fake = FakeProvider({OTHER: {"code": b"\x00", "balance": 2**200, "slots": {5: 9}}})
+        cache = EVMCachedProvider(fake, str(tmp_path / "cache.sqlite"), 1)
+
+        assert(cache.get_code(other_address(), 10) == b"\x00")
+        assert(cache.get_balance(other_address(), 10) == 2**200)
+        assert(cache.get_storage_at(other_address(), 5, 10) == 9)
+
+        assert(cache.get_code(other_address(), 10) == b"\x00")
+        assert(cache.get_balance(other_address(), 10) == 2**200)
+        assert(cache.get_storage_at(other_address(), 5, 10) == 9)
+
+        assert(cache.get_misses() == 3)
+        assert(cache.get_hits() == 3)
+        assert(len(fake.calls) == 3)
+
+    def test_two(self, tmp_path):
+
+        path = str(tmp_path / "cache.sqlite")
+
+        first = EVMCachedProvider(FakeProvider({OTHER: {"balance": 3}}), path, 1)
+        first.get_balance(other_address(), 10)
+        first.close()
+
+        # A new process reading the same file doesn't go to the provider
+        fake = FakeProvider()
+        second = EVMCachedProvider(fake, path, 1)
+
+        assert(second.get_balance(other_address(), 10) == 3)
+        assert(fake.calls == [])
+        assert(second.get_hits() == 1)
+
+    def test_three(self, tmp_path):
+
+        path = str(tmp_path / "cache.sqlite")
+        fake = FakeProvider({OTHER: {"balance": 3}})
+
+        cache = EVMCachedProvider(fake, path, 1)
+        cache.get_balance(other_address(), 10)
+
+        # Other blocks and chains are separate entries
+        cache.get_balance(other_address(), 11)
+        EVMCachedProvider(fake, path, 5).get_balance(other_address(), 10)
+
+        assert(len(fake.calls) == 3)
+
+    def test_four(self, tmp_path):
+
+        toml_dict = build_toml_dict("60aa31")
+        toml_dict["execution"]["rpc_cache"] = str(tmp_path / "cache.sqlite")
+
+        fake = FakeProvider({OTHER: {"balance": 4}})
+
+        evm_input = EVMInput()
+        evm_input.from_toml(toml_dict, fake)
+
+        provider = evm_input.get_storage()._storage_map.get_provider()
+
+        assert(isinstance(provider, EVMCachedProvider))
+
+class TestWeb3Provider:
+
+    def test_one(self, monkeypatch):
+
+        monkeypatch.delenv("API_URL", raising = False)
+
+        provider = EVMWeb3Provider()
+
+        with pytest.raises(EVMMissingAPIURL):
+
+            provider.get_balance(other_address(), 10)
+
+    def test_two(self):
+
+        # Picked with rpc_provider, JSON-RPC being the default
+        providers = []
+
+        for rpc_provider in (None, "jsonrpc", "web3"):
+
+            toml_dict = build_toml_dict("00")
+
+            if rpc_provider is not None:
+
+                toml_dict["execution"]["rpc_provider"] = rpc_provider
+
+            evm_input = EVMInput()
+            evm_input.from_toml(toml_dict)
+
+            providers.append(type(evm_input.get_storage()._storage_map.get_provider()))
+
+        assert(providers == [EVMJSONRPCProvider, EVMJSONRPCProvider, EVMWeb3Provider])
+
+    def test_three(self, tmp_path):
+
+        toml_dict = build_toml_dict("00")
+        toml_dict["execution"]["rpc_provider"] = "web3"
+        toml_dict["execution"]["rpc_cache"] = str(tmp_path / "cache.sqlite")
+
+        evm_input = EVMInput()
+        evm_input.from_toml(toml_dict)
+
+        provider = evm_input.get_storage()._storage_map.get_provider()
+
+        assert(isinstance(provider._provider, EVMWeb3Provider))
+
+    def test_four(self):
+
+        toml_dict = build_toml_dict("00")
+        toml_dict["execution"]["rpc_provider"] = "infura"
+
+        with pytest.raises(EVMInvalidRPCProvider):
+
+            EVMInput().from_toml(toml_dict)
+
+class TestJSONRPCProvider:
+
+    def test_one(self):
+
+        with StubRPCServer({OTHER: {"code": b"\x60\x01", "balance": 5, "slots": {3: 2**255}}}) as server:
+
+            provider = EVMJSONRPCProvider(server.url)
+
+            assert(provider.get_code(other_address(), 10) == b"\x60\x01")
+            assert(provider.get_balance(other_address(), 10) == 5)
+            assert(provider.get_storage_at(other_address(), 3, 10) == 2**255)
+
+        assert(server.posts[0]["method"] == "eth_getCode")
+        assert(server.posts[0]["params"] == ["0x" + OTHER, "0xa"])
+        assert(server.posts[2]["params"] == ["0x" + OTHER, "0x3", "0xa"])
+
+    def test_two(self):
+
+        with StubRPCServer({OTHER: {"balance": 5, "slots": {1: 11, 2: 22}}}) as server:
+
+            provider = EVMJSONRPCProvider(server.url)
+
+            results = provider.get_batch([
+                ("balance", other_address()),
+                ("slot", other_address(), 1),
+                ("slot", other_address(), 2),
+                ("code", other_address())
+            ], 10)
+
+        # One HTTP request, answers matched by id despite the reordering
+        assert(len(server.posts) == 1)
+        assert(results == [5, 11, 22, b""])
+
+    def test_three(self):
+
+        with StubRPCServer({OTHER: {"slots": {i: i for i in range(10)}}}) as server:
+
+            provider = EVMJSONRPCProvider(server.url, batch_size = 4)
+
+            results = provider.get_batch([("slot", other_address(), i) for i in range(10)], 10)
+
+        assert(results == list(range(10)))
+        assert([len(post) for post in server.posts] == [4, 4, 2])
+
+    def test_four(self, monkeypatch):
+
+        monkeypatch.delenv("API_URL", raising = False)
+
+        with pytest.raises(EVMMissingAPIURL):
+
+            EVMJSONRPCProvider().get_balance(other_address(), 10)
+
+class TestPrefetch:
+
+    def test_one(self):
+
+        accounts = {
+            OTHER: {"code": b"\x00", "balance": 1, "slots": {1: 11}},
+            THIRD: {"code": b"\x01", "balance": 2}
+        }
+
+        with StubRPCServer(accounts) as server:
+
+            storage = EVMStorage(10, EVMJSONRPCProvider(server.url))
+
+            storage.prefetch([
+                (other_address(), 1),
+                (other_address(), 2),
+                (EVMAddress(hex = THIRD), None)
+            ])
+
+            assert(len(server.posts) == 1)
+            assert(len(server.posts[0]) == 6)
+
+            # Everything is now local
+            assert(storage.load(other_address(), U256(1)).to_int() == 11)
+            assert(storage.load(other_address(), U256(2)).to_int() == 0)
+            assert(storage.get_contract_balance(EVMAddress(hex = THIRD)).to_int() == 2)
+            assert(storage.get_contract_bytecode(EVMAddress(hex = THIRD)) == b"\x01")
+
+            assert(len(server.posts) == 1)
+
+    def test_two(self):
+
+        fake = FakeProvider({OTHER: {"slots": {1: 11, 2: 22}}})
+        storage = EVMStorage(10, fake)
+
+        storage.load(other_address(), U256(1))
+        fake.calls.clear()
+
+        # Only what isn't local yet is requested
+        storage.prefetch([(other_address(), 1), (other_address(), 2), (other_address(), 2)])
+
+        assert(fake.calls == [("slot", OTHER, 2, 10)])
+
+    def test_three(self):
+
+        fake = FakeProvider()
+        storage = EVMStorage(10, fake)
+
+        storage.prefetch([(other_address(), 1)])
+
+        # Prefetching has no effect on gas
+        assert(not storage.is_address_touched(other_address()))
+        assert(not storage.is_storage_slot_touched(other_address(), U256(1)))
+
+    def test_four(self, tmp_path):
+
+        fake = FakeProvider({OTHER: {"balance": 3, "slots": {1: 11}}})
+        cache = EVMCachedProvider(fake, str(tmp_path / "cache.sqlite"), 1)
+
+        assert(cache.get_batch([("balance", other_address()), ("slot", other_address(), 1)], 10) == [3, 11])
+        assert(cache.get_batch([("balance", other_address()), ("slot", other_address(), 1)], 10) == [3, 11])
+
+        assert(len(fake.calls) == 2)
+        assert(cache.get_hits() == 2)
+
+class TestAsyncJSONRPCProvider:
+
+    def test_one(self):
+
+        async def fetch(url):
+
+            provider = EVMAsyncJSONRPCProvider(url)
+
+            results = [
+                await provider.get_code(other_address(), 10),
+                await provider.get_balance(other_address(), 10),
+                await provider.get_nonce(other_address(), 10),
+                await provider.get_storage_at(other_address(), 3, 10)
+            ]
+
+            await provider.close()
+
+            return results
+
+        with StubRPCServer({OTHER: {"code": b"\x00", "balance": 5, "nonce": 2, "slots": {3: 4}}}) as server:
+
+            assert(asyncio.run(fetch(server.url)) == [b"\x00", 5, 2, 4])
+
+    def test_two(self):
+
+        async def fetch(url):
+
+            provider = EVMAsyncJSONRPCProvider(url, concurrency = 3)
+            results = await provider.get_many([("slot", other_address(), i) for i in range(12)], 10)
+            await provider.close()
+
+            return results
+
+        with StubRPCServer({OTHER: {"slots": {i: i for i in range(12)}}}, delay = 0.02) as server:
+
+            assert(asyncio.run(fetch(server.url)) == list(range(12)))
+
+        assert(len(server.posts) == 12)
+        assert(server.max_in_flight <= 3)
+        assert(server.max_in_flight > 1)
+
+class TestSpeculativePrefetch:
+
+    def test_one(self):
+
+        # PUSH20 OTHER BALANCE
+        bytecode = "73" + OTHER + "31"
+        fake = FakeProvider()
+
+        with StubRPCServer({OTHER: {"balance": 9}}) as server:
+
+            prefetcher = EVMSpeculativePrefetcher(EVMAsyncJSONRPCProvider(server.url))
+            program = build_interpreter(bytecode, provider = fake, prefetcher = prefetcher)
+            program.run_evm()
+            prefetcher.close()
+
+        assert(program._evm._stack.pop() == 9)
+        # The account came from the prefetcher, not the synchronous provider
+        assert(fake.calls == [])
+        assert(sorted(post["method"] for post in server.posts) == ["eth_getBalance", "eth_getCode"])
+
+    def test_two(self):
+
+        rom = EVMRom("73" + OTHER + "73" + "00" * 19 + "01" + "73" + OTHER + "6073")
+
+        assert(rom.get_push20_values() == [int(OTHER, 16), 1])
+
+    def test_three(self):
+
+        # Precompiles and accounts stored locally aren't fetched
+        bytecode = "73" + "00" * 19 + "01" + "73" + "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2" + "00"
+
+        with StubRPCServer() as server:
+
+            prefetcher = EVMSpeculativePrefetcher(EVMAsyncJSONRPCProvider(server.url))
+            program = build_interpreter(bytecode, provider = FakeProvider(), prefetcher = prefetcher)
+            program.run_evm()
+            prefetcher.close()
+
+        assert(server.posts == [])
+
+    def test_four(self):
+
+        fake = FakeProvider({OTHER: {"balance": 9}})
+
+        # A failing speculative fetch falls back to the synchronous provider
+        prefetcher = EVMSpeculativePrefetcher(EVMAsyncJSONRPCProvider("http://127.0.0.1:1"))
+        program = build_interpreter("73" + OTHER + "31", provider = fake, prefetcher = prefetcher)
+        program.run_evm()
+        prefetcher.close()
+
+        assert(program._evm._stack.pop() == 9)
+        assert(("balance", OTHER, 14000000) in fake.calls)
+
+    def test_five(self):
+
+        # Fetches cancelled by close() are settled, so a contract they were
+        # fetching is then pulled synchronously rather than waited on
+        fake = FakeProvider({OTHER: {"balance": 9}})
+        storage = EVMStorage(14000000, fake)
+
+        prefetcher = EVMSpeculativePrefetcher(StalledProvider())
+        storage.speculate([other_address(), EVMAddress(hex = THIRD)], prefetcher)
+        prefetcher.close()
+
+        assert(all(future.done() for future in storage._storage_map._in_flight.values()))
+        assert(storage.get_contract_balance(other_address()).to_int() == 9)
+
+    def test_six(self):
+
+        storage = EVMStorage(14000000, FakeProvider())
+
+        prefetcher = EVMSpeculativePrefetcher(StalledProvider())
+        storage.speculate([other_address()], prefetcher)
+        future = storage._storage_map._in_flight[OTHER]
+
+        storage.drop_speculation()
+        prefetcher.close()
+
+        assert(storage._storage_map._in_flight == {})
+        assert(future.cancelled())
+
+    def test_seven(self, tmp_path):
+
+        # With a cache, speculatively fetched accounts are stored in it, and
+        # the next run neither fetches them again nor goes to the node
+        path = str(tmp_path / "cache.sqlite")
+        bytecode = "73" + OTHER + "31"
+
+        for _ in range(2):
+
+            cache = EVMCachedProvider(FakeProvider(), path, 1)
+
+            with StubRPCServer({OTHER: {"balance": 9}}) as server:
+
+                prefetcher = EVMSpeculativePrefetcher(EVMAsyncJSONRPCProvider(server.url))
+                program = build_interpreter(bytecode, provider = cache, prefetcher = prefetcher)
+                program.run_evm()
+                prefetcher.close()
+
+            assert(program._evm._stack.pop() == 9)
+            assert(cache._provider.calls == [])
+
+        assert(server.posts == [])
+        assert(cache.get_hits() == 2)
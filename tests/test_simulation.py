@@ -0,0 +1,138 @@
+from src.bytecode import load_rom
+from src.input import EVMInput
+from src.simulation import simulate_batch
+from src.utils.address import EVMAddress
+from src.utils.exceptions import EVMInstructionNotFound, EVMInsufficientBalance
+from src.utils.u256 import U256
+from tests.helpers import build_base, build_transaction, FakeProvider
+
+CONTRACT = "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+SENDER = "0e3df4a1f586fb9f0007a59602d3b26a95337deb"
+
+# PUSH1 0 SLOAD PUSH1 1 ADD PUSH1 0 SSTORE
+INCREMENT = "600054600101600055"
+
+def load_slot(base_state: EVMInput, key: int) -> int:
+
+    return base_state.get_storage().load(EVMAddress(hex = "0x" + CONTRACT), U256(key)).to_int()
+
+class TestSimulateBatch:
+
+    def test_one(self):
+
+        # Every transaction sees the state left by the previous one
+        base_state = build_base(INCREMENT)
+        results = simulate_batch([build_transaction(), build_transaction()], base_state)
+
+        assert(all(result.is_success() for result in results))
+        assert(results[0].get_state_diff() == {CONTRACT: {"storage": {0: (0, 1)}}})
+        assert(results[1].get_state_diff() == {CONTRACT: {"storage": {0: (1, 2)}}})
+        assert(load_slot(base_state, 0) == 2)
+
+    def test_two(self):
+
+        # Slots are cold again for every transaction, and the original value of
+        # a slot is its value when the transaction starts
+        results = simulate_batch([build_transaction(), build_transaction()], build_base(INCREMENT))
+
+        assert(results[0].get_gas_used() == 21000 + 4 * 3 + 2100 + 20000)
+        assert(results[1].get_gas_used() == 21000 + 4 * 3 + 2100 + 2900)
+
+    def test_three(self):
+
+        # A reverted transaction leaves no trace
+        # PUSH1 1 PUSH1 0 SSTORE PUSH1 0 PUSH1 0 LOG0 PUSH1 0 PUSH1 0 REVERT
+        base_state = build_base("600160005560006000a060006000fd")
+        results = simulate_batch([build_transaction()], base_state)
+
+        assert(not results[0].is_success())
+        assert(results[0].get_error() is None)
+        assert(results[0].get_logs() == [])
+        assert(results[0].get_state_diff() == {})
+        assert(load_slot(base_state, 0) == 0)
+
+    def test_four(self):
+
+        # Neither does one halting exceptionally, which uses all of its gas
+        # PUSH1 1 PUSH1 0 SSTORE INVALID
+        base_state = build_base("6001600055fe")
+        results = simulate_batch([build_transaction(gas_limit = 50000)], base_state)
+
+        assert(not results[0].is_success())
+        assert(isinstance(results[0].get_error(), EVMInstructionNotFound))
+        assert(results[0].get_gas_used() == 50000)
+        assert(load_slot(base_state, 0) == 0)
+
+    def test_five(self):
+
+        # State pulled from the node and decoded code are reused by the batch
+        provider = FakeProvider({CONTRACT: {"code": bytes.fromhex(INCREMENT + "00"), "slots": {0: 7}}})
+        hits = load_rom.cache_info().hits
+
+        results = simulate_batch([build_transaction() for _ in range(3)], build_base("", provider = provider))
+
+        assert(results[2].get_state_diff() == {CONTRACT: {"storage": {0: (9, 10)}}})
+        assert(len([call for call in provider.calls if call[0] == "code"]) == 1)
+        assert(len([call for call in provider.calls if call[0] == "slot"]) == 1)
+        assert(load_rom.cache_info().hits >= hits + 2)
+
+    def test_six(self):
+
+        # Logs are kept per transaction
+        # PUSH1 0 PUSH1 0 LOG0
+        results = simulate_batch([build_transaction(), build_transaction()], build_base("60006000a0"))
+
+        assert(len(results[0].get_logs()) == 1)
+        assert(len(results[1].get_logs()) == 1)
+
+class TestValueTransfer:
+
+    def test_one(self):
+
+        # Deposits are seen by the transactions that follow
+        # SELFBALANCE PUSH1 0 SSTORE
+        base_state = build_base("47600055", sender_balance = 100)
+        results = simulate_batch([build_transaction(value = 5), build_transaction(value = 5)], base_state)
+
+        assert(results[1].is_success())
+        assert(results[1].get_state_diff() == {
+            SENDER: {"storage": {}, "balance": (95, 90)},
+            CONTRACT: {"storage": {0: (5, 10)}, "balance": (5, 10)}
+        })
+
+    def test_two(self):
+
+        # A sender that can't pay isn't executed
+        base_state = build_base(INCREMENT, sender_balance = 100)
+        results = simulate_batch([build_transaction(value = 101)], base_state)
+
+        assert(not results[0].is_success())
+        assert(isinstance(results[0].get_error(), EVMInsufficientBalance))
+        assert(results[0].get_state_diff() == {})
+        assert(load_slot(base_state, 0) == 0)
+
+    def test_three(self):
+
+        # A reverted transaction hands its value back but still pays for its gas
+        # PUSH1 0 PUSH1 0 REVERT
+        base_state = build_base("60006000fd", sender_balance = 10**6)
+        results = simulate_batch([build_transaction(value = 5, gas_price = 2)], base_state)
+
+        gas_used = 21000 + 2 * 3
+
+        assert(results[0].get_gas_used() == gas_used)
+        assert(results[0].get_state_diff() == {SENDER: {"storage": {}, "balance": (10**6, 10**6 - 2 * gas_used)}})
+
+    def test_four(self):
+
+        # Gas refunds are repaid, capped at a fifth of the gas used
+        # PUSH1 1 PUSH1 0 SSTORE PUSH1 0 PUSH1 0 SSTORE
+        base_state = build_base("6001600055" + "6000600055", sender_balance = 10**6)
+        result = simulate_batch([build_transaction(gas_price = 1)], base_state)[0]
+
+        gas_used = result.get_gas_used()
+        paid = gas_used - min(result.get_gas_refund(), gas_used // 5)
+
+        assert(result.get_gas_refund() > 0)
+        assert(result.get_state_diff()[SENDER]["balance"] == (10**6, 10**6 - paid))
+
@@ -1,4 +1,4 @@
-from src.data import EVMStack
+from src.data import EVMStack, EVMIntStack
 from src.utils.u256 import U256
 from src.utils.exceptions import *
 import pytest
@@ -191,4 +191,53 @@ class TestStackMethods:
                 stack.push(U256(i))
 
             with pytest.raises(EVMInvalidStackDupIndex):
-                stack.swap(17)
\ No newline at end of file
+                stack.swap(17)
+
+class TestIntStackMethods:
+
+    def test_one(self):
+
+        stack = EVMIntStack()
+
+        stack.push(1)
+        stack.push(2)
+
+        assert(stack[-1] == 2)
+        assert(stack.pop() == 2)
+        assert(stack.pop() == 1)
+
+    def test_two(self):
+
+        stack = EVMIntStack()
+
+        stack.push_u256(U256(5))
+
+        assert(stack.pop_u256().to_int() == 5)
+
+    def test_three(self):
+
+        stack = EVMIntStack()
+
+        with pytest.raises(EVMStackInvalidInputType):
+
+            stack.push_u256(5)
+
+    def test_four(self):
+
+        stack = EVMIntStack()
+
+        with pytest.raises(EVMEmptyStack):
+
+            stack.pop_u256()
+
+    def test_five(self):
+
+        stack = EVMIntStack()
+
+        for i in range(1024):
+
+            stack.push(i)
+
+        with pytest.raises(EVMStackOverFlow):
+
+            stack.push_u256(U256(1))
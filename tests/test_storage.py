@@ -0,0 +1,329 @@
+import pytest
+from src.input import EVMInput
+from src.interpreter import EVMInterpreter
+from src.state import EVMContractStorage, EVMStorage
+from src.utils.address import EVMAddress
+from src.utils.exceptions import EVMInvalidSnapshot
+from src.utils.u256 import U256
+from tests.helpers import build_toml_dict, FakeProvider
+
+def run_with_slots(bytecode: str, slots: dict) -> EVMInterpreter:
+
+    toml_dict = build_toml_dict(bytecode)
+    toml_dict["contracts"][0]["slots"] = slots
+
+    evm_input = EVMInput()
+    evm_input.from_toml(toml_dict)
+
+    program = EVMInterpreter(evm_input)
+    program.run_evm()
+
+    return program
+
+class TestInputSlots:
+
+    def test_one(self):
+
+        # PUSH1 1 SLOAD
+        program = run_with_slots("600154", {"0": 40, "1": 32})
+
+        assert(program._evm._stack.pop() == 32)
+
+    def test_two(self):
+
+        evm_input = EVMInput()
+        toml_dict = build_toml_dict("00")
+        toml_dict["contracts"][0]["slots"] = {"0": 40}
+        evm_input.from_toml(toml_dict)
+
+        contract = evm_input.get_storage()._storage_map._contract_mapping["c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"]
+
+        assert(isinstance(contract.get_slot_value(0), U256))
+        assert(contract.get_slot_value(0).to_int() == 40)
+
+REMOTE = "c02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+def run_remote(bytecode: str, slots: dict) -> tuple:
+    """
+    Runs bytecode as a contract that isn't listed in the toml, so it is
+    pulled from a FakeProvider
+    """
+    provider = FakeProvider({REMOTE: {"code": bytes.fromhex(bytecode), "slots": slots}})
+
+    toml_dict = build_toml_dict("")
+    toml_dict["contracts"] = []
+
+    evm_input = EVMInput()
+    evm_input.from_toml(toml_dict, provider)
+
+    program = EVMInterpreter(evm_input)
+    program.run_evm()
+
+    return program, provider
+
+def slot_calls(provider: FakeProvider) -> list:
+
+    return [call for call in provider.calls if call[0] == "slot"]
+
+class TestLazySlots:
+
+    def test_one(self):
+
+        # PUSH1 5 SLOAD PUSH1 5 SLOAD
+        program, provider = run_remote("600554600554", {5: 9})
+
+        assert(program._evm._stack.pop() == 9)
+        assert(program._evm._stack.pop() == 9)
+        assert(slot_calls(provider) == [("slot", REMOTE, 5, 14000000)])
+
+    def test_two(self):
+
+        # Empty slots are remembered too
+        # PUSH1 1 SLOAD PUSH1 1 SLOAD
+        program, provider = run_remote("600154600154", {})
+
+        assert(program._evm._stack.pop() == 0)
+        assert(len(slot_calls(provider)) == 1)
+
+    def test_three(self):
+
+        # PUSH1 2 PUSH1 5 SSTORE PUSH1 5 SLOAD
+        program, provider = run_remote("600260055560055400", {5: 9})
+
+        assert(program._evm._stack.pop() == 2)
+        assert(len(slot_calls(provider)) == 1)
+        # Changing a nonzero original slot costs 2900 on top of the cold
+        # access, then SLOAD of the now warm slot costs 100
+        assert(program._evm._gas == 100000 - 21000 - 3 * 3 - 2100 - 2900 - 100)
+
+    def test_four(self):
+
+        # No slot is fetched unless the program reads one
+        program, provider = run_remote("6001600201", {5: 9})
+
+        assert(slot_calls(provider) == [])
+
+    def test_five(self):
+
+        storage = EVMContractStorage("00", {}, lambda key: key * 2)
+
+        # A slot written before it's read still reports its original value
+        storage.set_slot_value(4, U256(1))
+
+        assert(storage.get_imumutable_slot_value(4).to_int() == 8)
+        assert(storage.get_slot_value(4).to_int() == 1)
+
+OTHER = "00000000000000000000000000000000000000aa"
+
+def load_with_access_list(bytecode: str, access_list: list) -> tuple:
+
+    provider = FakeProvider({
+        REMOTE: {"code": bytes.fromhex(bytecode), "slots": {5: 9}},
+        OTHER: {"balance": 7}
+    })
+
+    toml_dict = build_toml_dict("")
+    toml_dict["contracts"] = []
+    toml_dict["transaction"]["access_list"] = access_list
+
+    evm_input = EVMInput()
+    evm_input.from_toml(toml_dict, provider)
+
+    return evm_input, provider
+
+class TestAccessList:
+
+    def test_one(self):
+
+        # PUSH1 5 SLOAD
+        evm_input, _ = load_with_access_list("600554", [{"address": "0x" + REMOTE, "storage_keys": ["0x05"]}])
+        program = EVMInterpreter(evm_input)
+        program.run_evm()
+
+        # The listed slot is warm, but listing it costs 2400 + 1900 up front
+        assert(program._evm._stack.pop() == 9)
+        assert(program._evm._gas == 100000 - 21000 - 2400 - 1900 - 3 - 100)
+
+    def test_two(self):
+
+        # PUSH20 OTHER BALANCE
+        evm_input, _ = load_with_access_list("73" + OTHER + "31", [{"address": "0x" + OTHER}])
+        program = EVMInterpreter(evm_input)
+        program.run_evm()
+
+        assert(program._evm._stack.pop() == 7)
+        assert(program._evm._gas == 100000 - 21000 - 2400 - 3 - 100)
+
+    def test_three(self):
+
+        # Without an access list, the same BALANCE is a cold access
+        evm_input, _ = load_with_access_list("73" + OTHER + "31", [])
+        program = EVMInterpreter(evm_input)
+        program.run_evm()
+
+        assert(program._evm._gas == 100000 - 21000 - 3 - 2600)
+
+    def test_four(self):
+
+        # Everything listed is fetched before execution starts
+        evm_input, provider = load_with_access_list(
+            "600554",
+            [
+                {"address": "0x" + REMOTE, "storage_keys": [5]},
+                {"address": "0x" + OTHER, "storage_keys": []}
+            ]
+        )
+
+        assert(sorted(provider.calls) == sorted([
+            ("code", REMOTE, 14000000),
+            ("balance", REMOTE, 14000000),
+            ("code", OTHER, 14000000),
+            ("balance", OTHER, 14000000),
+            ("slot", REMOTE, 5, 14000000)
+        ]))
+        assert(evm_input.get_access_list_gas() == 2 * 2400 + 1900)
+
+        calls = len(provider.calls)
+        program = EVMInterpreter(evm_input)
+        program.run_evm()
+
+        assert(program._evm._stack.pop() == 9)
+        assert(len(provider.calls) == calls)
+
+def build_storage() -> tuple:
+
+    storage = EVMStorage(0)
+    address = EVMAddress(hex = "0x" + REMOTE)
+    storage.add_contract(address, EVMContractStorage("00", {1: U256(5)}), U256(10))
+
+    return storage, address
+
+class TestJournal:
+
+    def test_one(self):
+
+        storage, address = build_storage()
+
+        id = storage.snapshot()
+        storage.store(address, U256(1), U256(6))
+        storage.store(address, U256(2), U256(7))
+        storage.set_contract_balance(address, U256(3))
+        storage.revert(id)
+
+        assert(storage.load(address, U256(1)).to_int() == 5)
+        assert(storage.load(address, U256(2)).to_int() == 0)
+        assert(storage.get_contract_balance(address).to_int() == 10)
+
+    def test_two(self):
+
+        # Reverting an inner snapshot keeps the changes made before it
+        storage, address = build_storage()
+
+        outer = storage.snapshot()
+        storage.store(address, U256(1), U256(6))
+        inner = storage.snapshot()
+        storage.store(address, U256(1), U256(7))
+        storage.revert(inner)
+
+        assert(storage.load(address, U256(1)).to_int() == 6)
+
+        storage.revert(outer)
+
+        assert(storage.load(address, U256(1)).to_int() == 5)
+        assert(storage.load_immutable(address, U256(1)).to_int() == 5)
+
+    def test_three(self):
+
+        # Committing an inner snapshot leaves its changes to the outer one
+        storage, address = build_storage()
+
+        outer = storage.snapshot()
+        inner = storage.snapshot()
+        storage.store(address, U256(1), U256(6))
+        storage.commit(inner)
+
+        assert(storage.load(address, U256(1)).to_int() == 6)
+
+        storage.revert(outer)
+
+        assert(storage.load(address, U256(1)).to_int() == 5)
+
+    def test_four(self):
+
+        # Addresses and slots first touched after a snapshot are cold again
+        # once it is reverted
+        storage, address = build_storage()
+        other = EVMAddress(hex = "0x" + OTHER)
+        storage.add_contract(other, EVMContractStorage("00", {}), U256(0))
+
+        storage.add_touched_address(address)
+        id = storage.snapshot()
+        storage.get_contract_balance(other)
+        storage.load(address, U256(1))
+        storage.revert(id)
+
+        assert(storage.is_address_touched(address))
+        assert(not storage.is_address_touched(other))
+        assert(not storage.is_storage_slot_touched(address, U256(1)))
+
+    def test_five(self):
+
+        storage, address = build_storage()
+
+        # Nothing is journaled without an open snapshot
+        storage.store(address, U256(1), U256(6))
+
+        assert(storage._journal == [])
+
+        id = storage.snapshot()
+        storage.store(address, U256(1), U256(7))
+        storage.commit(id)
+
+        assert(storage._journal == [])
+        assert(storage.load(address, U256(1)).to_int() == 7)
+
+        with pytest.raises(EVMInvalidSnapshot):
+
+            storage.revert(id)
+
+    def test_six(self):
+
+        # Snapshots taken at the same journal position get distinct ids
+        storage, address = build_storage()
+
+        first = storage.snapshot()
+        second = storage.snapshot()
+
+        assert(first != second)
+
+        storage.store(address, U256(1), U256(6))
+        storage.revert(second)
+
+        assert(storage.load(address, U256(1)).to_int() == 5)
+
+        storage.commit(first)
+
+    def test_seven(self):
+
+        # Ids aren't reused once the journal is dropped, so a stale id can't
+        # revert a later snapshot
+        storage, address = build_storage()
+
+        stale = storage.snapshot()
+        storage.commit(stale)
+
+        id = storage.snapshot()
+        storage.store(address, U256(1), U256(6))
+
+        with pytest.raises(EVMInvalidSnapshot):
+
+            storage.revert(stale)
+
+        with pytest.raises(EVMInvalidSnapshot):
+
+            storage.get_state_diff(stale)
+
+        assert(storage.get_state_diff(id) == {REMOTE: {"storage": {1: (5, 6)}}})
+
+        storage.commit(id)
+        storage.finalize()
@@ -0,0 +1,396 @@
+import io
+import json
+import pytest
+from src.tracer import EVMTracer, EVMStructLogTracer, EVMCallTracer, EVMStepView, EVMStreamTracer, read_trace
+from src.utils.exceptions import EVMInsufficientGas, EVMEmptyStack
+from src.utils.u256 import U256
+from tests.helpers import build_interpreter
+
+class RecordingTracer(EVMTracer):
+
+    def __init__(self):
+
+        self.events = []
+
+    def on_enter(self, call_type, sender, recipient, input, gas, value, depth):
+
+        self.events.append(("enter", call_type, depth))
+
+    def on_step(self, step):
+
+        self.events.append(("step", step.get_pc(), step.get_opcode(), step.get_stack_size()))
+
+    def on_fault(self, step, error):
+
+        self.events.append(("fault", step.get_pc(), type(error)))
+
+    def on_exit(self, output, gas_used, error = None):
+
+        self.events.append(("exit", gas_used, error is None))
+
+def run_traced(bytecode: str, tracer: EVMTracer, gas_limit: int = 100000):
+
+    program = build_interpreter(bytecode, gas_limit)
+    program.set_tracer(tracer)
+    program.run_evm()
+
+    return program
+
+class TestTracerHooks:
+
+    def test_one(self):
+
+        tracer = RecordingTracer()
+        run_traced("6001600201", tracer)
+
+        assert(tracer.events == [
+            ("enter", "CALL", 1),
+            ("step", 0, 0x60, 0),
+            ("step", 2, 0x60, 1),
+            ("step", 4, 0x01, 2),
+            ("exit", 9, True)
+        ])
+
+    def test_two(self):
+
+        tracer = RecordingTracer()
+
+        with pytest.raises(EVMEmptyStack):
+
+            run_traced("600101", tracer)
+
+        assert(tracer.events[-2] == ("fault", 2, EVMEmptyStack))
+        assert(tracer.events[-1][0] == "exit")
+        assert(tracer.events[-1][2] == False)
+
+    def test_three(self):
+        # Untraced and traced runs end in the same state
+        traced = run_traced("6001600201600052", EVMTracer())
+        plain = build_interpreter("6001600201600052")
+        plain.run_evm()
+
+        assert(traced._evm._gas == plain._evm._gas)
+        assert(traced._evm._memory._memory == plain._evm._memory._memory)
+
+    def test_four(self):
+        # The same view is updated in place for every step
+        views = []
+
+        class ViewTracer(EVMTracer):
+
+            def on_step(self, step):
+
+                views.append(step)
+
+        run_traced("6001600201", ViewTracer())
+
+        assert(len(views) == 3)
+        assert(views[0] is views[2])
+        assert(isinstance(views[0], EVMStepView))
+
+class TestStructLogTracer:
+
+    def test_one(self):
+
+        tracer = EVMStructLogTracer()
+        run_traced("6001600201", tracer)
+
+        result = tracer.get_result()
+
+        # As the receipt, the gas used includes the intrinsic 21000
+        assert(result["gas"] == 21009)
+        assert(result["failed"] == False)
+        assert([log["op"] for log in result["structLogs"]] == ["PUSH1", "PUSH1", "ADD"])
+        assert([log["gasCost"] for log in result["structLogs"]] == [3, 3, 3])
+        assert(result["structLogs"][0]["gas"] == 100000 - 21000)
+        assert(result["structLogs"][2]["stack"] == ["0x1", "0x2"])
+        assert(result["structLogs"][0]["depth"] == 1)
+
+    def test_two(self):
+        # Memory expansion is part of the gas cost of MSTORE
+        tracer = EVMStructLogTracer(enable_memory = True)
+        run_traced("6001600052", tracer)
+
+        logs = tracer.get_result()["structLogs"]
+
+        assert(logs[2]["op"] == "MSTORE")
+        assert(logs[2]["gasCost"] == 6)
+        assert(logs[2]["memory"] == [])
+
+    def test_three(self):
+
+        tracer = EVMStructLogTracer(enable_stack = False)
+        run_traced("6001600201", tracer)
+
+        assert("stack" not in tracer.get_result()["structLogs"][0])
+        assert("memory" not in tracer.get_result()["structLogs"][0])
+
+    def test_four(self):
+
+        tracer = EVMStructLogTracer()
+
+        with pytest.raises(EVMInsufficientGas):
+
+            run_traced("6001600201", tracer, gas_limit = 21005)
+
+        result = tracer.get_result()
+
+        assert(result["failed"] == True)
+        assert(result["structLogs"][-1]["op"] == "PUSH1")
+        assert(result["structLogs"][-1]["error"] == "EVMInsufficientGas")
+
+    def test_five(self):
+
+        tracer = EVMStructLogTracer()
+        run_traced("6001600201", tracer)
+
+        assert(json.loads(tracer.to_json()) == tracer.get_result())
+
+    def test_six(self):
+
+        # Opcodes are named as in geth
+        # PUSH1 0 PUSH1 0 KECCAK256
+        tracer = EVMStructLogTracer()
+        run_traced("6000600020", tracer)
+
+        assert(tracer.get_result()["structLogs"][2]["op"] == "KECCAK256")
+
+class TestCallTracer:
+
+    def test_one(self):
+
+        tracer = EVMCallTracer()
+        run_traced("6001600201", tracer)
+
+        result = tracer.get_result()
+
+        assert(result["type"] == "CALL")
+        assert(result["from"] == "0x0e3df4a1f586fb9f0007a59602d3b26a95337deb")
+        assert(result["to"] == "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2")
+        # As in geth, the top-level frame covers the whole transaction
+        assert(result["gas"] == hex(100000))
+        assert(result["gasUsed"] == hex(21009))
+        assert("error" not in result)
+
+    def test_two(self):
+
+        tracer = EVMCallTracer()
+
+        with pytest.raises(EVMEmptyStack):
+
+            run_traced("01", tracer)
+
+        assert(tracer.get_result()["error"] == "EVMEmptyStack")
+        # A transaction halting exceptionally consumes all of its gas
+        assert(tracer.get_result()["gasUsed"] == hex(100000))
+
+    def test_three(self):
+
+        # Refunds are deducted from the gas used of the transaction, while
+        # the gas used of its frame is what it consumed
+        # PUSH1 0 PUSH1 1 SSTORE, clearing slot 1 which holds 1
+        tracer = EVMCallTracer()
+        program = build_interpreter("6000600155")
+        program._evm._storage.store(program._evm._msg.get_recipient(), U256(1), U256(1))
+        program.set_tracer(tracer)
+        program.run_evm()
+
+        gas_used = 100000 - program._evm._gas
+        refund = program._evm.get_gas_refund()
+
+        assert(refund > 0)
+        assert(tracer.get_result()["gasUsed"] == hex(gas_used - min(refund, gas_used // 5)))
+
+class CountingFile(io.BytesIO):
+
+    def __init__(self):
+
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+
+        self.writes += 1
+        return super().write(data)
+
+class TestStreamTracer:
+
+    def test_one(self, tmp_path):
+
+        path = str(tmp_path / "trace.jsonl")
+        run_traced("6001600201", EVMStreamTracer(path))
+
+        records = list(read_trace(path))
+
+        assert([record.get("op") for record in records[:3]] == ["PUSH1", "PUSH1", "ADD"])
+        assert([record["gasCost"] for record in records[:3]] == [3, 3, 3])
+        assert(records[2]["stack"] == ["0x1", "0x2"])
+        assert(records[3] == {"output": "", "gasUsed": 9, "failed": False})
+
+    def test_two(self, tmp_path):
+        # Binary and JSON Lines traces hold the same steps
+        json_path = str(tmp_path / "trace.jsonl")
+        binary_path = str(tmp_path / "trace.bin")
+
+        run_traced("6001600201600052", EVMStreamTracer(json_path, enable_memory = True))
+        run_traced("6001600201600052", EVMStreamTracer(binary_path, format = "binary", enable_memory = True))
+
+        json_records = list(read_trace(json_path))
+        binary_records = list(read_trace(binary_path))
+
+        assert(len(json_records) == len(binary_records) == 6)
+
+        for json_record, binary_record in zip(json_records[:-1], binary_records[:-1]):
+
+            assert(json_record["gasCost"] == binary_record["gasCost"])
+            assert(json_record["stack"] == [hex(item) for item in binary_record["stack"]])
+            assert(json_record["memory"] == binary_record["memory"].hex())
+
+        assert(json_records[-1] == binary_records[-1])
+
+    def test_three(self, tmp_path):
+
+        path = str(tmp_path / "trace.jsonl")
+        run_traced("600160005260026020526003600052", EVMStreamTracer(path, diffs = True, enable_memory = True))
+
+        records = list(read_trace(path))
+
+        assert(records[2]["stackPop"] == 0)
+        assert(records[2]["stackPush"] == ["0x0"])
+        assert(records[3]["stackPop"] == 2)
+        assert(records[3]["stackPush"] == [])
+        # Each record holds the state before its step, so an MSTORE shows up
+        # in the record that follows it
+        assert(records[3]["memSize"] == 32)
+        assert(records[3]["memWrites"] == [[0, f"{1:064x}"]])
+        assert(records[4]["memWrites"] == [])
+        assert(records[6]["memSize"] == 64)
+        assert(records[6]["memWrites"] == [[32, f"{2:064x}"]])
+
+    def test_four(self, tmp_path):
+
+        path = str(tmp_path / "trace.bin")
+        run_traced("6001600201", EVMStreamTracer(path, format = "binary", diffs = True))
+
+        records = list(read_trace(path))
+
+        assert(records[1]["stackPush"] == [1])
+        assert(records[2]["stackPop"] == 0)
+        assert(records[2]["stackPush"] == [2])
+        assert(records[-1]["gasUsed"] == 9)
+
+    def test_five(self):
+        # Small flush sizes write every record, large ones write once at exit
+        small = CountingFile()
+        run_traced("6001600201", EVMStreamTracer(small, flush_size = 1))
+
+        large = CountingFile()
+        run_traced("6001600201", EVMStreamTracer(large))
+
+        assert(small.writes == 4)
+        assert(large.writes == 1)
+        assert(small.getvalue() == large.getvalue())
+
+    def test_six(self, tmp_path):
+
+        path = str(tmp_path / "trace.jsonl")
+
+        with pytest.raises(EVMEmptyStack):
+
+            run_traced("600101", EVMStreamTracer(path))
+
+        records = list(read_trace(path))
+
+        assert(records[1]["error"] == "EVMEmptyStack")
+        assert(records[2]["failed"] == True)
+        assert(records[2]["error"] == "EVMEmptyStack")
+
+    def test_seven(self):
+
+        with pytest.raises(ValueError):
+
+            EVMStreamTracer(io.BytesIO(), format = "xml")
+
+    def test_eight(self, tmp_path, monkeypatch):
+
+        # Memory diffs replay to the full memory of every step, while memory
+        # is only compared after steps that may write to it
+        # PUSH1 1 PUSH1 0 MSTORE PUSH1 64 MLOAD POP PUSH1 2 PUSH1 95 MSTORE8 PUSH1 0 PUSH1 0 RETURN
+        bytecode = "6001600052" + "604051" + "50" + "6002605f53" + "60006000f3"
+        full_path = str(tmp_path / "full.jsonl")
+        diff_path = str(tmp_path / "diff.jsonl")
+
+        run_traced(bytecode, EVMStreamTracer(full_path, enable_memory = True))
+
+        views = []
+        get_memory_view = EVMStepView.get_memory_view
+
+        def counting_view(step):
+
+            views.append(step.get_pc())
+            return get_memory_view(step)
+
+        monkeypatch.setattr(EVMStepView, "get_memory_view", counting_view)
+        run_traced(bytecode, EVMStreamTracer(diff_path, diffs = True, enable_memory = True))
+
+        memory = bytearray()
+
+        for full, diff in zip(list(read_trace(full_path))[:-1], list(read_trace(diff_path))[:-1]):
+
+            memory.extend(bytes(diff["memSize"] - len(memory)))
+
+            for offset, word in diff["memWrites"]:
+
+                memory[offset:offset + 32] = bytes.fromhex(word)
+
+            assert(memory.hex() == full["memory"])
+
+        # The first step, and the steps after the MSTORE and the MSTORE8
+        assert(views == [0, 5, 14])
+
+    def test_nine(self, tmp_path):
+
+        # A gas limit below the intrinsic cost leaves negative gas to record
+        path = str(tmp_path / "trace.bin")
+
+        with pytest.raises(EVMInsufficientGas):
+
+            run_traced("6001", EVMStreamTracer(path, format = "binary"), gas_limit = 20000)
+
+        records = list(read_trace(path))
+
+        assert(records[0]["gas"] == 20000 - 21000)
+        assert(records[0]["error"] == "EVMInsufficientGas")
+
+
+    def test_ten(self, tmp_path, monkeypatch):
+
+        # Stack diffs replay to the full stack of every step, while only the
+        # first record copies the whole stack
+        # PUSH1 1 PUSH1 2 PUSH1 3 DUP2 SWAP3 ADD POP
+        bytecode = "600160026003" + "81" + "92" + "01" + "50"
+        full_path = str(tmp_path / "full.jsonl")
+        diff_path = str(tmp_path / "diff.jsonl")
+
+        run_traced(bytecode, EVMStreamTracer(full_path))
+
+        copies = []
+        get_stack = EVMStepView.get_stack
+
+        def counting_stack(step):
+
+            copies.append(step.get_pc())
+            return get_stack(step)
+
+        monkeypatch.setattr(EVMStepView, "get_stack", counting_stack)
+        run_traced(bytecode, EVMStreamTracer(diff_path, diffs = True))
+
+        stack = []
+
+        for full, diff in zip(list(read_trace(full_path))[:-1], list(read_trace(diff_path))[:-1]):
+
+            stack = stack[:len(stack) - diff["stackPop"]] + diff["stackPush"]
+
+            assert(stack == full["stack"])
+
+        assert(copies == [0])
@@ -1,4 +1,4 @@
-from src.utils.u256 import U256
+from src.utils.u256 import U256, UINT256_MAX, to_signed, from_signed, signed_div, signed_mod, sign_extend, signed_lt, signed_gt, arithmetic_shr
 from src.utils.exceptions import *
 import pytest
 
@@ -132,4 +132,106 @@ class TestUintMethods():
             with pytest.raises(U256InputOutOfBounds):
 
                 x = U256.from_signed_integer(2**255)
-    
\ No newline at end of file
+    
+class TestSignedHelpers:
+
+    def test_one(self):
+
+        assert(to_signed(UINT256_MAX) == -1)
+        assert(to_signed(2**255) == -2**255)
+        assert(to_signed(2**255 - 1) == 2**255 - 1)
+        assert(from_signed(-1) == UINT256_MAX)
+        assert(from_signed(to_signed(12345)) == 12345)
+
+    def test_two(self):
+        # -2**255 / -1 overflows to -2**255
+        assert(signed_div(2**255, UINT256_MAX) == 2**255)
+        assert(signed_div(from_signed(-7), 2) == from_signed(-3))
+        assert(signed_div(7, 0) == 0)
+
+    def test_three(self):
+
+        assert(signed_mod(from_signed(-7), 3) == from_signed(-1))
+        assert(signed_mod(7, from_signed(-3)) == 1)
+        assert(signed_mod(7, 0) == 0)
+
+    def test_four(self):
+
+        assert(sign_extend(0, 0xff) == UINT256_MAX)
+        assert(sign_extend(0, 0x17f) == 0x7f)
+        assert(sign_extend(1, 0x8000) == from_signed(-0x8000))
+        assert(sign_extend(31, 0xff) == 0xff)
+        assert(sign_extend(2**200, 0xff) == 0xff)
+
+    def test_five(self):
+
+        assert(signed_lt(UINT256_MAX, 0) == 1)
+        assert(signed_lt(0, UINT256_MAX) == 0)
+        assert(signed_gt(1, 2**255) == 1)
+        assert(signed_gt(2**255, 2**255) == 0)
+
+    def test_six(self):
+
+        assert(arithmetic_shr(4, from_signed(-16)) == UINT256_MAX)
+        assert(arithmetic_shr(1, from_signed(-16)) == from_signed(-8))
+        assert(arithmetic_shr(256, from_signed(-16)) == UINT256_MAX)
+        assert(arithmetic_shr(256, 16) == 0)
+        assert(arithmetic_shr(2, 16) == 4)
+
+class TestInterning:
+
+    def test_one(self):
+
+        assert(U256.of(0) is U256.of(0))
+        assert(U256.of(255) is U256.of(255))
+        assert(U256.of(2**200) is U256.of(2**200))
+        assert(U256.of(UINT256_MAX) is U256.of(UINT256_MAX))
+
+    def test_two(self):
+
+        assert(U256.of(1000).to_int() == 1000)
+        assert(U256.of(1000) is not U256.of(1000))
+
+    def test_three(self):
+        # Comparison results are shared objects
+        assert(U256.lt(U256(1), U256(2)) is U256.of(1))
+        assert(U256.is_zero(U256(5)) is U256.of(0))
+
+    def test_four(self):
+
+        with pytest.raises(AttributeError):
+
+            U256(1).other = 2
+
+    def test_five(self):
+        # Other types fail as they do with U256(), even when equal to an
+        # interned int
+        for value in (True, 1.0, "1"):
+
+            with pytest.raises(U256InvalidInputType):
+
+                U256.of(value)
+
+class TestBytes:
+
+    def test_one(self):
+
+        assert(U256(1).to_bytes32() == b"\x00" * 31 + b"\x01")
+        assert(U256(UINT256_MAX).to_bytes32() == b"\xff" * 32)
+
+    def test_two(self):
+
+        assert(U256.from_bytes(b"\x01\x00").to_int() == 256)
+        assert(U256.from_bytes(b"").to_int() == 0)
+
+        with pytest.raises(U256InputOutOfBounds):
+
+            U256.from_bytes(b"\x00" * 33)
+
+    def test_three(self):
+
+        assert(U256(0xab).to_binary_string() == "0" * 248 + "10101011")
+        assert(U256(0).get_bit_length() == 1)
+        assert(U256(256).get_bit_length() == 9)
+        assert(U256.bitwise_not(U256(0)).to_int() == UINT256_MAX)
+        assert(U256.byte(U256(31), U256(0xabcd)).to_int() == 0xcd)